@@ -0,0 +1,288 @@
+import os
+import re
+import json
+import random
+from typing import Dict, Iterable, List, Optional
+
+from bvid_store import av_to_bv, bv_to_av
+from http_client import HttpClient
+from info_extractor import API_BASE, WEB_BASE
+
+# 录制的夹具目录：{bvid}.html / {bvid}.view.json / {bvid}.tags.json / {cid}.xml / {cid}.seg{n}.so（分段弹幕）
+RECORDED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 录制的网页与接口中的图片地址（含 JSON 中 / 转义的写法），回放时改写为本地服务地址
+_IMAGE_HOST_RE = re.compile(rb'(?:https?:)?(?:/|\\u002F){2}i\d\.hdslb\.com')
+
+_FIRST_AID = 170001
+
+
+def synthetic_bvids(count: int) -> List[str]:
+    return [av_to_bv(_FIRST_AID + i) for i in range(count)]
+
+
+_WORDS = ["弹幕", "测试", "{brace}", "[list]", '"quote"', "\\u002F", "视频", "bilibili", "};", "up主"]
+# 不含 "};" 的词表：旧的非贪婪正则解析方式只能处理这类网页（基准对比用）
+_PLAIN_WORDS = [w for w in _WORDS if w != "};"]
+
+
+def _text(rng: random.Random, length: int, words: List[str] = _WORDS) -> str:
+    # 混入括号、引号与转义斜杠，覆盖解析器需要跳过的字符串内容
+    return " ".join(rng.choice(words) for _ in range(length))
+
+
+def _video_data(bvid: str, base_url: str, parts: int, words: List[str] = _WORDS) -> dict:
+    aid = bv_to_av(bvid)
+    rng = random.Random(bvid)
+    cid = 10_000_000 + aid
+    pages = [{"cid": cid + i, "page": i + 1, "from": "vupload", "part": f"P{i + 1} {_text(rng, 3, words)}",
+              "duration": 180 + i, "dimension": {"width": 1920, "height": 1080, "rotate": 0}}
+             for i in range(parts)]
+    return {
+        "bvid": bvid, "aid": aid, "videos": parts, "tid": 17, "tname": "单机游戏", "copyright": 1,
+        "pic": f"{base_url}/bfs/archive/{bvid}.jpg",
+        "title": f"基准测试视频 {bvid}",
+        "pubdate": 1700000000, "ctime": 1700000000,
+        "desc": _text(rng, 40, words),
+        "duration": sum(p["duration"] for p in pages),
+        "owner": {"mid": 20000 + aid % 1000, "name": f"测试UP主{aid % 1000}",
+                  "face": f"{base_url}/bfs/face/{aid % 1000}.jpg"},
+        "stat": {"aid": aid, "view": rng.randint(1000, 10 ** 7), "danmaku": rng.randint(0, 10 ** 5),
+                 "reply": rng.randint(0, 10 ** 4), "favorite": rng.randint(0, 10 ** 5),
+                 "coin": rng.randint(0, 10 ** 5), "share": rng.randint(0, 10 ** 4),
+                 "like": rng.randint(0, 10 ** 6)},
+        "cid": cid,
+        "pages": pages,
+    }
+
+
+def synthetic_page(bvid: str, base_url: str = "", size: int = 300 * 1024, parts: int = 1,
+                   nested_terminators: bool = True) -> bytes:
+    """
+    生成与视频页结构相近的网页：videoData 位于 __INITIAL_STATE__ 中部，
+    前后是大段推荐列表、脚本与样式，总大小约为 size 字节
+    页面中带有 <video> 标签，yt-dlp 通用解析器可从中下载模拟媒体文件
+    :param nested_terminators: 推荐列表文本中是否包含 "};"
+    """
+    words = _WORDS if nested_terminators else _PLAIN_WORDS
+    rng = random.Random(bvid)
+    video_data = _video_data(bvid, base_url, parts, words)
+    related = []
+    state = {"aid": video_data["aid"], "bvid": bvid, "p": 1, "upData": {"mid": video_data["owner"]["mid"]},
+             "videoData": video_data, "related": related, "tags": [], "isClient": False}
+    state_size = len(json.dumps(state, ensure_ascii=False).encode("utf-8"))
+    while state_size < size * 0.7:
+        item = {"aid": rng.randint(1, 10 ** 9), "title": _text(rng, 8, words), "desc": _text(rng, 30, words),
+                "owner": {"name": _text(rng, 2, words)}, "stat": {"view": rng.randint(0, 10 ** 7)}}
+        related.append(item)
+        state_size += len(json.dumps(item, ensure_ascii=False).encode("utf-8")) + 2
+    state_json = json.dumps(state, ensure_ascii=False).replace("/", "\\u002F")
+    keywords = ",".join([video_data["title"], "基准测试", "模拟数据", "bilibili", "哔哩哔哩", "弹幕", "视频"])
+    filler = "".join(f".c{i}{{margin:{i}px;padding:{i % 7}px}}" for i in range(max(0, int(size * 0.3) // 32)))
+    return (
+        '<!DOCTYPE html><html><head><meta charset="UTF-8">'
+        f'<title>{video_data["title"]}_哔哩哔哩_bilibili</title>'
+        f'<meta data-vue-meta="true" itemprop="keywords" name="keywords" content="{keywords}">'
+        f"<style>{filler}</style></head><body>"
+        f'<video controls><source src="{base_url}/media/{bvid}.mp4" type="video/mp4"></video>'
+        f"<script>window.__INITIAL_STATE__={state_json};"
+        "(function(){var s;(s=document.currentScript||document.scripts[document.scripts.length-1])"
+        ".parentNode.removeChild(s);}());</script>"
+        "</body></html>"
+    ).encode("utf-8")
+
+
+def synthetic_view(bvid: str, base_url: str = "", parts: int = 1) -> dict:
+    """x/web-interface/view 接口响应"""
+    return {"code": 0, "message": "0", "ttl": 1, "data": _video_data(bvid, base_url, parts)}
+
+
+def synthetic_tags(bvid: str) -> dict:
+    return {"code": 0, "message": "0", "data": [{"tag_id": i, "tag_name": f"标签{i}"} for i in range(5)]}
+
+
+# 合成的 UP 主投稿数与收藏夹视频数（两者的 BV 号前缀重叠，用于验证去重）
+SPACE_VIDEOS = 60
+FAVORITE_VIDEOS = 45
+
+
+def synthetic_nav() -> dict:
+    # 未登录时 code 为 -101，但仍返回 WBI 签名密钥
+    return {"code": -101, "message": "账号未登录", "data": {"wbi_img": {
+        "img_url": "https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png",
+        "sub_url": "https://i0.hdslb.com/bfs/wbi/4932caff0ff746eab6f01bf08b70ac45.png"}}}
+
+
+def synthetic_space(mid: int, pn: int, ps: int, count: int = SPACE_VIDEOS) -> dict:
+    bvids = synthetic_bvids(count)[(pn - 1) * ps:pn * ps]
+    return {"code": 0, "message": "0", "data": {
+        "list": {"vlist": [{"bvid": b, "mid": mid} for b in bvids]},
+        "page": {"pn": pn, "ps": ps, "count": count}}}
+
+
+def synthetic_favorites(media_id: int, pn: int, ps: int, count: int = FAVORITE_VIDEOS) -> dict:
+    bvids = synthetic_bvids(count)[(pn - 1) * ps:pn * ps]
+    # 每页混入一条番剧（type 12），发现时应被过滤
+    medias = [{"bvid": b, "type": 2} for b in bvids] + [{"bvid": "", "type": 12}]
+    return {"code": 0, "message": "0", "data": {
+        "info": {"id": media_id, "media_count": count},
+        "medias": medias, "has_more": pn * ps < count}}
+
+
+def synthetic_danmaku(cid: int, count: int = 500) -> bytes:
+    rng = random.Random(cid)
+    items = []
+    for i in range(count):
+        p = (f"{rng.uniform(0, 180):.5f},1,25,{rng.choice([16777215, 16711680, 65280])},"
+             f"{1700000000 + i},0,{rng.getrandbits(32):08x},{10 ** 12 + i},10")
+        items.append(f'<d p="{p}">弹幕内容 {i} &amp; &lt;测试&gt;</d>')
+    return ('<?xml version="1.0" encoding="UTF-8"?><i><chatserver>chat.bilibili.com</chatserver>'
+            f"<chatid>{cid}</chatid><mission>0</mission><maxlimit>{count}</maxlimit><state>0</state>"
+            f"<real_name>0</real_name><source>k-v</source>{''.join(items)}</i>").encode("utf-8")
+
+
+def synthetic_media(size: int = 64 * 1024, seed: int = 0) -> bytes:
+    return random.Random(seed).randbytes(size)
+
+
+class Fixtures:
+    """
+    模拟服务使用的响应数据：录制目录中有对应文件时回放录制内容（图片地址改写到本地服务），
+    否则按 BV 号生成确定性的合成数据
+    """
+    def __init__(self, recorded_dir: Optional[str] = RECORDED_DIR, page_size: int = 300 * 1024,
+                 parts: int = 1, danmaku_count: int = 500, media_size: int = 64 * 1024,
+                 cover_size: int = 20 * 1024):
+        """
+        :param recorded_dir: 录制夹具目录，不存在时只使用合成数据
+        :param page_size: 合成网页大小（字节）
+        :param parts: 合成视频的分P数
+        :param danmaku_count: 合成弹幕条数
+        :param media_size: 模拟视频文件大小（字节）
+        :param cover_size: 模拟封面大小（字节）
+        """
+        self.recorded_dir = recorded_dir if recorded_dir and os.path.isdir(recorded_dir) else None
+        self.page_size = page_size
+        self.parts = parts
+        self.danmaku_count = danmaku_count
+        self.media = synthetic_media(media_size, seed=1)
+        self.cover = synthetic_media(cover_size, seed=2)
+        self._cache: Dict[tuple, bytes] = {}
+
+    def recorded_bvids(self) -> List[str]:
+        if self.recorded_dir is None:
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.recorded_dir) if name.endswith(".html"))
+
+    def bvids(self, count: int) -> List[str]:
+        """录制的 BV 号在前，不足 count 时用合成 BV 号补足"""
+        recorded = self.recorded_bvids()[:count]
+        return recorded + synthetic_bvids(count - len(recorded))
+
+    def _recorded(self, name: str) -> Optional[bytes]:
+        if self.recorded_dir is None:
+            return None
+        path = os.path.join(self.recorded_dir, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _rewrite(self, data: bytes, base_url: str) -> bytes:
+        escaped = base_url.replace("/", "\\u002F").encode("utf-8")
+        return _IMAGE_HOST_RE.sub(lambda m: escaped if b"u002F" in m.group(0) else base_url.encode("utf-8"), data)
+
+    def _cached(self, key: tuple, build) -> bytes:
+        data = self._cache.get(key)
+        if data is None:
+            data = self._cache[key] = build()
+        return data
+
+    def page(self, bvid: str, base_url: str) -> bytes:
+        def build():
+            recorded = self._recorded(f"{bvid}.html")
+            if recorded is not None:
+                # 录制的网页没有 <video> 标签，补上模拟媒体地址供 yt-dlp 下载
+                video_tag = f'<video><source src="{base_url}/media/{bvid}.mp4" type="video/mp4"></video>'
+                return self._rewrite(recorded, base_url).replace(b"<body", video_tag.encode() + b"<body", 1)
+            return synthetic_page(bvid, base_url, self.page_size, self.parts)
+        return self._cached(("page", bvid, base_url), build)
+
+    def view(self, bvid: str, base_url: str) -> bytes:
+        def build():
+            recorded = self._recorded(f"{bvid}.view.json")
+            if recorded is not None:
+                return self._rewrite(recorded, base_url)
+            return json.dumps(synthetic_view(bvid, base_url, self.parts), ensure_ascii=False).encode("utf-8")
+        return self._cached(("view", bvid, base_url), build)
+
+    def tags(self, bvid: str) -> bytes:
+        recorded = self._recorded(f"{bvid}.tags.json")
+        return recorded if recorded is not None else json.dumps(synthetic_tags(bvid)).encode("utf-8")
+
+    def stat(self, bvid: str, base_url: str) -> bytes:
+        data = json.loads(self.view(bvid, base_url)).get("data") or {}
+        return json.dumps({"code": 0, "message": "0", "data": data.get("stat") or {}}).encode("utf-8")
+
+    def danmaku(self, cid: int) -> bytes:
+        recorded = self._recorded(f"{cid}.xml")
+        if recorded is not None:
+            return recorded
+        return self._cached(("danmaku", cid), lambda: synthetic_danmaku(cid, self.danmaku_count))
+
+    @staticmethod
+    def nav() -> bytes:
+        return json.dumps(synthetic_nav(), ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    def space(mid: int, pn: int, ps: int) -> bytes:
+        return json.dumps(synthetic_space(mid, pn, ps)).encode("utf-8")
+
+    @staticmethod
+    def favorites(media_id: int, pn: int, ps: int) -> bytes:
+        return json.dumps(synthetic_favorites(media_id, pn, ps)).encode("utf-8")
+
+    def segment(self, cid: int, index: int) -> bytes:
+        """分段弹幕（protobuf），没有录制时返回空段"""
+        recorded = self._recorded(f"{cid}.seg{index}.so")
+        return recorded if recorded is not None else b""
+
+
+def record(bvids: Iterable[str], out_dir: str = RECORDED_DIR, log=print) -> int:
+    """
+    录制真实的视频网页、view/标签接口响应与弹幕 XML，供模拟服务回放（需要网络）
+    :return: 成功录制的视频数
+    """
+    import requests
+    from info_extractor import COMMENT_BASE
+    from danmaku_segments import SEGMENT_PATH, segment_count
+
+    os.makedirs(out_dir, exist_ok=True)
+    session = requests.Session()
+    session.headers.update(HttpClient.BASE_HEADERS)
+    recorded = 0
+    for bvid in bvids:
+        try:
+            page = session.get(f"{WEB_BASE}/video/{bvid}", timeout=15)
+            page.raise_for_status()
+            view = session.get(f"{API_BASE}/x/web-interface/view", params={"bvid": bvid}, timeout=15)
+            tags = session.get(f"{API_BASE}/x/tag/archive/tags", params={"bvid": bvid}, timeout=15)
+            data = view.json().get("data") or {}
+            cid = data.get("cid")
+            files = {f"{bvid}.html": page.content, f"{bvid}.view.json": view.content,
+                     f"{bvid}.tags.json": tags.content}
+            if cid:
+                files[f"{cid}.xml"] = session.get(f"{COMMENT_BASE}/{cid}.xml", timeout=15).content
+                for index in range(1, segment_count(data.get("duration")) + 1):
+                    files[f"{cid}.seg{index}.so"] = session.get(
+                        f"{API_BASE}{SEGMENT_PATH}", params={"type": 1, "oid": cid, "segment_index": index},
+                        timeout=15).content
+        except Exception as e:
+            log(f"[ERROR] 录制 {bvid} 失败: {e}")
+            continue
+        for name, data in files.items():
+            with open(os.path.join(out_dir, name), "wb") as f:
+                f.write(data)
+        recorded += 1
+        log(f"[INFO] 已录制 {bvid}")
+    return recorded
@@ -0,0 +1,218 @@
+import re
+import json
+import time
+import socket
+import hashlib
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.fixtures import Fixtures
+
+_VIDEO_RE = re.compile(r"^/video/(BV1[0-9A-Za-z]{9})$")
+_DANMAKU_RE = re.compile(r"^/(\d+)\.xml$")
+_MEDIA_RE = re.compile(r"^/media/(BV1[0-9A-Za-z]{9})\.mp4$")
+_RANGE_RE = re.compile(r"^bytes=(\d+)-$")
+# 按静态文件处理的路由：带 ETag / Last-Modified，支持条件请求（304）与 Range 续传（206 / 416）
+_STATIC_ROUTES = ("cover", "media", "danmaku")
+_LAST_MODIFIED = "Tue, 14 Nov 2023 22:13:20 GMT"
+
+
+class MockBilibiliServer:
+    """
+    本地模拟的 B 站服务，同一地址同时充当网页、API 与弹幕主机：
+    /video/{bvid}、/x/web-interface/view、/x/tag/archive/tags、/x/web-interface/archive/stat、
+    /{cid}.xml（弹幕）、/x/v2/dm/web/seg.so（分段弹幕，回放录制的分段，没有时返回空段）、/bfs/...（封面）、/media/{bvid}.mp4（视频）、
+    /x/web-interface/nav、/x/space/wbi/arc/search、/x/v3/fav/resource/list（BV 号发现，空间投稿要求 WBI 签名）
+    可模拟固定延迟与周期性限流（HTTP 412）；封面、视频与弹幕 XML 按静态文件响应，
+    支持 If-None-Match（304）与 Range / If-Range 续传，可模拟响应体中途断开（truncate_body）
+    """
+    def __init__(self, fixtures: Optional[Fixtures] = None, port: int = 0, host: str = "127.0.0.1",
+                 latency: float = 0.0, throttle_every: int = 0):
+        """
+        :param fixtures: 响应数据，默认使用录制夹具或合成数据
+        :param port: 监听端口，0 表示随机分配
+        :param latency: 网页与接口请求的附加延迟（秒）
+        :param throttle_every: 每类网页/接口请求（按路由分别计数）每 N 个返回一次 412，0 表示不限流
+        """
+        self.fixtures = fixtures or Fixtures()
+        self.latency = latency
+        self.throttle_every = throttle_every
+        # 大于 0 时累计返回这么多次 412 后不再限流，用于验证限流结束后速率回升
+        self.max_throttles = 0
+        self.throttled = Counter()
+        # 大于 0 时静态文件只发送前 N 字节后断开连接（Content-Length 仍为完整大小），模拟下载中断
+        self.truncate_body = 0
+        self.hits = Counter()
+        self._lock = threading.Lock()
+        self._route_requests = Counter()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self.base_url = f"http://{host}:{self._server.server_address[1]}"
+        self._thread = None
+
+    def start(self) -> "MockBilibiliServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-bilibili", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def preload(self, bvids):
+        """预先生成网页、接口与弹幕响应，避免首次请求时的生成耗时计入基准"""
+        for bvid in bvids:
+            self.fixtures.page(bvid, self.base_url)
+            view = json.loads(self.fixtures.view(bvid, self.base_url)).get("data") or {}
+            for page in view.get("pages") or []:
+                self.fixtures.danmaku(page["cid"])
+
+    def _throttled(self, name: str) -> bool:
+        with self._lock:
+            self._route_requests[name] += 1
+            if self.throttle_every <= 0 or self._route_requests[name] % self.throttle_every:
+                return False
+            if self.max_throttles and sum(self.throttled.values()) >= self.max_throttles:
+                return False
+            self.throttled[name] += 1
+            return True
+
+    def route(self, path: str, query: dict):
+        """返回 (状态码, Content-Type, 内容, 统计用的路由名)"""
+        fixtures, base = self.fixtures, self.base_url
+        bvid = (query.get("bvid") or [""])[0]
+        m = _VIDEO_RE.match(path)
+        if m:
+            return 200, "text/html; charset=utf-8", fixtures.page(m.group(1), base), "page"
+        if path == "/x/web-interface/view":
+            return 200, "application/json", fixtures.view(bvid, base), "view"
+        if path == "/x/tag/archive/tags":
+            return 200, "application/json", fixtures.tags(bvid), "tags"
+        if path == "/x/web-interface/archive/stat":
+            return 200, "application/json", fixtures.stat(bvid, base), "stat"
+        if path == "/x/v2/dm/web/seg.so":
+            oid = int((query.get("oid") or ["0"])[0])
+            index = int((query.get("segment_index") or ["1"])[0])
+            return 200, "application/octet-stream", fixtures.segment(oid, index), "danmaku_segment"
+        if path == "/x/web-interface/nav":
+            return 200, "application/json", fixtures.nav(), "nav"
+        if path == "/x/space/wbi/arc/search":
+            if "w_rid" not in query or "wts" not in query:
+                return 200, "application/json", b'{"code":-403,"message":"missing w_rid"}', "space"
+            return 200, "application/json", fixtures.space(int(query["mid"][0]), int(query["pn"][0]),
+                                                           int(query["ps"][0])), "space"
+        if path == "/x/v3/fav/resource/list":
+            return 200, "application/json", fixtures.favorites(int(query["media_id"][0]), int(query["pn"][0]),
+                                                               int(query["ps"][0])), "favorites"
+        m = _DANMAKU_RE.match(path)
+        if m:
+            return 200, "text/xml; charset=utf-8", fixtures.danmaku(int(m.group(1))), "danmaku"
+        if path.startswith("/bfs/"):
+            return 200, "image/jpeg", fixtures.cover, "cover"
+        if _MEDIA_RE.match(path):
+            return 200, "video/mp4", fixtures.media, "media"
+        return 404, "text/plain", b"not found", "not_found"
+
+    @staticmethod
+    def conditional(headers, body: bytes):
+        """
+        静态文件的条件请求与 Range 处理
+        :return: (状态码, 内容, 附加响应头)
+        """
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        extra = {"ETag": etag, "Last-Modified": _LAST_MODIFIED, "Accept-Ranges": "bytes"}
+        if headers.get("If-None-Match") == etag:
+            return 304, b"", extra
+        m = _RANGE_RE.match(headers.get("Range") or "")
+        # If-Range 与当前版本不一致时忽略 Range，返回完整内容
+        if m and headers.get("If-Range", etag) in (etag, _LAST_MODIFIED):
+            start = int(m.group(1))
+            if start >= len(body):
+                return 416, b"", {"Content-Range": f"bytes */{len(body)}"}
+            extra["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            return 206, body[start:], extra
+        return 200, body, extra
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # 响应头与响应体分两次发送，关闭 Nagle 避免与客户端延迟确认叠加出约 40ms 的等待
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def _respond(self, send_body: bool):
+                url = urlsplit(self.path)
+                status, content_type, body, name = server.route(url.path, parse_qs(url.query))
+                with server._lock:
+                    server.hits[name] += 1
+                extra = {}
+                if name in _STATIC_ROUTES and status == 200:
+                    status, body, extra = server.conditional(self.headers, body)
+                if name not in ("cover", "media"):
+                    if server.latency > 0:
+                        time.sleep(server.latency)
+                    if server._throttled(name):
+                        status, content_type, body = 412, "text/plain", b"throttled"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in extra.items():
+                    self.send_header(key, value)
+                truncate = server.truncate_body if name in _STATIC_ROUTES else 0
+                if truncate and send_body and len(body) > truncate:
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    self.wfile.write(body[:truncate])
+                    self.close_connection = True
+                    return
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                self._respond(True)
+
+            def do_HEAD(self):
+                self._respond(False)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地模拟 B 站服务（基准测试用）")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="网页与接口请求的附加延迟（秒）")
+    parser.add_argument("--throttle-every", type=int, default=0, help="每 N 个请求返回一次 412")
+    parser.add_argument("--page-size", type=int, default=300 * 1024, help="合成网页大小（字节）")
+    args = parser.parse_args()
+
+    mock = MockBilibiliServer(Fixtures(page_size=args.page_size), port=args.port,
+                              latency=args.latency, throttle_every=args.throttle_every)
+    print(f"[INFO] 模拟服务: {mock.base_url}（Ctrl+C 退出）")
+    print(f"[INFO] 示例: {mock.base_url}/video/{mock.fixtures.bvids(1)[0]}")
+    with mock:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,344 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+import queue
+import statistics
+import subprocess
+import multiprocessing
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows 下不统计峰值内存
+    resource = None
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # 未安装时跳过旧解析方式的对比
+    BeautifulSoup = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, "benchmarks", "results")
+
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from benchmarks.fixtures import Fixtures
+from benchmarks.mock_server import MockBilibiliServer
+
+# 对比时检查的指标：名称 -> 是否越大越好
+COMPARE_KEYS = {"seconds": False, "peak_rss_mb": False}
+
+
+# ---------- 各基准（在独立子进程中运行） ----------
+def _histogram_means(name: str) -> Dict[str, float]:
+    import metrics
+    totals = metrics.registry().histogram_totals(name)
+    return {",".join(v for _, v in labels) or "all": total / count
+            for labels, (count, total) in sorted(totals.items()) if count}
+
+
+_LEGACY_STATE_RE = re.compile(r"window\.__INITIAL_STATE__=(\{.*?\});")
+
+
+def _parse_scanner(page: bytes):
+    import initial_state_parser
+    video_data = initial_state_parser.extract_video_data(page)
+    initial_state_parser.extract_keywords(page)
+    return video_data
+
+
+def _parse_legacy(page: bytes):
+    """改用括号扫描前的解析方式（BeautifulSoup 构建 DOM + 非贪婪正则），仅用于对比"""
+    soup = BeautifulSoup(page.decode("utf-8"), "html.parser")
+    script = soup.find("script", string=re.compile(r"window\.__INITIAL_STATE__"))
+    soup.find("meta", itemprop="keywords")
+    if not script:
+        return None
+    match = _LEGACY_STATE_RE.search(script.string)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1)).get("videoData")
+    except ValueError:
+        # 非贪婪正则停在字符串内的 "};" 时截取的 JSON 不完整
+        return None
+
+
+def bench_parser(size: int, legacy: bool = False, min_seconds: float = 1.0) -> dict:
+    """
+    __INITIAL_STATE__.videoData 与 keywords 解析，size 为 0 时使用录制网页
+    legacy 为 True 时测量旧的 BeautifulSoup + 正则方式作为对比：计时使用文本中不含 "};" 的网页（旧方式能解析的情况），
+    另统计旧方式在常规网页上的解析失败数（nested_failures）
+    """
+    from benchmarks.fixtures import synthetic_bvids, synthetic_page
+
+    fixtures = Fixtures()
+    if size:
+        pages = [synthetic_page(bvid, "", size, nested_terminators=not legacy) for bvid in synthetic_bvids(5)]
+    else:
+        pages = [fixtures.page(bvid, "") for bvid in fixtures.recorded_bvids()]
+    parse = _parse_legacy if legacy else _parse_scanner
+    timings = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_seconds or len(timings) < 5:
+        for page in pages:
+            t = time.perf_counter()
+            ok = parse(page)
+            timings.append(time.perf_counter() - t)
+            if not ok:
+                raise RuntimeError("videoData 解析失败")
+    total_bytes = sum(len(p) for p in pages) * len(timings) / len(pages)
+    result = {
+        "seconds": statistics.median(timings),
+        "metrics": {"pages": len(pages), "page_kb": round(sum(len(p) for p in pages) / len(pages) / 1024, 1),
+                    "runs": len(timings), "p90_ms": sorted(timings)[int(len(timings) * 0.9)] * 1000,
+                    "mb_per_sec": total_bytes / sum(timings) / 1024 / 1024},
+    }
+    if legacy and size:
+        nested = [synthetic_page(bvid, "", size) for bvid in synthetic_bvids(5)]
+        result["metrics"]["nested_failures"] = sum(1 for page in nested if not _parse_legacy(page))
+    return result
+
+
+def bench_extract(base_url: str, count: int, api_first: bool) -> dict:
+    """BilibiliInfoExtractor.get_video_info 逐个提取（模拟服务）"""
+    import metrics
+    from info_extractor import BilibiliInfoExtractor
+    from rate_limiter import RequestScheduler
+
+    metrics.enable()
+    bvids = Fixtures().bvids(count)
+    extractor = BilibiliInfoExtractor(log=lambda s: None, api_first=api_first, scheduler=RequestScheduler(rate=0),
+                                      web_base=base_url, api_base=base_url, comment_base=base_url)
+    start = time.perf_counter()
+    failed = sum(1 for bvid in bvids if not extractor.get_video_info(bvid))
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "metrics": {"videos": count, "failed": failed, "videos_per_sec": count / seconds,
+                    "step_mean_ms": {k: v * 1000 for k, v in _histogram_means("bili_video_info_step_seconds").items()},
+                    "request_mean_ms": {k: v * 1000 for k, v in
+                                        _histogram_means("bili_http_request_duration_seconds").items()}},
+    }
+
+
+def bench_e2e(base_url: str, count: int, concurrent: bool, work_dir: str) -> dict:
+    """run_extraction 端到端：信息提取、Excel 写入、封面、弹幕、视频（yt-dlp）与音频"""
+    import metrics
+    from info_start import run_extraction
+
+    metrics.enable()
+    snapshots = []
+    start = time.perf_counter()
+    run_extraction(
+        excel_path=os.path.join(work_dir, "output.xlsx"),
+        output_dir=os.path.join(work_dir, "output"),
+        log=lambda s: None,
+        concurrent=concurrent,
+        requests_per_second=0,
+        bvids=Fixtures().bvids(count),
+        progress=snapshots.append,
+        progress_interval=3600,
+        web_base=base_url, api_base=base_url, comment_base=base_url,
+    )
+    seconds = time.perf_counter() - start
+    final = snapshots[-1]
+    stage_means = {k: v * 1000 for k, v in _histogram_means("bili_stage_seconds").items()}
+    stage_means.update({f"metadata:{k}": v * 1000 for k, v in _histogram_means("bili_video_info_seconds").items()})
+    return {
+        "seconds": seconds,
+        "metrics": {"videos": count, "videos_per_min": count / seconds * 60, "bytes": final["bytes"],
+                    "stages": {s: {"done": c["done"], "failed": c["failed"]} for s, c in final["stages"].items()},
+                    "stage_mean_ms": stage_means,
+                    "excel_save_ms": {k: v * 1000 for k, v in _histogram_means("bili_excel_save_seconds").items()}},
+    }
+
+
+def bench_excel(rows: int, work_dir: str) -> dict:
+    """ExcelWriter 追加 rows 行并保存（每卷 2 万行）"""
+    from info_data import ExcelWriter, build_row, excel_parts, init_excel
+    from benchmarks.fixtures import synthetic_bvids, synthetic_view
+
+    path = os.path.join(work_dir, "output.xlsx")
+    init_excel(path)
+    infos = []
+    for bvid in synthetic_bvids(100):
+        data = synthetic_view(bvid)["data"]
+        infos.append({"title": data["title"], "url": f"https://www.bilibili.com/video/{bvid}",
+                      "author": data["owner"]["name"], "author_id": str(data["owner"]["mid"]),
+                      "views": data["stat"]["view"], "likes": data["stat"]["like"], "duration": data["duration"],
+                      "video_desc": data["desc"], "tags": "标签0,标签1", "video_aid": str(data["aid"])})
+    start = time.perf_counter()
+    writer = ExcelWriter(path, part_rows=20000)
+    for i in range(rows):
+        writer.append_row(build_row(infos[i % len(infos)]))
+    writer.close()
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "metrics": {"rows": rows, "rows_per_sec": rows / seconds, "parts": len(excel_parts(path)),
+                    "file_mb": sum(os.path.getsize(p) for p in excel_parts(path)) / 1024 / 1024},
+    }
+
+
+# ---------- 子进程执行 ----------
+def _child(func: Callable, kwargs: dict, result_queue, quiet: bool):
+    if quiet:
+        # yt-dlp 等直接输出到终端，基准运行时丢弃
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+    try:
+        result = func(**kwargs)
+        if resource is not None:
+            # Linux 下 ru_maxrss 单位为 KB，macOS 为字节
+            scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+            result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+        result_queue.put(result)
+    except Exception as e:
+        result_queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_case(name: str, func: Callable, kwargs: dict, quiet: bool = True, log=print) -> dict:
+    """在新的子进程中运行一个基准，峰值内存只包含该基准本身"""
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    with tempfile.TemporaryDirectory(prefix="bili-bench-") as work_dir:
+        if "work_dir" in func.__code__.co_varnames[:func.__code__.co_argcount]:
+            kwargs = dict(kwargs, work_dir=work_dir)
+        process = ctx.Process(target=_child, args=(func, kwargs, result_queue, quiet))
+        process.start()
+        result = None
+        while result is None:
+            try:
+                result = result_queue.get(timeout=1)
+            except queue.Empty:
+                if not process.is_alive():
+                    result = {"error": f"子进程意外退出（退出码 {process.exitcode}）"}
+        process.join()
+    params = {k: v for k, v in kwargs.items() if k not in ("base_url", "work_dir")}
+    result = {"name": name, "params": params, **result}
+    if "error" in result:
+        log(f"[ERROR] {name}: {result['error']}")
+    else:
+        rss = result.get("peak_rss_mb")
+        log(f"[BENCH] {name}: {result['seconds']:.4f} s" + (f", 峰值内存 {rss:.0f} MB" if rss else ""))
+    return result
+
+
+def build_cases(suites: List[str], quick: bool, base_url: str) -> List[tuple]:
+    cases = []
+    if "parser" in suites:
+        sizes = [(f"{size // 1024}kb", size) for size in (300 * 1024, 1200 * 1024)]
+        if Fixtures().recorded_bvids():
+            sizes.append(("recorded", 0))
+        for label, size in sizes:
+            cases.append((f"parser/{label}", bench_parser, {"size": size}))
+            if BeautifulSoup is not None:
+                cases.append((f"parser/{label}/legacy", bench_parser, {"size": size, "legacy": True}))
+    if "extract" in suites:
+        count = 50 if quick else 200
+        cases.append(("extract/html", bench_extract, {"base_url": base_url, "count": count, "api_first": False}))
+        cases.append(("extract/api_first", bench_extract, {"base_url": base_url, "count": count, "api_first": True}))
+    if "e2e" in suites:
+        count = 10 if quick else 50
+        cases.append(("e2e/sequential", bench_e2e, {"base_url": base_url, "count": count, "concurrent": False}))
+        cases.append(("e2e/concurrent", bench_e2e, {"base_url": base_url, "count": count, "concurrent": True}))
+    if "excel" in suites:
+        for rows in ((1000, 10000) if quick else (1000, 10000, 100000)):
+            cases.append((f"excel/{rows}", bench_excel, {"rows": rows}))
+    return cases
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": shutil.which("ffmpeg") is not None,
+    }
+
+
+# ---------- 结果对比 ----------
+def compare(baseline: dict, current: dict, threshold: float = 0.1, log=print) -> List[str]:
+    """
+    与之前的结果逐项对比，变差超过 threshold（比例）的记为回归
+    :return: 回归项说明
+    """
+    old = {r["name"]: r for r in baseline.get("results", []) if "error" not in r}
+    regressions = []
+    for result in current.get("results", []):
+        before = old.get(result["name"])
+        if before is None or "error" in result:
+            continue
+        for key, higher_better in COMPARE_KEYS.items():
+            a, b = before.get(key), result.get(key)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            worse = -change if higher_better else change
+            mark = "回归" if worse > threshold else ("改善" if worse < -threshold else "持平")
+            log(f"[COMPARE] {result['name']} {key}: {a:.4g} -> {b:.4g} ({change:+.1%}) {mark}")
+            if worse > threshold:
+                regressions.append(f"{result['name']} {key} {change:+.1%}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="离线基准测试：本地模拟 B 站服务，结果输出为 JSON")
+    parser.add_argument("suites", nargs="*", default=["parser", "extract", "e2e", "excel"],
+                        help="要运行的基准：parser / extract / e2e / excel（默认全部）")
+    parser.add_argument("--quick", action="store_true", help="缩小规模（Excel 不含 10 万行）")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟服务的附加延迟（秒）")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 benchmarks/results/bench-时间.json")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比，存在回归时返回码为 1")
+    parser.add_argument("--threshold", type=float, default=0.1, help="判定回归的变化比例")
+    parser.add_argument("--record", nargs="+", metavar="BVID", help="录制真实响应到 benchmarks/fixtures 后退出")
+    parser.add_argument("--verbose", action="store_true", help="显示基准运行中的输出")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        from benchmarks.fixtures import record
+        return 0 if record(args.record) else 1
+
+    with MockBilibiliServer(latency=args.latency) as mock:
+        cases = build_cases(args.suites, args.quick, mock.base_url)
+        mock.preload(mock.fixtures.bvids(max([kwargs.get("count", 0) for _, _, kwargs in cases] or [0])))
+        results = [run_case(name, func, kwargs, quiet=not args.verbose) for name, func, kwargs in cases]
+        hits = dict(mock.hits)
+    report = {"environment": dict(environment(), quick=args.quick, latency=args.latency, server_hits=hits),
+              "results": results}
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[INFO] 结果已保存: {output}")
+
+    failed = any("error" in r for r in results)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"[WARN] 发现 {len(regressions)} 项回归: {'; '.join(regressions)}")
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
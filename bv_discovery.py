@@ -0,0 +1,292 @@
+import time
+import hashlib
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import requests
+
+from http_client import HttpClient
+from info_extractor import API_BASE
+from rate_limiter import RequestScheduler, ThrottledError
+
+# WBI 签名用的混淆表（接口要求对 img_key + sub_key 重排后取前 32 位）
+_MIXIN_KEY_ENC_TAB = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52,
+]
+_WBI_KEY_TTL = 3600
+
+
+class DiscoveryClient:
+    """
+    BV 号发现使用的 API 客户端：共用连接池、WBI 签名、按 api 类别限速，
+    被限流时按调度器的退避策略重试
+    """
+    def __init__(self, scheduler: Optional[RequestScheduler] = None, api_base: str = API_BASE,
+                 pool_size: int = 8, timeout: float = 10):
+        """
+        :param scheduler: 可选的请求调度器，分页请求计入 api 类别
+        :param api_base: API 地址（测试时可指向本地服务）
+        :param pool_size: 连接池大小
+        :param timeout: 请求超时（秒）
+        """
+        self.scheduler = scheduler
+        self.api_base = api_base
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HttpClient.BASE_HEADERS)
+        self.session.headers["Referer"] = "https://www.bilibili.com/"
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._wbi_lock = threading.Lock()
+        self._mixin_key = None
+        self._mixin_key_at = 0.0
+
+    def _request(self, path: str, params: dict) -> dict:
+        if self.scheduler is not None:
+            self.scheduler.acquire("api")
+        resp = self.session.get(f"{self.api_base}{path}", params=params, timeout=self.timeout)
+        payload = None
+        try:
+            payload = resp.json()
+        except ValueError:
+            pass
+        if self.scheduler is not None:
+            self.scheduler.check_response("api", resp.status_code, payload.get("code") if payload else None,
+                                          elapsed=resp.elapsed.total_seconds())
+        resp.raise_for_status()
+        if not payload or payload.get("code") != 0:
+            raise RuntimeError(f"接口返回错误 {path}: {payload.get('message') if payload else resp.text[:100]}")
+        return payload.get("data") or {}
+
+    def get_json(self, path: str, params: dict, signed: bool = False) -> dict:
+        """
+        请求 JSON 接口并返回 data，被限流时退避重试
+        :param signed: 是否附加 WBI 签名
+        """
+        attempt = 0
+        while True:
+            try:
+                return self._request(path, self.sign(params) if signed else params)
+            except ThrottledError:
+                if self.scheduler is None or attempt >= self.scheduler.max_retries:
+                    raise
+                time.sleep(self.scheduler.backoff(attempt))
+                attempt += 1
+
+    def _get_mixin_key(self) -> str:
+        with self._wbi_lock:
+            if self._mixin_key and time.monotonic() - self._mixin_key_at < _WBI_KEY_TTL:
+                return self._mixin_key
+            # nav 接口未登录时 code 为 -101，但仍返回 wbi_img
+            if self.scheduler is not None:
+                self.scheduler.acquire("api")
+            resp = self.session.get(f"{self.api_base}/x/web-interface/nav", timeout=self.timeout)
+            resp.raise_for_status()
+            wbi_img = (resp.json().get("data") or {}).get("wbi_img") or {}
+            img_key = wbi_img.get("img_url", "").rsplit("/", 1)[-1].split(".")[0]
+            sub_key = wbi_img.get("sub_url", "").rsplit("/", 1)[-1].split(".")[0]
+            orig = img_key + sub_key
+            if len(orig) < 64:
+                raise RuntimeError("未获取到 WBI 签名密钥")
+            self._mixin_key = "".join(orig[i] for i in _MIXIN_KEY_ENC_TAB)[:32]
+            self._mixin_key_at = time.monotonic()
+            return self._mixin_key
+
+    def sign(self, params: dict) -> dict:
+        """为请求参数附加 wts 与 w_rid"""
+        signed = dict(params, wts=int(time.time()))
+        signed = {k: "".join(c for c in str(v) if c not in "!'()*") for k, v in sorted(signed.items())}
+        query = urlencode(signed)
+        signed["w_rid"] = hashlib.md5((query + self._get_mixin_key()).encode("utf-8")).hexdigest()
+        return signed
+
+    def close(self):
+        self.session.close()
+
+
+class DiscoverySource(ABC):
+    """
+    BV 号来源基类，子类实现 fetch_page
+    iter_bvids 提前并发请求后续分页（预取窗口），调用方消费当前页的同时后续页已在下载
+    """
+    name = "source"
+
+    @abstractmethod
+    def fetch_page(self, client: DiscoveryClient, pn: int) -> Tuple[List[str], bool, Optional[int]]:
+        """
+        获取第 pn 页（从 1 开始）
+        :return: (本页 BV 号, 是否还有下一页, 总页数（未知时为 None）)
+        """
+
+    def iter_bvids(self, client: DiscoveryClient, prefetch: int = 3) -> Iterator[str]:
+        prefetch = max(1, prefetch)
+        last_page = None
+        next_pn = 1
+        window = deque()
+        with ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix=f"discover-{self.name}") as pool:
+            try:
+                while True:
+                    # 总页数未知时逐页请求，拿到总页数后再按窗口预取
+                    limit = prefetch if last_page is not None else 1
+                    while len(window) < limit and (last_page is None or next_pn <= last_page):
+                        window.append(pool.submit(self.fetch_page, client, next_pn))
+                        next_pn += 1
+                    if not window:
+                        return
+                    bvids, has_more, pages = window.popleft().result()
+                    if pages is not None:
+                        last_page = pages
+                    yield from bvids
+                    if not has_more:
+                        return
+            finally:
+                for future in window:
+                    future.cancel()
+
+
+class UploaderSource(DiscoverySource):
+    """UP 主空间的全部投稿（mid 即视频信息中的 author_id）"""
+    name = "space"
+
+    def __init__(self, mid: int, order: str = "pubdate", page_size: int = 50):
+        """
+        :param mid: UP 主 mid
+        :param order: 排序方式 pubdate（最新发布）/ click（最多播放）/ stow（最多收藏）
+        :param page_size: 每页条数（接口上限 50）
+        """
+        self.mid = mid
+        self.order = order
+        self.page_size = page_size
+
+    def fetch_page(self, client, pn):
+        data = client.get_json("/x/space/wbi/arc/search",
+                               {"mid": self.mid, "ps": self.page_size, "pn": pn, "order": self.order},
+                               signed=True)
+        vlist = (data.get("list") or {}).get("vlist") or []
+        count = (data.get("page") or {}).get("count", 0)
+        pages = max(1, -(-count // self.page_size))
+        return [v["bvid"] for v in vlist if v.get("bvid")], pn < pages, pages
+
+
+class FavoritesSource(DiscoverySource):
+    """收藏夹中的视频（media_id 为收藏夹 ID）"""
+    name = "fav"
+
+    def __init__(self, media_id: int, page_size: int = 20):
+        """
+        :param media_id: 收藏夹 ID
+        :param page_size: 每页条数（接口上限 20）
+        """
+        self.media_id = media_id
+        self.page_size = page_size
+
+    def fetch_page(self, client, pn):
+        data = client.get_json("/x/v3/fav/resource/list",
+                               {"media_id": self.media_id, "ps": self.page_size, "pn": pn, "platform": "web"})
+        medias = data.get("medias") or []
+        count = (data.get("info") or {}).get("media_count")
+        pages = max(1, -(-count // self.page_size)) if count is not None else None
+        # 收藏夹中可能有番剧等非普通视频（type != 2），只保留视频
+        bvids = [m.get("bvid") or m.get("bv_id") for m in medias if m.get("type", 2) == 2]
+        return [b for b in bvids if b], bool(data.get("has_more")), pages
+
+
+class SearchSource(DiscoverySource):
+    """视频搜索结果"""
+    name = "search"
+
+    def __init__(self, keyword: str, order: str = "totalrank", max_pages: int = 50):
+        """
+        :param keyword: 搜索关键词
+        :param order: 排序方式 totalrank / click / pubdate / dm / stow
+        :param max_pages: 最多获取的页数（接口最多返回 50 页）
+        """
+        self.keyword = keyword
+        self.order = order
+        self.max_pages = max_pages
+
+    def fetch_page(self, client, pn):
+        data = client.get_json("/x/web-interface/wbi/search/type",
+                               {"search_type": "video", "keyword": self.keyword, "order": self.order, "page": pn},
+                               signed=True)
+        results = data.get("result") or []
+        pages = min(self.max_pages, data.get("numPages") or 1)
+        return [r["bvid"] for r in results if r.get("bvid")], pn < pages, pages
+
+
+def discover(sources: Iterable[DiscoverySource], client: Optional[DiscoveryClient] = None,
+             prefetch: int = 3, log: Optional[Callable[[str], None]] = None,
+             scheduler: Optional[RequestScheduler] = None, api_base: str = API_BASE) -> Iterator[str]:
+    """
+    依次枚举各来源的 BV 号并去重，逐个产出，可直接作为 run_extraction 的 bvids 参数
+    :param client: 共用的 API 客户端，默认新建（使用 scheduler 与 api_base）
+    :param prefetch: 每个来源同时预取的分页数
+    :param scheduler: 新建客户端时使用的请求调度器，默认新建，预取的分页请求也受限速与退避保护
+    :param api_base: 新建客户端时使用的 API 地址（测试时可指向本地服务）
+    """
+    logger = log or (lambda s: print(s, flush=True))
+    own_client = client is None
+    if own_client:
+        client = DiscoveryClient(scheduler=scheduler or RequestScheduler(), api_base=api_base)
+    seen = set()
+    try:
+        for source in sources:
+            found = 0
+            try:
+                for bvid in source.iter_bvids(client, prefetch):
+                    if bvid in seen:
+                        continue
+                    seen.add(bvid)
+                    found += 1
+                    yield bvid
+            except Exception as e:
+                logger(f"[ERROR] 获取 {source.name} 来源的 BV 号失败: {e}")
+            logger(f"[DISCOVER] {source.name} 来源共发现 {found} 个新视频")
+    finally:
+        if own_client:
+            client.close()
+
+
+def build_sources(mids: Iterable[int] = (), favorites: Iterable[int] = (),
+                  keywords: Iterable[str] = ()) -> List[DiscoverySource]:
+    return ([UploaderSource(int(m)) for m in mids]
+            + [FavoritesSource(int(f)) for f in favorites]
+            + [SearchSource(k) for k in keywords])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="从 UP 主空间、收藏夹、搜索结果批量获取 BV 号")
+    parser.add_argument("--mid", action="append", default=[], help="UP 主 mid，可重复")
+    parser.add_argument("--fav", action="append", default=[], help="收藏夹 media_id，可重复")
+    parser.add_argument("--search", action="append", default=[], help="搜索关键词，可重复")
+    parser.add_argument("--append-to", help="追加写入 BV 号列表文件（跳过已存在的 BV 号），默认输出到屏幕")
+    parser.add_argument("--extract", action="store_true", help="直接开始提取，不写入列表文件")
+    args = parser.parse_args()
+
+    found = discover(build_sources(args.mid, args.fav, args.search))
+    if args.extract:
+        from info_start import run_extraction
+        run_extraction(bvids=found)
+    elif args.append_to:
+        existing = set()
+        try:
+            with open(args.append_to, "r", encoding="utf-8") as f:
+                existing = {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            pass
+        with open(args.append_to, "a", encoding="utf-8") as f:
+            for bvid in found:
+                if bvid not in existing:
+                    f.write(bvid + "\n")
+    else:
+        for bvid in found:
+            print(bvid)
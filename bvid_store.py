@@ -0,0 +1,326 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# av 号与 BV 号互转参数
+_XOR_CODE = 23442827791579
+_MASK_CODE = 2251799813685247
+_MAX_AID = 1 << 51
+_BASE = 58
+_TABLE = "FcwAPNKTMug3GV5Lj7EJnHpWsx4tb8haYeviqBz6rkCy12mUSDQX9RdoZf"
+_TABLE_INDEX = {c: i for i, c in enumerate(_TABLE)}
+
+_BV_RE = re.compile(r"BV1[0-9A-Za-z]{9}")
+_AV_RE = re.compile(r"(?:^|[^0-9A-Za-z])av(\d+)", re.I)
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# 变更记录保留条数，超出后删除最早的记录
+_CHANGE_LOG_KEEP = 100000
+
+
+def av_to_bv(aid: int) -> str:
+    chars = ["B", "V", "1", "0", "0", "0", "0", "0", "0", "0", "0", "0"]
+    idx = len(chars) - 1
+    tmp = (_MAX_AID | aid) ^ _XOR_CODE
+    while tmp > 0:
+        chars[idx] = _TABLE[tmp % _BASE]
+        tmp //= _BASE
+        idx -= 1
+    chars[3], chars[9] = chars[9], chars[3]
+    chars[4], chars[7] = chars[7], chars[4]
+    return "".join(chars)
+
+
+def bv_to_av(bvid: str) -> int:
+    chars = list(bvid)
+    chars[3], chars[9] = chars[9], chars[3]
+    chars[4], chars[7] = chars[7], chars[4]
+    tmp = 0
+    for c in chars[3:]:
+        tmp = tmp * _BASE + _TABLE_INDEX[c]
+    return (tmp & _MASK_CODE) ^ _XOR_CODE
+
+
+def normalize_bvid(text: str) -> Optional[str]:
+    """
+    将用户输入规范为 BV 号：支持 BV 号、视频链接（含查询参数）、av 号（如 av170001）
+    :return: BV 号，无法识别时返回 None
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    m = _BV_RE.search(text)
+    if m:
+        return m.group(0)
+    m = _AV_RE.search(text)
+    if m:
+        aid = int(m.group(1))
+        if 0 < aid < _MAX_AID:
+            return av_to_bv(aid)
+    return None
+
+
+class BvidStore:
+    """
+    BV 号列表存储（SQLite）：BV 号唯一索引（O(1) 判重）、保持添加顺序、记录每个 BV 号的处理状态，
+    并保存变更记录供界面增量刷新
+    旧的 BVID_list.txt 作为导入来源，文件有变化时按与上次导入的差异同步：
+    新增的行导入，删除的行从列表中移除；在界面中删除的 BV 号只要 txt 中对应行未重新添加就不会再次导入
+    """
+    def __init__(self, db_path: str, import_txt: Optional[str] = None):
+        """
+        :param db_path: 数据库路径
+        :param import_txt: 可选的 BVID_list.txt，内容变化时导入其中的新 BV 号
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, List[str]], None]] = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bvid_list ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " bvid TEXT NOT NULL UNIQUE,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " error TEXT,"
+            " added_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bvid_list_status ON bvid_list(status)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS change_log ("
+            " version INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " bvid TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        # 上次同步时 txt 中的 BV 号，用于计算 txt 的增删
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS txt_snapshot ("
+            " path TEXT NOT NULL,"
+            " bvid TEXT NOT NULL,"
+            " PRIMARY KEY (path, bvid))"
+        )
+        self._conn.commit()
+        if import_txt:
+            self.sync_txt(import_txt)
+
+    # ---------- 变更通知 ----------
+    def subscribe(self, callback: Callable[[str, List[str]], None]):
+        """注册同进程内的变更回调 callback(类型 add/remove/status, [BV号])"""
+        self._listeners.append(callback)
+
+    def _notify(self, kind: str, bvids: List[str]):
+        if not bvids:
+            return
+        for callback in list(self._listeners):
+            callback(kind, bvids)
+
+    def _log_changes_locked(self, kind: str, bvids: List[str]):
+        self._conn.executemany("INSERT INTO change_log (kind, bvid) VALUES (?, ?)", [(kind, b) for b in bvids])
+
+    def version(self) -> int:
+        """当前变更版本号"""
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(MAX(version), 0) FROM change_log").fetchone()
+        return row[0]
+
+    def changes_since(self, version: int, limit: int = 10000) -> List[Tuple[int, str, str]]:
+        """
+        返回版本号之后的变更 [(版本号, 类型, BV号)]，可跨进程轮询（如界面查看提取进程写入的状态）
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT version, kind, bvid FROM change_log WHERE version > ? ORDER BY version LIMIT ?",
+                (version, limit)
+            ).fetchall()
+
+    def _trim_change_log_locked(self):
+        self._conn.execute(
+            "DELETE FROM change_log WHERE version <= (SELECT MAX(version) FROM change_log) - ?",
+            (_CHANGE_LOG_KEEP,)
+        )
+
+    # ---------- 增删 ----------
+    def __contains__(self, bvid: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM bvid_list WHERE bvid = ?", (bvid,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def add(self, text: str) -> Optional[str]:
+        """
+        添加单个 BV 号（自动规范化）
+        :return: 新增的 BV 号；无法识别或已存在时返回 None
+        """
+        added, _ = self.add_many([text])
+        return added[0] if added else None
+
+    def add_many(self, items: Iterable[str]) -> Tuple[List[str], int]:
+        """
+        批量导入（自动规范化、去重），单个事务写入
+        :return: (新增的 BV 号, 无法识别或重复的条数)
+        """
+        now = time.time()
+        added, skipped = [], 0
+        with self._lock:
+            for text in items:
+                bvid = normalize_bvid(text)
+                if bvid is None:
+                    skipped += 1
+                    continue
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO bvid_list (bvid, added_at, updated_at) VALUES (?, ?, ?)",
+                    (bvid, now, now)
+                )
+                if cur.rowcount:
+                    added.append(bvid)
+                else:
+                    skipped += 1
+            self._log_changes_locked("add", added)
+            self._trim_change_log_locked()
+            self._conn.commit()
+        self._notify("add", added)
+        return added, skipped
+
+    def remove_many(self, bvids: Iterable[str]) -> int:
+        """删除 BV 号，返回实际删除的条数"""
+        bvids = list(bvids)
+        with self._lock:
+            removed = [b for b in bvids
+                       if self._conn.execute("DELETE FROM bvid_list WHERE bvid = ?", (b,)).rowcount]
+            self._log_changes_locked("remove", removed)
+            self._conn.commit()
+        self._notify("remove", removed)
+        return len(removed)
+
+    def set_status(self, bvid: str, status: str, error: Optional[str] = None):
+        """记录 BV 号的处理状态（pending / done / failed）"""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE bvid_list SET status = ?, error = ?, updated_at = ? WHERE bvid = ?",
+                (status, error, time.time(), bvid)
+            )
+            if cur.rowcount:
+                self._log_changes_locked("status", [bvid])
+            self._conn.commit()
+        if cur.rowcount:
+            self._notify("status", [bvid])
+
+    # ---------- 查询 ----------
+    def count(self, keyword: Optional[str] = None, status: Optional[str] = None) -> int:
+        sql, params = self._where(keyword, status)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM bvid_list{sql}", params).fetchone()[0]
+
+    @staticmethod
+    def _where(keyword: Optional[str], status: Optional[str]):
+        clauses, params = [], []
+        if keyword:
+            clauses.append("bvid LIKE ? ESCAPE '\\'")
+            escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def page(self, offset: int, limit: int, keyword: Optional[str] = None,
+             status: Optional[str] = None) -> List[Tuple[str, str, Optional[str]]]:
+        """按添加顺序分页读取 [(BV号, 状态, 错误信息)]，keyword 为 BV 号子串（不区分大小写）"""
+        sql, params = self._where(keyword, status)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT bvid, status, error FROM bvid_list{sql} ORDER BY id LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+
+    def get(self, bvid: str) -> Optional[Tuple[str, Optional[str]]]:
+        """返回 (状态, 错误信息)，不存在时返回 None"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT status, error FROM bvid_list WHERE bvid = ?", (bvid,)
+            ).fetchone()
+
+    def iter_bvids(self, status: Optional[str] = None, batch: int = 5000) -> Iterator[str]:
+        """按添加顺序逐个产出 BV 号（分批读取，不一次性载入全部）"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, bvid FROM bvid_list WHERE id > ?"
+                    + (" AND status = ?" if status else "") + " ORDER BY id LIMIT ?",
+                    (last_id, status, batch) if status else (last_id, batch)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            for _, bvid in rows:
+                yield bvid
+
+    def all_bvids(self) -> List[str]:
+        return list(self.iter_bvids())
+
+    # ---------- BVID_list.txt ----------
+    def sync_txt(self, txt_path: str) -> int:
+        """
+        BVID_list.txt 修改时间变化时与上次同步的内容比较（文件只作为导入来源，不会被改写）：
+        自上次同步后新增的行导入，被删除的行从列表中移除；未变化的行不再导入，
+        因此在界面中删除的 BV 号不会因为 txt 的其他修改而恢复
+        :return: 新增条数
+        """
+        if not os.path.exists(txt_path):
+            return 0
+        path = os.path.abspath(txt_path)
+        mtime = str(os.path.getmtime(txt_path))
+        key = f"txt_mtime:{path}"
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            previous = {b for (b,) in self._conn.execute("SELECT bvid FROM txt_snapshot WHERE path = ?", (path,))}
+        if row is not None and row[0] == mtime:
+            return 0
+        with open(txt_path, "r", encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        current = {b for b in map(normalize_bvid, lines) if b is not None}
+
+        # 首次同步（含旧版本只记录了修改时间的数据库）没有快照，导入全部行
+        added, _ = self.add_many(line for line in lines if normalize_bvid(line) not in previous)
+        self.remove_many(sorted(previous - current))
+        with self._lock:
+            self._conn.execute("DELETE FROM txt_snapshot WHERE path = ?", (path,))
+            self._conn.executemany("INSERT INTO txt_snapshot VALUES (?, ?)", [(path, b) for b in current])
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, mtime))
+            self._conn.commit()
+        return len(added)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def store_path_for(list_path: str) -> str:
+    """BV 号列表对应的数据库路径：BVID_list.txt -> BVID_list.db，已是 .db 时原样返回"""
+    root, ext = os.path.splitext(list_path)
+    return list_path if ext == ".db" else root + ".db"
+
+
+def open_bvid_store(list_path: str) -> BvidStore:
+    """
+    打开 BV 号列表存储
+    :param list_path: BVID_list.txt 或 .db 路径，传入 txt 时使用同名 .db 并自动导入 txt 中的新内容
+    """
+    db_path = store_path_for(list_path)
+    return BvidStore(db_path, import_txt=None if db_path == list_path else list_path)
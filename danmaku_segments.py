@@ -0,0 +1,192 @@
+import os
+import re
+import math
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+from xml.sax.saxutils import escape
+from http_client import HttpClient
+from info_extractor import API_BASE
+from rate_limiter import RequestScheduler
+
+# 分段弹幕接口，每段 6 分钟，segment_index 从 1 开始
+SEGMENT_PATH = "/x/v2/dm/web/seg.so"
+SEGMENT_SECONDS = 360
+
+# DanmakuElem 字段号
+_F_ID, _F_PROGRESS, _F_MODE, _F_FONTSIZE, _F_COLOR, _F_MID_HASH, _F_CONTENT, _F_CTIME, _F_POOL = \
+    1, 2, 3, 4, 5, 6, 7, 8, 11
+# XML 1.0 不允许的控制字符
+_INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def segment_count(duration: int) -> int:
+    """根据视频时长（秒）计算分段数，时长未知时至少请求 1 段"""
+    return max(1, math.ceil((duration or 0) / SEGMENT_SECONDS))
+
+
+def _read_varint(buf: bytes, pos: int):
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _skip_field(buf: bytes, pos: int, wire_type: int) -> int:
+    if wire_type == 0:
+        return _read_varint(buf, pos)[1]
+    if wire_type == 1:
+        return pos + 8
+    if wire_type == 2:
+        length, pos = _read_varint(buf, pos)
+        return pos + length
+    if wire_type == 5:
+        return pos + 4
+    raise ValueError(f"不支持的 protobuf wire type: {wire_type}")
+
+
+def _decode_elem(buf: bytes, pos: int, end: int) -> tuple:
+    # 缺省字段按普通白色滚动弹幕处理
+    dmid = progress = ctime = pool = 0
+    mode, fontsize, color = 1, 25, 16777215
+    mid_hash = content = ""
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(buf, pos)
+            if field == _F_ID:
+                dmid = value
+            elif field == _F_PROGRESS:
+                progress = value
+            elif field == _F_MODE:
+                mode = value
+            elif field == _F_FONTSIZE:
+                fontsize = value
+            elif field == _F_COLOR:
+                color = value
+            elif field == _F_CTIME:
+                ctime = value
+            elif field == _F_POOL:
+                pool = value
+        elif wire_type == 2 and field in (_F_MID_HASH, _F_CONTENT):
+            length, pos = _read_varint(buf, pos)
+            text = buf[pos:pos + length].decode("utf-8", errors="replace")
+            pos += length
+            if field == _F_MID_HASH:
+                mid_hash = text
+            else:
+                content = text
+        else:
+            pos = _skip_field(buf, pos, wire_type)
+    return progress / 1000, mode, fontsize, color, ctime, pool, mid_hash, dmid, content
+
+
+def decode_segment(buf: bytes) -> List[tuple]:
+    """
+    解码一段 DmSegMobileReply，返回与 danmaku_store.iter_danmaku 相同格式的元组列表
+    (出现时间, 模式, 字号, 颜色, 发送时间戳, 弹幕池, 用户哈希, 弹幕ID, 文本)
+    """
+    records = []
+    pos = 0
+    size = len(buf)
+    while pos < size:
+        key, pos = _read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 7
+        if field == 1 and wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            records.append(_decode_elem(buf, pos, pos + length))
+            pos += length
+        else:
+            pos = _skip_field(buf, pos, wire_type)
+    return records
+
+
+def write_danmaku_xml(records: Iterator[tuple], path: str, cid: Optional[int] = None) -> int:
+    """
+    将弹幕记录写成与 comment.bilibili.com/{cid}.xml 相同结构的 XML（先写临时文件再替换）
+    :return: 写入条数
+    """
+    count = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?><i>'
+                f'<chatserver>chat.bilibili.com</chatserver><chatid>{cid or 0}</chatid>\n')
+        for t, mode, fontsize, color, ctime, pool, mid_hash, dmid, text in records:
+            f.write(f'<d p="{t:.5f},{mode},{fontsize},{color},{ctime},{pool},{escape(mid_hash)},{dmid}">'
+                    f'{escape(_INVALID_XML_RE.sub("", text))}</d>\n')
+            count += 1
+        f.write("</i>")
+    os.replace(tmp_path, path)
+    return count
+
+
+class DanmakuSegmentFetcher:
+    """
+    分段弹幕抓取：按视频时长计算分段数，多个分段并发请求（共用连接池），
+    返回完整历史弹幕，而不是 XML 接口的最近弹幕子集
+    """
+    def __init__(self, workers: int = 8, scheduler: Optional[RequestScheduler] = None,
+                 api_base: str = API_BASE, timeout: float = 15):
+        """
+        :param workers: 同一视频的分段并发请求数
+        :param scheduler: 可选的请求调度器，分段请求计入 segment 类别（独立限速，不与弹幕 XML 共用速率）
+        :param api_base: API 地址（测试时可指向本地服务）
+        :param timeout: 单个分段请求超时（秒）
+        """
+        self.workers = max(1, workers)
+        self.scheduler = scheduler
+        self.api_base = api_base
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HttpClient.BASE_HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="danmaku-seg")
+
+    def fetch_segment(self, cid: int, index: int, referer: Optional[str] = None) -> List[tuple]:
+        if self.scheduler is not None:
+            self.scheduler.acquire("segment")
+        resp = self.session.get(
+            f"{self.api_base}{SEGMENT_PATH}",
+            params={"type": 1, "oid": cid, "segment_index": index},
+            headers={"Referer": referer} if referer else None,
+            timeout=self.timeout,
+        )
+        if self.scheduler is not None:
+            self.scheduler.check_response("segment", resp.status_code, elapsed=resp.elapsed.total_seconds())
+        resp.raise_for_status()
+        records = decode_segment(resp.content)
+        records.sort(key=lambda r: r[0])
+        return records
+
+    def iter_danmaku(self, cid: int, duration: int, referer: Optional[str] = None) -> Iterator[tuple]:
+        """
+        按出现时间顺序逐条产出全部弹幕，分段并发下载、按段顺序产出
+        :param duration: 视频时长（秒），来自 get_video_info 的 duration
+        """
+        futures = [self._pool.submit(self.fetch_segment, cid, i, referer)
+                   for i in range(1, segment_count(duration) + 1)]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def fetch(self, cid: int, duration: int, referer: Optional[str] = None) -> List[tuple]:
+        return list(self.iter_danmaku(cid, duration, referer))
+
+    def download_xml(self, cid: int, duration: int, path: str, referer: Optional[str] = None) -> int:
+        """抓取全部分段并写成 danmaku.xml，返回弹幕条数"""
+        return write_danmaku_xml(self.iter_danmaku(cid, duration, referer), path, cid)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self.session.close()
@@ -0,0 +1,294 @@
+import os
+import time
+import sqlite3
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from typing import IO, Iterable, Iterator, Optional, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # 弹幕列式存储为可选功能
+    pa = None
+    pc = None
+    pq = None
+
+DANMAKU_FILE_NAME = "danmaku.parquet"
+INDEX_FILE_NAME = "danmaku_index.db"
+
+# <d p="出现时间,模式,字号,颜色,发送时间戳,弹幕池,用户哈希,弹幕ID[,权重]">文本</d>
+DANMAKU_COLUMNS = ("time", "mode", "fontsize", "color", "timestamp", "pool", "user_hash", "dmid", "text")
+
+
+def _schema():
+    return pa.schema([
+        ("time", pa.float32()),
+        ("mode", pa.int8()),
+        ("fontsize", pa.int8()),
+        ("color", pa.uint32()),
+        ("timestamp", pa.int64()),
+        ("pool", pa.int8()),
+        ("user_hash", pa.string()),
+        ("dmid", pa.int64()),
+        ("text", pa.string()),
+    ])
+
+
+def parse_p(p: str) -> tuple:
+    """
+    解析 p 属性
+    :return: (出现时间, 模式, 字号, 颜色, 发送时间戳, 弹幕池, 用户哈希, 弹幕ID)
+    """
+    f = p.split(",")
+    return (
+        float(f[0]),
+        int(f[1]),
+        int(f[2]),
+        int(f[3]),
+        int(f[4]),
+        int(f[5]) if len(f) > 5 else 0,
+        f[6] if len(f) > 6 else "",
+        int(f[7]) if len(f) > 7 and f[7].isdigit() else 0,
+    )
+
+
+def iter_danmaku(source: Union[str, IO[bytes]]) -> Iterator[tuple]:
+    """
+    流式解析弹幕 XML，逐条产出 DANMAKU_COLUMNS 顺序的元组，内存占用与文件大小无关
+    :param source: XML 文件路径或二进制文件对象
+    """
+    context = ET.iterparse(source, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end" or elem.tag != "d":
+            continue
+        p = elem.get("p")
+        if p:
+            try:
+                yield (*parse_p(p), elem.text or "")
+            except (ValueError, IndexError):
+                pass
+        # 丢弃已处理的元素，避免整棵树驻留内存
+        root.clear()
+
+
+class DanmakuStore:
+    """
+    弹幕列式存储：每个视频一个 Parquet 文件（output/{bvid}/danmaku.parquet），
+    全局 SQLite 索引记录各视频的条数、时长与发送时间范围，
+    query 按时间窗口与关键词筛选，Parquet 按 row group 过滤，只读取需要的数据
+    """
+    def __init__(self, root_dir: str, index_path: Optional[str] = None, batch_rows: int = 50000):
+        """
+        :param root_dir: 输出根目录（各 BV 号子文件夹所在目录）
+        :param index_path: 全局索引数据库路径，默认 root_dir/danmaku_index.db
+        :param batch_rows: 每个 row group 的弹幕条数，决定解析时的内存上限
+        """
+        if pa is None:
+            raise ImportError("弹幕列式存储需要安装 pyarrow: pip install pyarrow")
+        self.root_dir = root_dir
+        self.batch_rows = batch_rows
+        self.schema = _schema()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(index_path or os.path.join(root_dir, INDEX_FILE_NAME),
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS danmaku_index ("
+            " bvid TEXT PRIMARY KEY,"
+            " path TEXT NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " max_time REAL,"
+            " first_ts INTEGER,"
+            " last_ts INTEGER,"
+            " source_mtime REAL NOT NULL,"
+            " indexed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _write_batch(self, writer, rows):
+        columns = list(zip(*rows))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+
+    def ingest(self, bvid: str, xml_path: Optional[str] = None, force: bool = False) -> int:
+        """
+        解析弹幕 XML 写入列式文件并更新索引，XML 未变化时跳过
+        :param bvid: 索引键，单P视频为 bvid，多P视频为 bvid/p{n}
+        :param xml_path: 弹幕 XML 路径，默认 root_dir/{bvid}/danmaku.xml
+        :param force: 忽略修改时间强制重建
+        :return: 写入的弹幕条数，跳过时返回 -1
+        """
+        xml_path = xml_path or os.path.join(self.root_dir, bvid, "danmaku.xml")
+        mtime = os.path.getmtime(xml_path)
+        if not force:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT source_mtime FROM danmaku_index WHERE bvid = ?", (bvid,)
+                ).fetchone()
+            if row is not None and row[0] == mtime:
+                return -1
+
+        out_path = os.path.join(os.path.dirname(xml_path), DANMAKU_FILE_NAME)
+        tmp_path = out_path + ".tmp"
+        count, max_time, first_ts, last_ts = 0, None, None, None
+        batch = []
+        with pq.ParquetWriter(tmp_path, self.schema, compression="zstd") as writer:
+            for item in iter_danmaku(xml_path):
+                batch.append(item)
+                count += 1
+                max_time = item[0] if max_time is None else max(max_time, item[0])
+                first_ts = item[4] if first_ts is None else min(first_ts, item[4])
+                last_ts = item[4] if last_ts is None else max(last_ts, item[4])
+                if len(batch) >= self.batch_rows:
+                    self._write_batch(writer, batch)
+                    batch = []
+            if batch:
+                self._write_batch(writer, batch)
+        os.replace(tmp_path, out_path)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO danmaku_index VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (bvid, out_path, count, max_time, first_ts, last_ts, mtime, time.time())
+            )
+            self._conn.commit()
+        return count
+
+    def ingest_tree(self, log: callable = None) -> int:
+        """扫描 root_dir 下全部 BV 子文件夹，补建缺失或过期的列式文件，返回处理的视频数"""
+        logger = log or (lambda s: print(s, flush=True))
+        done = 0
+        for name in sorted(os.listdir(self.root_dir)):
+            bv_dir = os.path.join(self.root_dir, name)
+            if not os.path.isdir(bv_dir):
+                continue
+            # 单P弹幕在 {bvid}/ 下，多P弹幕在 {bvid}/p{n}/ 下，索引键分别为 bvid 与 bvid/p{n}
+            targets = [(name, os.path.join(bv_dir, "danmaku.xml"))]
+            targets += [(f"{name}/{sub}", os.path.join(bv_dir, sub, "danmaku.xml"))
+                        for sub in sorted(os.listdir(bv_dir)) if sub.startswith("p") and sub[1:].isdigit()]
+            for key, xml_path in targets:
+                if not os.path.isfile(xml_path):
+                    continue
+                try:
+                    count = self.ingest(key, xml_path)
+                except (ET.ParseError, OSError) as e:
+                    logger(f"[ERROR] {key} 弹幕解析失败: {e}")
+                    continue
+                if count >= 0:
+                    done += 1
+                    logger(f"[Danmaku] {key} 已写入 {count} 条弹幕")
+        return done
+
+    def stats(self, bvid: str) -> Optional[dict]:
+        """返回某视频的索引信息（条数、最大出现时间、发送时间范围），未收录返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT count, max_time, first_ts, last_ts FROM danmaku_index WHERE bvid = ?", (bvid,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("count", "max_time", "first_ts", "last_ts"), row))
+
+    def _candidates(self, bvids: Optional[Iterable[str]], start: Optional[float],
+                    since: Optional[int], until: Optional[int]):
+        # 先用索引排除时间范围不可能命中的视频
+        sql = "SELECT bvid, path FROM danmaku_index WHERE count > 0"
+        params = []
+        if start is not None:
+            sql += " AND max_time >= ?"
+            params.append(start)
+        if since is not None:
+            sql += " AND last_ts >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND first_ts < ?"
+            params.append(until)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY bvid", params).fetchall()
+        if bvids is not None:
+            # 传入 bvid 时同时匹配其各分P（bvid/p{n}）
+            wanted = set(bvids)
+            rows = [r for r in rows if r[0] in wanted or r[0].split("/", 1)[0] in wanted]
+        return rows
+
+    def query_tables(self, bvids: Optional[Iterable[str]] = None, start: Optional[float] = None,
+                     end: Optional[float] = None, keyword: Optional[str] = None,
+                     since: Optional[int] = None, until: Optional[int] = None,
+                     columns: Optional[Iterable[str]] = None) -> Iterator["pa.Table"]:
+        """
+        逐个视频产出筛选结果（pyarrow.Table，附带 bvid 列），同一时间只加载一个视频的命中数据
+        :param bvids: 限定的索引键（bvid 或 bvid/p{n}），默认全部
+        :param start: 视频内出现时间下限（秒，含）
+        :param end: 视频内出现时间上限（秒，不含）
+        :param keyword: 弹幕文本包含的关键词
+        :param since: 发送时间戳下限（含）
+        :param until: 发送时间戳上限（不含）
+        :param columns: 需要返回的列，默认全部
+        """
+        filters = []
+        if start is not None:
+            filters.append(("time", ">=", start))
+        if end is not None:
+            filters.append(("time", "<", end))
+        if since is not None:
+            filters.append(("timestamp", ">=", since))
+        if until is not None:
+            filters.append(("timestamp", "<", until))
+        columns = list(columns) if columns else list(DANMAKU_COLUMNS)
+        read_columns = columns if keyword is None or "text" in columns else columns + ["text"]
+
+        for bvid, path in self._candidates(bvids, start, since, until):
+            if not os.path.exists(path):
+                continue
+            table = pq.read_table(path, columns=read_columns, filters=filters or None)
+            if keyword is not None and table.num_rows:
+                table = table.filter(pc.match_substring(table["text"], keyword))
+                table = table.select(columns)
+            if table.num_rows:
+                yield table.append_column("bvid", pa.array([bvid] * table.num_rows, pa.string()))
+
+    def query(self, *args, **kwargs) -> Iterator[dict]:
+        """与 query_tables 参数相同，逐条产出 dict"""
+        for table in self.query_tables(*args, **kwargs):
+            for batch in table.to_batches():
+                yield from batch.to_pylist()
+
+    def query_table(self, *args, **kwargs) -> "pa.Table":
+        """与 query_tables 参数相同，返回合并后的结果表（可 .to_pandas()）"""
+        tables = list(self.query_tables(*args, **kwargs))
+        if not tables:
+            columns = kwargs.get("columns") or DANMAKU_COLUMNS
+            return pa.schema([self.schema.field(c) for c in columns] + [("bvid", pa.string())]).empty_table()
+        return pa.concat_tables(tables)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="弹幕 XML 转列式存储与查询")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "output"),
+                        help="BV 子文件夹所在目录")
+    parser.add_argument("--bvid", action="append", help="只查询指定 BV 号，可重复")
+    parser.add_argument("--start", type=float, help="视频内出现时间下限（秒）")
+    parser.add_argument("--end", type=float, help="视频内出现时间上限（秒）")
+    parser.add_argument("--keyword", help="弹幕包含的关键词")
+    args = parser.parse_args()
+
+    with DanmakuStore(args.output) as store:
+        store.ingest_tree()
+        if args.bvid or args.start is not None or args.end is not None or args.keyword:
+            for item in store.query(bvids=args.bvid, start=args.start, end=args.end, keyword=args.keyword):
+                print(f"{item['bvid']}\t{item['time']:.1f}\t{item['text']}")
@@ -0,0 +1,162 @@
+import os
+import json
+import threading
+import requests
+from typing import Callable, Dict, Optional
+from http_client import HttpClient
+from rate_limiter import RequestScheduler
+
+# 每个输出目录下记录已下载文件的校验信息（ETag / Last-Modified / 大小）
+STATE_FILE_NAME = ".downloads.json"
+PART_SUFFIX = ".part"
+
+
+class FileDownloader:
+    """
+    封面、弹幕等小文件的通用下载器：
+    - 复用连接池会话
+    - 分块写入临时文件 (.part)，完成后原子替换
+    - 中断后用 Range 请求续传（If-Range 保证服务端文件未变化）
+    - 已存在的文件发送 If-None-Match / If-Modified-Since，304 时跳过
+    - 按 Content-Length 校验大小
+    """
+    def __init__(self, pool_size: int = 10, chunk_size: int = 64 * 1024, timeout: float = 15,
+                 scheduler: Optional[RequestScheduler] = None, log: callable = None,
+                 on_bytes: Optional[Callable[[int], None]] = None):
+        """
+        :param pool_size: 连接池大小
+        :param chunk_size: 每次写入磁盘的块大小（字节）
+        :param timeout: 连接/读取超时（秒）
+        :param scheduler: 可选的请求调度器，按 endpoint 限速并识别限流
+        :param log: 日志回调函数 log(str)
+        :param on_bytes: 可选的下载量回调 on_bytes(本次写入字节数)，用于进度统计
+        """
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.log = log or (lambda s: print(s, flush=True))
+        self.on_bytes = on_bytes
+        self.session = requests.Session()
+        self.session.headers.update(HttpClient.BASE_HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._state_lock = threading.Lock()
+
+    # ---------- 校验信息 ----------
+    def _load_state(self, dir_path: str) -> Dict[str, dict]:
+        path = os.path.join(dir_path, STATE_FILE_NAME)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _get_entry(self, dest: str) -> dict:
+        with self._state_lock:
+            return self._load_state(os.path.dirname(dest)).get(os.path.basename(dest)) or {}
+
+    def _set_entry(self, dest: str, entry: Optional[dict]):
+        # 同一目录的封面与弹幕可能在不同线程中下载，读改写需加锁
+        dir_path = os.path.dirname(dest)
+        with self._state_lock:
+            state = self._load_state(dir_path)
+            if entry is None:
+                state.pop(os.path.basename(dest), None)
+            else:
+                state[os.path.basename(dest)] = entry
+            tmp = os.path.join(dir_path, STATE_FILE_NAME + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp, os.path.join(dir_path, STATE_FILE_NAME))
+
+    @staticmethod
+    def _validators(resp) -> dict:
+        return {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+
+    @staticmethod
+    def _content_length(resp) -> Optional[int]:
+        # 压缩传输时 Content-Length 是压缩后的大小，无法用于校验
+        if resp.headers.get("Content-Encoding", "identity") != "identity":
+            return None
+        value = resp.headers.get("Content-Length")
+        return int(value) if value and value.isdigit() else None
+
+    # ---------- 下载 ----------
+    def download(self, url: str, dest: str, referer: Optional[str] = None,
+                 endpoint: Optional[str] = None) -> bool:
+        """
+        下载 url 到 dest
+        :param referer: 可选的来源地址（防盗链需要）
+        :param endpoint: 调度器中的请求类别（image / comment 等）
+        :return: 实际下载了新内容返回 True，文件未变化而跳过返回 False
+        """
+        part = dest + PART_SUFFIX
+        entry = self._get_entry(dest)
+        headers = {"Referer": referer} if referer else {}
+        offset = 0
+
+        if os.path.exists(dest) and entry.get("complete"):
+            # 已完成的文件：条件请求，未变化时服务端返回 304
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        elif os.path.exists(part) and entry.get("resumable") and (entry.get("etag") or entry.get("last_modified")):
+            # 未完成的临时文件：从断点续传，文件已变化时服务端返回完整内容
+            offset = os.path.getsize(part)
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = entry.get("etag") or entry["last_modified"]
+
+        if self.scheduler is not None and endpoint:
+            self.scheduler.acquire(endpoint)
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as resp:
+            if self.scheduler is not None and endpoint:
+                self.scheduler.check_response(endpoint, resp.status_code, elapsed=resp.elapsed.total_seconds())
+            if resp.status_code == 304:
+                return False
+            if resp.status_code == 416 and offset:
+                # 续传位置无效（临时文件异常），丢弃后重新下载
+                os.remove(part)
+                self._set_entry(dest, None)
+                return self.download(url, dest, referer, endpoint)
+            resp.raise_for_status()
+
+            validators = self._validators(resp)
+            length = self._content_length(resp)
+            if resp.status_code != 206:
+                offset = 0
+                if not entry and os.path.exists(dest) and length is not None and os.path.getsize(dest) == length:
+                    # 旧版本下载的文件没有校验记录：大小一致即视为完整，只补记校验信息，不读取响应体；
+                    # 有记录但未完成说明上次重新下载（内容已变化）被中断，旧文件大小相同也不能沿用
+                    self._set_entry(dest, {**validators, "size": length, "complete": True})
+                    return False
+            total = offset + length if length is not None else None
+
+            self._set_entry(dest, {
+                **validators,
+                "size": total,
+                "complete": False,
+                "resumable": length is not None and (resp.status_code == 206
+                                                     or resp.headers.get("Accept-Ranges") == "bytes"),
+            })
+            written = offset
+            with open(part, "ab" if offset else "wb") as f:
+                for chunk in resp.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+                    written += len(chunk)
+                    if self.on_bytes is not None:
+                        self.on_bytes(len(chunk))
+
+        if total is not None and written != total:
+            # 保留临时文件，下次从断点续传
+            raise IOError(f"下载不完整: {written}/{total} 字节 {url}")
+        os.replace(part, dest)
+        self._set_entry(dest, {**validators, "size": written, "complete": True})
+        return True
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,269 @@
+import os
+from collections import OrderedDict
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QEvent, pyqtSignal
+
+STATUS_TEXT = {"pending": "待处理", "done": "已提取", "failed": "失败"}
+
+
+class BvidStoreModel(QAbstractTableModel):
+    """
+    BvidStore 表格模型：行数来自 COUNT 查询，单元格数据按块分页读取并缓存少量块，
+    十万级列表也只读取和保存可见附近的行；搜索在数据库中按子串过滤
+    """
+    def __init__(self, store, checkable: bool = True, block_size: int = 500, max_blocks: int = 20, parent=None):
+        """
+        :param store: BvidStore
+        :param checkable: 是否显示勾选列
+        :param block_size: 每次从数据库读取的行数
+        :param max_blocks: 最多缓存的块数
+        """
+        super().__init__(parent)
+        self.store = store
+        self.checkable = checkable
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.headers = (["选择"] if checkable else []) + ["BV号", "状态"]
+        self.keyword = None
+        self.checked = set()
+        self._count = 0
+        self._blocks = OrderedDict()
+        self.refresh()
+
+    # ---------- 数据读取 ----------
+    def refresh(self):
+        """重新统计行数并清空缓存（增删来自其他进程或搜索条件变化时调用）"""
+        self.beginResetModel()
+        self._count = self.store.count(self.keyword)
+        self._blocks.clear()
+        self.endResetModel()
+
+    def set_keyword(self, keyword: str):
+        keyword = keyword.strip() or None
+        if keyword != self.keyword:
+            # 搜索条件变化后勾选的行可能不再可见，清空勾选，避免删除看不到的行
+            self.checked.clear()
+        self.keyword = keyword
+        self.refresh()
+
+    def _block(self, index: int) -> list:
+        block = self._blocks.get(index)
+        if block is None:
+            block = self.store.page(index * self.block_size, self.block_size, self.keyword)
+            self._blocks[index] = block
+            if len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(index)
+        return block
+
+    def row_item(self, row: int):
+        """返回第 row 行的 (BV号, 状态, 错误信息)，越界时返回 None"""
+        block = self._block(row // self.block_size)
+        offset = row % self.block_size
+        return block[offset] if offset < len(block) else None
+
+    def bvid_at(self, row: int):
+        item = self.row_item(row)
+        return item[0] if item else None
+
+    def checked_bvids(self) -> list:
+        return list(self.checked)
+
+    # ---------- 增量更新 ----------
+    def append_bvids(self, bvids: list):
+        """本进程新增的 BV 号追加在末尾（按添加顺序排序），只插入匹配搜索条件的行"""
+        keyword = (self.keyword or "").lower()
+        matched = [bv for bv in bvids if keyword in bv.lower()]
+        if not matched:
+            return
+        start = self._count
+        self.beginInsertRows(QModelIndex(), start, start + len(matched) - 1)
+        self._count += len(matched)
+        # 末尾块已不完整，下次访问时重新读取
+        self._blocks.pop(start // self.block_size, None)
+        self.endInsertRows()
+
+    def remove_bvids(self, bvids: list):
+        self.checked.difference_update(bvids)
+        self.refresh()
+
+    def update_status(self, bvids):
+        """刷新已缓存行的状态列，未缓存的行在滚动到时会读取最新状态"""
+        wanted = set(bvids)
+        status_col = len(self.headers) - 1
+        for block_index, block in self._blocks.items():
+            for offset, item in enumerate(block):
+                if item[0] not in wanted:
+                    continue
+                current = self.store.get(item[0])
+                if current is None:
+                    continue
+                block[offset] = (item[0], *current)
+                index = self.index(block_index * self.block_size + offset, status_col)
+                self.dataChanged.emit(index, index)
+
+    # ---------- Qt 模型接口 ----------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.row_item(index.row())
+        if item is None:
+            return None
+        bv, status, error = item
+        column = self.headers[index.column()]
+        if column == "选择":
+            return (Qt.Checked if bv in self.checked else Qt.Unchecked) if role == Qt.CheckStateRole else None
+        if column == "BV号":
+            return bv if role == Qt.DisplayRole else None
+        if role == Qt.DisplayRole:
+            return STATUS_TEXT.get(status, status)
+        if role == Qt.ToolTipRole:
+            return error
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and self.headers[index.column()] == "选择":
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or self.headers[index.column()] != "选择":
+            return False
+        bv = self.bvid_at(index.row())
+        if bv is None:
+            return False
+        if value == Qt.Checked:
+            self.checked.add(bv)
+        else:
+            self.checked.discard(bv)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+
+class FolderListModel(QAbstractTableModel):
+    """
+    output 目录下的 BV 子文件夹列表：只保存文件夹名，
+    “已包含文件”列在单元格首次显示时才读取并缓存
+    """
+    headers = ["BV号", "已包含文件", "查看"]
+
+    def __init__(self, root_dir: str, list_files=None, parent=None):
+        """
+        :param root_dir: BV 子文件夹所在目录
+        :param list_files: 可选，list_files(文件夹名) 返回文件列表（如从 output 索引读取），默认读取目录
+        """
+        super().__init__(parent)
+        self.root_dir = root_dir
+        self.list_files = list_files or (lambda name: os.listdir(os.path.join(self.root_dir, name)))
+        self.folders = []
+        self._summaries = {}
+
+    def set_folders(self, folders: list):
+        self.beginResetModel()
+        self.folders = folders
+        self._summaries = {}
+        self.endResetModel()
+
+    def folder_path(self, row: int) -> str:
+        return os.path.join(self.root_dir, self.folders[row])
+
+    def _summary(self, row: int) -> str:
+        name = self.folders[row]
+        summary = self._summaries.get(name)
+        if summary is None:
+            try:
+                files = self.list_files(name)
+            except OSError:
+                files = []
+            summary = ", ".join([f for f in files if len(f) <= 30])
+            self._summaries[name] = summary
+        return summary
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.folders)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        if index.column() == 0:
+            return self.folders[index.row()]
+        if index.column() == 1:
+            return self._summary(index.row())
+        return "查看"
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """在单元格内绘制按钮并转发点击，代替每行一个 QPushButton 控件"""
+    clicked = pyqtSignal(QModelIndex)
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = index.data()
+        button.state = QStyle.State_Enabled | (option.state & QStyle.State_MouseOver)
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton \
+                and option.rect.contains(event.pos()):
+            self.clicked.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
+
+
+class StringListTableModel(QAbstractTableModel):
+    """单列字符串列表模型，只保存字符串本身，不为每行创建表格项"""
+    def __init__(self, header: str, items: list = None, parent=None):
+        super().__init__(parent)
+        self.header = header
+        self.items = items or []
+
+    def set_items(self, items: list):
+        self.beginResetModel()
+        self.items = items
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.header
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role == Qt.DisplayRole:
+            return self.items[index.row()]
+        return None
+
+
+def fix_row_height(view):
+    """固定行高，避免表格视图为计算行高遍历全部行"""
+    header = view.verticalHeader()
+    header.setSectionResizeMode(header.Fixed)
+    header.setDefaultSectionSize(view.fontMetrics().height() + 10)
@@ -1,9 +1,11 @@
 import os
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView, QMessageBox
+    QTableView, QAbstractItemView, QHeaderView, QMessageBox, QFileDialog
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QTimer
+from bvid_store import open_bvid_store, store_path_for
+from gui.table_models import BvidStoreModel, fix_row_height
 
 class BVIDManagerUI(QWidget):
     def __init__(self, bvid_file_path=None, parent=None):
@@ -12,12 +14,20 @@ class BVIDManagerUI(QWidget):
         # 默认 BVID 文件路径（项目根目录下）
         self.bvid_file = bvid_file_path or os.path.join(os.path.abspath(os.path.dirname(__file__) + "/.."), "BVID_list.txt")
 
-        self.all_bvids = []
-        self.filtered_bvids = []
+        # BV 号保存在同名 .db 中（唯一索引判重），BVID_list.txt 有变化时自动导入
+        self.store = open_bvid_store(self.bvid_file)
+        self.store.subscribe(self.on_store_changed)
+        self.model = BvidStoreModel(self.store)
+        self.version = self.store.version()
 
         self.init_ui()
         self.load_bvids()
 
+        # 轮询变更记录，显示提取进程写入的处理状态
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll_changes)
+        self.poll_timer.start(2000)
+
     def init_ui(self):
         layout = QVBoxLayout(self)
 
@@ -26,17 +36,26 @@ class BVIDManagerUI(QWidget):
 
         self.search_box = QLineEdit()
         self.search_box.setPlaceholderText("搜索 BV 号...")
-        self.search_box.textChanged.connect(self.filter_bvids)
+        # 输入停顿后再查询，避免每次按键都重新统计
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.filter_bvids)
+        self.search_box.textChanged.connect(self.search_timer.start)
         top_bar.addWidget(self.search_box)
 
         self.add_box = QLineEdit()
-        self.add_box.setPlaceholderText("输入 BV 号添加")
+        self.add_box.setPlaceholderText("输入 BV 号 / av 号 / 视频链接添加")
         top_bar.addWidget(self.add_box)
 
         btn_add = QPushButton("添加")
         btn_add.clicked.connect(self.add_bvid)
         top_bar.addWidget(btn_add)
 
+        btn_import = QPushButton("批量导入")
+        btn_import.clicked.connect(self.import_file)
+        top_bar.addWidget(btn_import)
+
         btn_delete = QPushButton("删除选中")
         btn_delete.clicked.connect(self.delete_selected)
         top_bar.addWidget(btn_delete)
@@ -48,76 +67,73 @@ class BVIDManagerUI(QWidget):
         layout.addLayout(top_bar)
 
         # 表格区
-        self.table = QTableWidget()
-        self.table.setColumnCount(2)
-        self.table.setHorizontalHeaderLabels(["选择", "BV号"])
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        fix_row_height(self.table)
         self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)  # 禁止直接编辑
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         layout.addWidget(self.table)
 
     def load_bvids(self):
-        """读取 BVID_list.txt 并显示到表格"""
-        if not os.path.exists(self.bvid_file):
-            open(self.bvid_file, "w", encoding="utf-8").close()
-
-        with open(self.bvid_file, "r", encoding="utf-8") as f:
-            self.all_bvids = [line.strip() for line in f if line.strip()]
-
+        """读取 BV 号列表并显示到表格（同时导入 BVID_list.txt 中新增的内容）"""
+        if store_path_for(self.bvid_file) != self.bvid_file:
+            self.store.sync_txt(self.bvid_file)
+        self.version = self.store.version()
         self.filter_bvids()
 
     def filter_bvids(self):
-        """根据搜索框过滤"""
-        keyword = self.search_box.text().strip().lower()
-        if keyword:
-            self.filtered_bvids = [bv for bv in self.all_bvids if keyword in bv.lower()]
-        else:
-            self.filtered_bvids = list(self.all_bvids)
-        self.update_table()
-
-    def update_table(self):
-        """刷新表格内容"""
-        self.table.setRowCount(len(self.filtered_bvids))
-        for row, bv in enumerate(self.filtered_bvids):
-            # 选择复选框
-            checkbox_item = QTableWidgetItem()
-            checkbox_item.setCheckState(Qt.Unchecked)
-            self.table.setItem(row, 0, checkbox_item)
-
-            # BV 号
-            self.table.setItem(row, 1, QTableWidgetItem(bv))
+        """根据搜索框过滤（在数据库中按子串查询，表格只读取可见范围的行）"""
+        self.model.set_keyword(self.search_box.text())
+
+    def on_store_changed(self, kind, bvids):
+        """本界面写入的变更：新增追加到末尾，删除时重新统计"""
+        if kind == "add":
+            self.model.append_bvids(bvids)
+        elif kind == "remove":
+            self.model.remove_bvids(bvids)
+        self.version = self.store.version()
+
+    def poll_changes(self):
+        """其他进程（提取任务）写入的变更：状态只刷新已读取的行，增删时重新查询"""
+        changes = self.store.changes_since(self.version)
+        if not changes:
+            return
+        self.version = changes[-1][0]
+        if any(kind != "status" for _, kind, _ in changes):
+            self.model.refresh()
+            return
+        self.model.update_status({bvid for _, _, bvid in changes})
 
     def add_bvid(self):
-        """添加 BV 号"""
-        new_bv = self.add_box.text().strip()
-        if not new_bv:
+        """添加 BV 号（支持 av 号与视频链接，自动转换为 BV 号）"""
+        text = self.add_box.text().strip()
+        if not text:
             return
-        if new_bv in self.all_bvids:
-            QMessageBox.warning(self, "警告", "该 BV 号已存在！")
+        if self.store.add(text) is None:
+            QMessageBox.warning(self, "警告", "该 BV 号已存在或无法识别！")
             return
-
-        self.all_bvids.append(new_bv)
-        self.save_bvids()
         self.add_box.clear()
-        self.filter_bvids()
+
+    def import_file(self):
+        """从文本文件批量导入（每行一个 BV 号 / av 号 / 链接）"""
+        path, _ = QFileDialog.getOpenFileName(self, "选择 BV 号列表文件", "", "文本文件 (*.txt);;所有文件 (*)")
+        if not path:
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            added, skipped = self.store.add_many(line for line in f if line.strip())
+        QMessageBox.information(self, "导入完成", f"新增 {len(added)} 个，跳过重复或无法识别的 {skipped} 个")
 
     def delete_selected(self):
         """删除选中的 BV 号"""
-        selected_bvids = []
-        for row in range(self.table.rowCount()):
-            item = self.table.item(row, 0)
-            if item.checkState() == Qt.Checked:
-                selected_bvids.append(self.table.item(row, 1).text())
+        selected_bvids = self.model.checked_bvids()
 
         if not selected_bvids:
             QMessageBox.information(self, "提示", "请先勾选要删除的 BV 号")
             return
 
-        self.all_bvids = [bv for bv in self.all_bvids if bv not in selected_bvids]
-        self.save_bvids()
-        self.filter_bvids()
-
-    def save_bvids(self):
-        """保存到文件"""
-        with open(self.bvid_file, "w", encoding="utf-8") as f:
-            f.write("\n".join(self.all_bvids))
+        reply = QMessageBox.question(self, "确认删除", f"确定删除勾选的 {len(selected_bvids)} 个 BV 号吗？",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        self.store.remove_many(selected_bvids)
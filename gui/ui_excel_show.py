@@ -2,11 +2,16 @@ import os
 import datetime
 import subprocess
 import sys
-import pandas as pd
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton
+from output_index import OutputIndex, format_size
+from info_data import excel_parts
 
 class ExcelShowUI(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, output_index: OutputIndex = None):
+        """
+        :param output_index: 共用的 output 索引，默认新建并启动后台索引线程
+        """
         super().__init__(parent)
         self.setWindowTitle("Excel & BV 数据统计")
         self.resize(480, 400)
@@ -16,6 +21,9 @@ class ExcelShowUI(QWidget):
         self.root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
         self.output_dir = os.path.join(self.root_dir, "output")
         self.excel_path = os.path.join(self.root_dir, "output.xlsx")
+        self.index = output_index or OutputIndex(self.output_dir, excel_path=self.excel_path)
+        self.index.start()
+        self.index_version = -1
 
         self.label_count = QLabel()
         self.label_today_count = QLabel()
@@ -27,7 +35,7 @@ class ExcelShowUI(QWidget):
         self.label_excel_path = QLabel(f"目标 Excel 文件路径: {self.excel_path}")
 
         self.btn_refresh = QPushButton("刷新统计")
-        self.btn_refresh.clicked.connect(self.refresh_data)
+        self.btn_refresh.clicked.connect(self.request_refresh)
 
         self.btn_open_excel = QPushButton("打开 Excel 表格")
         self.btn_open_excel.clicked.connect(self.open_excel_file)
@@ -65,70 +73,43 @@ class ExcelShowUI(QWidget):
 
         self.setLayout(layout)
 
-        # 初次刷新数据
+        # 初次刷新数据，之后索引版本变化时自动刷新
         self.refresh_data()
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll_index)
+        self.poll_timer.start(2000)
+
+    def request_refresh(self):
+        """让后台索引立即逐个文件比对一次目录（可发现原地改写），完成后由 poll_index 刷新统计"""
+        self.index.request_scan(deep=True)
+        self.refresh_data()
+
+    def poll_index(self):
+        if self.index.version() != self.index_version:
+            self.refresh_data()
 
     def refresh_data(self):
-        bv_folders = [f for f in os.listdir(self.output_dir) if os.path.isdir(os.path.join(self.output_dir, f))] if os.path.exists(self.output_dir) else []
+        """从 output 索引读取统计（目录遍历与 Excel 行数统计在后台线程增量完成）"""
+        self.index_version = self.index.version()
+        info = self.index.summary()
+        fmt = lambda ts: datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else "无记录"
+        pending = "" if self.index.scanned() else "（正在建立索引）"
 
         # BV 统计
-        total_bv_count = len(bv_folders)
-        today_count = len([f for f in bv_folders if datetime.datetime.fromtimestamp(
-            os.path.getmtime(os.path.join(self.output_dir, f))).date() == datetime.date.today()])
-        last_bv = max(bv_folders, key=lambda f: os.path.getmtime(os.path.join(self.output_dir, f)), default="无记录")
-        last_time = self.get_last_extract_time()
-
-        self.label_count.setText(f"已提取 BV 文件夹总数: {total_bv_count}")
-        self.label_today_count.setText(f"今日新增 BV 文件夹数量: {today_count}")
-        self.label_last_bv.setText(f"最近提取的 BV: {last_bv}")
-        self.label_last_time.setText(f"最近提取时间: {last_time}")
+        self.label_count.setText(f"已提取 BV 文件夹总数: {info['count']}{pending}")
+        self.label_today_count.setText(f"今日新增 BV 文件夹数量: {info['today_count']}")
+        self.label_last_bv.setText(f"最近提取的 BV: {info['last_name'] or '无记录'}")
+        self.label_last_time.setText(f"最近提取时间: {fmt(info['last_mtime'])}")
 
         # Excel 统计
-        total_excel_rows = self.count_excel_rows()
-        excel_last = datetime.datetime.fromtimestamp(os.path.getmtime(self.excel_path)).strftime("%Y-%m-%d %H:%M:%S") \
-            if os.path.exists(self.excel_path) else "无记录"
-
-        self.label_excel_rows.setText(f"Excel 中数据行数: {total_excel_rows}")
-        self.label_excel_last.setText(f"Excel 最近修改时间: {excel_last}")
+        parts = [p for p in excel_parts(self.excel_path) if os.path.exists(p)]
+        # 启用分卷（excel_part_rows）时行数为全部分卷之和
+        suffix = f"（共 {len(parts)} 个分卷，output-002.xlsx 起为后续分卷）" if len(parts) > 1 else ""
+        self.label_excel_rows.setText(f"Excel 中数据行数: {info['excel_rows']}{suffix}")
+        self.label_excel_last.setText(f"Excel 最近修改时间: {fmt(info['excel_mtime'])}")
 
         # 输出目录大小
-        total_size = self.get_dir_size(self.output_dir) if os.path.exists(self.output_dir) else 0
-        self.label_output_size.setText(f"output 文件夹总大小: {self.format_size(total_size)}")
-
-    def count_excel_rows(self):
-        if not os.path.exists(self.excel_path):
-            return 0
-        try:
-            df = pd.read_excel(self.excel_path)
-            return len(df)
-        except Exception:
-            return 0
-
-    def get_last_extract_time(self):
-        if not os.path.exists(self.output_dir):
-            return "无记录"
-        bv_folders = [f for f in os.listdir(self.output_dir) if os.path.isdir(os.path.join(self.output_dir, f))]
-        if not bv_folders:
-            return "无记录"
-        latest_folder = max((os.path.join(self.output_dir, f) for f in bv_folders), key=os.path.getmtime)
-        ts = os.path.getmtime(latest_folder)
-        return datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
-
-    def get_dir_size(self, path):
-        total = 0
-        for root, dirs, files in os.walk(path):
-            for f in files:
-                fp = os.path.join(root, f)
-                if os.path.exists(fp):
-                    total += os.path.getsize(fp)
-        return total
-
-    def format_size(self, size_bytes):
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size_bytes < 1024:
-                return f"{size_bytes:.2f} {unit}"
-            size_bytes /= 1024
-        return f"{size_bytes:.2f} PB"
+        self.label_output_size.setText(f"output 文件夹总大小: {format_size(info['total_size'])}")
 
     def open_excel_file(self):
         if os.path.exists(self.excel_path):
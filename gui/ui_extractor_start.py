@@ -2,27 +2,115 @@ import os
 import multiprocessing
 from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QTableWidget, QTableWidgetItem, QTextEdit, QMessageBox
+    QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QGroupBox, QLabel, QPushButton, QComboBox,
+    QProgressBar, QTableView, QTextEdit, QMessageBox
 )
 from info_start import run_extraction
+from bvid_store import open_bvid_store, store_path_for
+from log_pipeline import BatchingLogSender, LogReceiver, FINISHED
+from progress import format_bytes, format_duration
+from gui.table_models import StringListTableModel, fix_row_height
+from gui.ui_logs_show import LOG_FILE_PATH
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-def extraction_process(bvid_file, output_dir, log_queue):
-    def logger(msg):
-        log_queue.put(msg)
-
-    run_extraction(
-        bvid_file=bvid_file,
-        output_dir=output_dir,
-        log=logger
-    )
-    log_queue.put("__FINISHED__")
+def extraction_process(bvid_file, output_dir, log_queue, profile=None):
+    # 日志在子进程内缓冲，按批发送给界面进程
+    logger = BatchingLogSender(log_queue)
+    try:
+        # 子进程意外退出后重新开始时，从断点记录继续
+        run_extraction(
+            bvid_file=bvid_file,
+            output_dir=output_dir,
+            log=logger,
+            job_file=os.path.join(PROJECT_ROOT, "job_state.db"),
+            # 进度快照与日志共用队列，界面按最新快照刷新进度面板
+            progress=log_queue.put,
+            profile=profile
+        )
+    except Exception as e:
+        logger(f"[ERROR] 提取任务异常结束: {e}")
+    finally:
+        logger.close()
+        log_queue.put(FINISHED)
+
+
+# 性能分析选项: (显示名, run_extraction 的 profile 参数)
+PROFILE_OPTIONS = [("关闭", None), ("阶段耗时", "spans"), ("cProfile", "cprofile"), ("调用栈采样", "sample")]
+
+STAGE_NAMES = {"metadata": "信息", "cover": "封面", "danmaku": "弹幕", "video": "视频", "audio": "音频"}
+
+
+class ProgressPanel(QGroupBox):
+    """提取进度面板：总进度、速度与剩余时间、各阶段计数、各类请求的耗时与限速状态"""
+    def __init__(self, parent=None):
+        super().__init__("提取进度", parent)
+        layout = QVBoxLayout(self)
+
+        self.bar = QProgressBar()
+        self.bar.setFormat("%v / %m")
+        layout.addWidget(self.bar)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        grid = QGridLayout()
+        for col, text in enumerate(["阶段", "进行中", "完成", "失败", "限流重试"]):
+            grid.addWidget(QLabel(text), 0, col)
+        self.stage_labels = {}
+        for row, (stage, name) in enumerate(STAGE_NAMES.items(), start=1):
+            grid.addWidget(QLabel(name), row, 0)
+            self.stage_labels[stage] = [QLabel("0") for _ in range(4)]
+            for col, label in enumerate(self.stage_labels[stage], start=1):
+                grid.addWidget(label, row, col)
+        layout.addLayout(grid)
+
+        self.request_label = QLabel()
+        self.request_label.setWordWrap(True)
+        layout.addWidget(self.request_label)
+        self.reset()
+
+    def reset(self):
+        self.bar.setRange(0, 1)
+        self.bar.setValue(0)
+        self.summary_label.setText("等待开始")
+        for labels in self.stage_labels.values():
+            for label in labels:
+                label.setText("0")
+        self.request_label.setText("")
+
+    def update_snapshot(self, snap: dict):
+        finished = snap["processed"] + snap["failed"]
+        total = snap["total"] or snap["discovered"]
+        if total:
+            self.bar.setRange(0, total)
+            self.bar.setValue(min(finished, total))
+        else:
+            # 总数未知时显示忙碌状态
+            self.bar.setRange(0, 0)
+        self.summary_label.setText(
+            f"完成 {snap['processed']}，失败 {snap['failed']} | "
+            f"{snap['videos_per_min']:.1f} 个/分 | 已下载 {format_bytes(snap['bytes'])}"
+            f"（{format_bytes(snap['bytes_per_sec'])}/s） | "
+            f"已用 {format_duration(snap['elapsed'])}，剩余 {format_duration(snap['eta'])}"
+        )
+        for stage, labels in self.stage_labels.items():
+            counters = snap["stages"].get(stage, {})
+            for label, key in zip(labels, ["active", "done", "failed", "retried"]):
+                label.setText(str(counters.get(key, 0)))
+        lines = []
+        for name, s in snap["requests"].items():
+            if not s["requests"]:
+                continue
+            state = f"限速 {s['rate']:.2f}/s" if s["limited"] else "未限速"
+            p50, p90, p99 = (f"{s[k] * 1000:.0f}" if s[k] is not None else "-" for k in ("p50", "p90", "p99"))
+            lines.append(f"{name}: 请求 {s['requests']}，被限流 {s['throttled']}，{state}，"
+                         f"耗时 p50/p90/p99 {p50}/{p90}/{p99} ms")
+        self.request_label.setText("\n".join(lines))
 
 
 class ExtractorStartUI(QWidget):
-    def __init__(self, bvid_file_path=None,
+    def __init__(self, bvid_file_path=None, log_file_path=None,
                  my_message="本软件为开源软件，免费提供使用，若付费取得，那么已经被骗了！ \n本项目软件地址：https://github.com/CivilianBronya/bilibili-data-extractor/"):
         super().__init__()
         self.bvid_file_path = bvid_file_path
@@ -31,6 +119,8 @@ class ExtractorStartUI(QWidget):
 
         self.process = None
         self.log_queue = multiprocessing.Queue()
+        # 收到的日志写入轮转日志文件，由日志页面增量读取
+        self.log_receiver = LogReceiver(self.log_queue, log_file_path or LOG_FILE_PATH)
 
         self.setup_ui()
         self.start_button.clicked.connect(self.start_extraction)
@@ -47,13 +137,14 @@ class ExtractorStartUI(QWidget):
         bvid_label.setStyleSheet("font-weight: bold; font-size: 14px;")
         main_layout.addWidget(bvid_label)
 
-        self.bvid_table = QTableWidget()
-        self.bvid_table.setColumnCount(1)
-        self.bvid_table.setHorizontalHeaderLabels(["BV号"])
+        self.bvid_model = StringListTableModel("BV号")
+        self.bvid_table = QTableView()
+        self.bvid_table.setModel(self.bvid_model)
         self.bvid_table.horizontalHeader().setStretchLastSection(True)
-        self.bvid_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.bvid_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.bvid_table.setSelectionMode(QTableWidget.SingleSelection)
+        fix_row_height(self.bvid_table)
+        self.bvid_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.bvid_table.setSelectionBehavior(QTableView.SelectRows)
+        self.bvid_table.setSelectionMode(QTableView.SingleSelection)
         main_layout.addWidget(self.bvid_table)
 
         # 作者信息
@@ -67,8 +158,17 @@ class ExtractorStartUI(QWidget):
         self.my_text.setFixedHeight(80)
         main_layout.addWidget(self.my_text)
 
+        self.progress_panel = ProgressPanel()
+        main_layout.addWidget(self.progress_panel)
+
         # 启动按钮
         btn_layout = QHBoxLayout()
+        btn_layout.addWidget(QLabel("性能分析"))
+        self.profile_combo = QComboBox()
+        for text, mode in PROFILE_OPTIONS:
+            self.profile_combo.addItem(text, mode)
+        self.profile_combo.setToolTip("开启后在 output 旁的 profiles 目录写出各阶段耗时报告与火焰图折叠栈文件")
+        btn_layout.addWidget(self.profile_combo)
         btn_layout.addStretch()
         self.start_button = QPushButton("开始提取")
         btn_layout.addWidget(self.start_button)
@@ -76,16 +176,17 @@ class ExtractorStartUI(QWidget):
 
     def load_bvids(self):
         self.bvid_list.clear()
-        if self.bvid_file_path and os.path.exists(self.bvid_file_path):
-            with open(self.bvid_file_path, "r", encoding="utf-8") as f:
-                self.bvid_list = [line.strip() for line in f if line.strip()]
+        if self._has_bvid_list():
+            with open_bvid_store(self.bvid_file_path) as store:
+                self.bvid_list = store.all_bvids()
+        self.bvid_model.set_items(self.bvid_list)
 
-        self.bvid_table.setRowCount(len(self.bvid_list))
-        for row, bvid in enumerate(self.bvid_list):
-            self.bvid_table.setItem(row, 0, QTableWidgetItem(bvid))
+    def _has_bvid_list(self):
+        return bool(self.bvid_file_path) and (os.path.exists(self.bvid_file_path)
+                                              or os.path.exists(store_path_for(self.bvid_file_path)))
 
     def start_extraction(self):
-        if not self.bvid_file_path or not os.path.exists(self.bvid_file_path):
+        if not self._has_bvid_list():
             QMessageBox.warning(self, "错误", "未找到 BV 号文件，请先配置 BVID_list.txt")
             return
 
@@ -93,23 +194,28 @@ class ExtractorStartUI(QWidget):
         os.makedirs(output_dir, exist_ok=True)
 
         self.start_button.setEnabled(False)
+        self.progress_panel.reset()
+        self.log_receiver.progress = None
         QMessageBox.information(self, "提示", "提取任务已开始")
 
         # 启动子进程
         self.process = multiprocessing.Process(
             target=extraction_process,
-            args=(self.bvid_file_path, output_dir, self.log_queue)
+            args=(self.bvid_file_path, output_dir, self.log_queue, self.profile_combo.currentData())
         )
         self.process.start()
         self.timer.start(100)
 
     def check_log_queue(self):
-        while not self.log_queue.empty():
-            msg = self.log_queue.get()
-            if msg == "__FINISHED__":
-                self.timer.stop()
-                self.process.join()
-                self.start_button.setEnabled(True)
-                QMessageBox.information(self, "提示", "所有提取任务已完成")
-                return
-            print(msg)
+        records, finished = self.log_receiver.poll()
+        if self.log_receiver.progress is not None:
+            self.progress_panel.update_snapshot(self.log_receiver.progress)
+        if not finished and (records or self.process.is_alive()):
+            return
+        self.timer.stop()
+        self.process.join()
+        self.start_button.setEnabled(True)
+        if finished:
+            QMessageBox.information(self, "提示", "所有提取任务已完成")
+        else:
+            QMessageBox.warning(self, "提示", f"提取进程意外退出（退出码 {self.process.exitcode}），可重新开始继续提取")
@@ -1,38 +1,105 @@
-from PyQt5.QtWidgets import QApplication, QWidget, QStackedWidget, QVBoxLayout, QPushButton, QTextEdit, QHBoxLayout
+from PyQt5.QtWidgets import (
+    QApplication, QWidget, QStackedWidget, QVBoxLayout, QPushButton, QPlainTextEdit, QHBoxLayout, QComboBox
+)
+from PyQt5.QtCore import QTimer
+from collections import deque
+import logging
 import sys
 import os
+from log_pipeline import LogTail, parse_line_level
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_FILE_PATH = os.path.join(BASE_DIR, "logs.txt")
 
 
 class LogsShowUI(QWidget):
-    def __init__(self, parent=None, log_file_path=None):
+    """
+    日志页面：按文件偏移量增量读取日志文件，只保留最近 max_lines 行（环形缓冲），支持按级别过滤
+    """
+    LEVEL_FILTERS = [("全部", logging.DEBUG), ("信息及以上", logging.INFO),
+                     ("警告及以上", logging.WARNING), ("仅错误", logging.ERROR)]
+
+    def __init__(self, parent=None, log_file_path=None, max_lines=5000):
         super().__init__(parent)
-        self.log_file_path = log_file_path or os.path.join(BASE_DIR, "logs.txt")
+        self.log_file_path = log_file_path or LOG_FILE_PATH
+        self.tail = LogTail(self.log_file_path)
+        self.lines = deque(maxlen=max_lines)
+        self.last_level = logging.INFO
 
         # 主布局
         layout = QVBoxLayout(self)
 
-        # 日志显示框
-        self.text_edit = QTextEdit()
+        # 日志显示框（超过 max_lines 行时自动丢弃最早的行）
+        self.text_edit = QPlainTextEdit()
         self.text_edit.setReadOnly(True)
+        self.text_edit.setMaximumBlockCount(max_lines)
         layout.addWidget(self.text_edit)
 
         # 按钮区域
         btn_layout = QHBoxLayout()
+        self.level_box = QComboBox()
+        for text, level in self.LEVEL_FILTERS:
+            self.level_box.addItem(text, level)
+        self.level_box.currentIndexChanged.connect(self.render_lines)
+        btn_layout.addWidget(self.level_box)
+
         self.refresh_btn = QPushButton("刷新日志")
         self.refresh_btn.clicked.connect(self.load_logs)
         btn_layout.addWidget(self.refresh_btn)
 
+        self.clear_btn = QPushButton("清空显示")
+        self.clear_btn.clicked.connect(self.clear_lines)
+        btn_layout.addWidget(self.clear_btn)
+
         layout.addLayout(btn_layout)
 
+        # 页面可见时每秒读取新增内容
+        self.tail_timer = QTimer(self)
+        self.tail_timer.timeout.connect(self.poll_logs)
+        self.tail_timer.start(1000)
+
+    def min_level(self):
+        return self.level_box.currentData()
+
+    def poll_logs(self):
+        if self.isVisible():
+            self.load_logs()
+
     def load_logs(self):
-        """加载日志文件内容"""
-        if os.path.exists(self.log_file_path):
-            with open(self.log_file_path, "r", encoding="utf-8", errors="ignore") as f:
-                self.text_edit.setPlainText(f.read())
-        else:
-            self.text_edit.setPlainText("日志文件不存在：\n" + self.log_file_path)
+        """读取日志文件新增的内容（首次只读取文件末尾）"""
+        if not os.path.exists(self.log_file_path):
+            if not self.lines:
+                self.text_edit.setPlainText("日志文件不存在：\n" + self.log_file_path)
+            return
+        new_lines = self.tail.read_new()
+        if not new_lines:
+            return
+        if not self.lines:
+            self.text_edit.clear()
+        added = []
+        for line in new_lines:
+            self.last_level = parse_line_level(line, self.last_level)
+            self.lines.append((self.last_level, line))
+            added.append((self.last_level, line))
+        self._append([line for level, line in added if level >= self.min_level()])
+
+    def _append(self, lines):
+        if not lines:
+            return
+        bar = self.text_edit.verticalScrollBar()
+        at_bottom = bar.value() == bar.maximum()
+        self.text_edit.appendPlainText("\n".join(lines))
+        if at_bottom:
+            bar.setValue(bar.maximum())
+
+    def render_lines(self):
+        """级别过滤变化时从缓冲区重新显示"""
+        self.text_edit.clear()
+        self._append([line for level, line in self.lines if level >= self.min_level()])
+
+    def clear_lines(self):
+        self.lines.clear()
+        self.text_edit.clear()
 
 
 class MainWindow(QWidget):
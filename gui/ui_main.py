@@ -12,6 +12,7 @@ from gui.ui_logs_show import LogsShowUI
 from gui.ui_video_data import VideoDataWidget
 from gui.ui_video_show import VideoShowUI
 from gui.ui_video_content import VideoContentUI
+from output_index import OutputIndex
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -109,12 +110,17 @@ class BilibiliExtractorGUI(QWidget):
         self.page_video_content = VideoContentUI()
         self.stack.addWidget(self.page_video_content)  # index 5
 
+        # output 目录索引：后台线程增量扫描，视频浏览与统计页面共用
+        self.output_index = OutputIndex(os.path.join(BASE_DIR, "output"),
+                                        excel_path=os.path.join(BASE_DIR, "output.xlsx"))
+        self.output_index.start()
+
         # 创建 VideoShowUI 页面
-        self.page_video_show = VideoShowUI()
+        self.page_video_show = VideoShowUI(output_index=self.output_index)
         self.stack.addWidget(self.page_video_show)  # index 6
 
         # 创建 ExcelShowUI 页面
-        self.page_excel_show = ExcelShowUI()
+        self.page_excel_show = ExcelShowUI(output_index=self.output_index)
         self.stack.addWidget(self.page_excel_show)  # index 7
         self.init_ui()
 
@@ -262,5 +268,10 @@ class BilibiliExtractorGUI(QWidget):
             self.style_selector.close()
         super().mousePressEvent(event)
 
+    def closeEvent(self, event):
+        # 停止索引后台线程与目录监听，关闭索引数据库
+        self.output_index.close()
+        super().closeEvent(event)
+
     def apply_stylesheet(self, file_path):
         self.load_theme(file_path)
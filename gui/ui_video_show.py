@@ -3,10 +3,12 @@ import sys
 import subprocess
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QTableWidget, QTableWidgetItem, QHeaderView, QDialog, QTextEdit, QFrame, QMessageBox
+    QTableView, QHeaderView, QDialog, QTextEdit, QFrame, QMessageBox, QLineEdit
 )
 from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QSortFilterProxyModel, QTimer
+from gui.table_models import FolderListModel, ButtonDelegate, fix_row_height
+from output_index import OutputIndex
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
@@ -26,12 +28,25 @@ def open_with_default_app(path: str):
 
 class VideoDetailDialog(QDialog):
     """显示指定 BV 文件夹内容"""
-    def __init__(self, bvid: str, folder_path: str, parent=None):
+    def __init__(self, bvid: str, folder_path: str, parent=None, files=None):
+        """
+        :param files: 可选，文件夹内的文件相对路径（来自 output 索引），默认读取一次目录
+        """
         super().__init__(parent)
         self.setWindowTitle(f"视频详情 — {bvid}")
         self.resize(760, 520)
         self.bvid = bvid
         self.folder = folder_path
+        if files is None:
+            try:
+                files = sorted(os.listdir(folder_path))
+            except OSError:
+                files = []
+        # 顶层文件与多P子文件夹（索引中的 p{n}/文件名 或目录中的 p{n} 文件夹）
+        self.files = [f for f in files if "/" not in f]
+        names = {f.split("/", 1)[0] for f in files}
+        self.part_dirs = sorted(d for d in names if d.startswith("p") and d[1:].isdigit()
+                                and os.path.isdir(os.path.join(folder_path, d)))
 
         layout = QHBoxLayout(self)
 
@@ -65,35 +80,28 @@ class VideoDetailDialog(QDialog):
             right.addWidget(QLabel("缺少: 弹幕 XML"))
 
         # 视频文件
-        video_found = False
-        for ext in ("mp4", "mkv", "webm", "mov", "flv"):
-            for f in os.listdir(self.folder):
-                if f.lower().endswith("." + ext):
-                    btn_video = QPushButton(f"播放视频 ({f})")
-                    btn_video.clicked.connect(lambda _, pp=os.path.join(self.folder, f): open_with_default_app(pp))
-                    right.addWidget(btn_video)
-                    video_found = True
-                    break
-            if video_found:
-                break
-        if not video_found:
+        video = self._find_file(("mp4", "mkv", "webm", "mov", "flv"))
+        if video:
+            btn_video = QPushButton(f"播放视频 ({video})")
+            btn_video.clicked.connect(lambda _, pp=os.path.join(self.folder, video): open_with_default_app(pp))
+            right.addWidget(btn_video)
+        else:
             right.addWidget(QLabel("缺少: 视频文件"))
 
         # 音频文件
-        audio_found = False
-        for ext in ("mp3", "m4a", "aac", "wav"):
-            for f in os.listdir(self.folder):
-                if f.lower().endswith("." + ext):
-                    btn_audio = QPushButton(f"播放音频 ({f})")
-                    btn_audio.clicked.connect(lambda _, pp=os.path.join(self.folder, f): open_with_default_app(pp))
-                    right.addWidget(btn_audio)
-                    audio_found = True
-                    break
-            if audio_found:
-                break
-        if not audio_found:
+        audio = self._find_file(("mp3", "m4a", "aac", "wav"))
+        if audio:
+            btn_audio = QPushButton(f"播放音频 ({audio})")
+            btn_audio.clicked.connect(lambda _, pp=os.path.join(self.folder, audio): open_with_default_app(pp))
+            right.addWidget(btn_audio)
+        else:
             right.addWidget(QLabel("缺少: 音频文件"))
 
+        # 多P视频：各分P的弹幕/视频/音频保存在 p{n} 子文件夹
+        if self.part_dirs:
+            right.addWidget(QLabel(f"多P视频：共 {len(self.part_dirs)} 个分P，"
+                                   f"资源保存在 p1 ~ p{len(self.part_dirs)} 子文件夹"))
+
         # 打开整个文件夹
         btn_open_folder = QPushButton("打开此 BV 文件夹")
         btn_open_folder.clicked.connect(lambda: open_with_default_app(self.folder))
@@ -109,16 +117,22 @@ class VideoDetailDialog(QDialog):
         layout.addLayout(left, 1)
         layout.addLayout(right, 1)
 
+    def _find_file(self, exts):
+        """按扩展名优先级查找顶层文件"""
+        for ext in exts:
+            for f in self.files:
+                if f.lower().endswith("." + ext):
+                    return f
+        return None
+
     def _find_cover_path(self):
         for ext in ("cover.jpg", "cover.jpeg", "cover.png", "cover.webp"):
             p = os.path.join(self.folder, ext)
             if os.path.exists(p):
                 return p
         # 返回任意图片
-        for f in os.listdir(self.folder):
-            if f.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
-                return os.path.join(self.folder, f)
-        return None
+        image = self._find_file(("jpg", "jpeg", "png", "webp"))
+        return os.path.join(self.folder, image) if image else None
 
     def show_text_file(self, path: str):
         if not os.path.exists(path):
@@ -137,32 +151,54 @@ class VideoDetailDialog(QDialog):
 
 
 class VideoShowUI(QWidget):
-    """主界面：扫描 output/ 下的 BV 子文件夹"""
-    def __init__(self):
+    """主界面：浏览 output/ 下的 BV 子文件夹（从后台维护的 output 索引读取，不在界面线程遍历目录）"""
+    def __init__(self, output_index: OutputIndex = None):
+        """
+        :param output_index: 共用的 output 索引，默认新建并启动后台索引线程
+        """
         super().__init__()
         self.setWindowTitle("已爬取视频浏览")
         self.resize(980, 560)
+        self.index = output_index or OutputIndex(OUTPUT_DIR)
+        self.index.start()
+        self.index_version = -1
 
         layout = QVBoxLayout(self)
 
         # 顶部按钮
         top_row = QHBoxLayout()
         self.btn_refresh = QPushButton("刷新列表")
-        self.btn_refresh.clicked.connect(self.refresh_table)
+        self.btn_refresh.clicked.connect(self.request_refresh)
         self.btn_open_output = QPushButton("打开 output 文件夹")
         self.btn_open_output.clicked.connect(lambda: open_with_default_app(OUTPUT_DIR))
         top_row.addWidget(self.btn_refresh)
         top_row.addWidget(self.btn_open_output)
         top_row.addStretch()
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("搜索 BV 号...")
+        top_row.addWidget(self.search_box)
         layout.addLayout(top_row)
 
-        # 表格
-        self.table = QTableWidget(0, 3)
-        self.table.setHorizontalHeaderLabels(["BV号", "已包含文件", "查看"])
-        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        # 表格：模型只保存文件夹名，文件摘要在行可见时读取；搜索由代理模型按 BV 号过滤
+        self.model = FolderListModel(OUTPUT_DIR, list_files=self.index.files)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterKeyColumn(0)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.search_box.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Interactive)
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Fixed)
+        self.table.setColumnWidth(0, 140)
+        self.table.setColumnWidth(2, 80)
+        fix_row_height(self.table)
+        self.table.setEditTriggers(QTableView.NoEditTriggers)
+        self.view_delegate = ButtonDelegate(self.table)
+        self.view_delegate.clicked.connect(self.on_view_clicked)
+        self.table.setItemDelegateForColumn(2, self.view_delegate)
         layout.addWidget(self.table)
 
         self.status_label = QLabel("")
@@ -170,33 +206,37 @@ class VideoShowUI(QWidget):
 
         self.refresh_table()
 
-    def refresh_table(self):
-        self.table.setRowCount(0)
-        if not os.path.exists(OUTPUT_DIR):
-            self.status_label.setText(f"未找到 output 目录：{OUTPUT_DIR}")
-            return
+        # 索引在后台更新，版本号变化时重新读取
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll_index)
+        self.poll_timer.start(2000)
 
-        entries = [d for d in os.listdir(OUTPUT_DIR) if os.path.isdir(os.path.join(OUTPUT_DIR, d))]
-        entries.sort()
-        if not entries:
-            self.status_label.setText("output 文件夹中还没有已提取的视频。")
-            return
-        self.status_label.setText(f"找到 {len(entries)} 个已提取的视频文件夹")
+    def request_refresh(self):
+        """让后台索引立即逐个文件比对一次目录（可发现原地改写），完成后由 poll_index 刷新表格"""
+        self.index.request_scan(deep=True)
+        self.refresh_table()
 
-        for row, folder_name in enumerate(entries):
-            folder_path = os.path.join(OUTPUT_DIR, folder_name)
-            files = os.listdir(folder_path)
-            summary = ", ".join([f for f in files if len(f) <= 30])
-            self.table.insertRow(row)
-            self.table.setItem(row, 0, QTableWidgetItem(folder_name))
-            self.table.setItem(row, 1, QTableWidgetItem(summary))
+    def poll_index(self):
+        if self.index.version() != self.index_version:
+            self.refresh_table()
+
+    def refresh_table(self):
+        self.index_version = self.index.version()
+        entries = self.index.folder_names()
+        self.model.set_folders(entries)
+        if entries:
+            self.status_label.setText(f"找到 {len(entries)} 个已提取的视频文件夹")
+        elif not self.index.scanned():
+            self.status_label.setText("正在建立 output 目录索引……")
+        else:
+            self.status_label.setText("output 文件夹中还没有已提取的视频。")
 
-            btn_view = QPushButton("查看")
-            btn_view.clicked.connect(lambda _, b=folder_name, p=folder_path: self.show_detail(b, p))
-            self.table.setCellWidget(row, 2, btn_view)
+    def on_view_clicked(self, proxy_index):
+        row = self.proxy.mapToSource(proxy_index).row()
+        self.show_detail(self.model.folders[row], self.model.folder_path(row))
 
     def show_detail(self, bvid: str, folder_path: str):
-        dlg = VideoDetailDialog(bvid, folder_path, parent=self)
+        dlg = VideoDetailDialog(bvid, folder_path, parent=self, files=self.index.files(bvid) or None)
         dlg.exec_()
 
     def refresh_video_list(self):
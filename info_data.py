@@ -1,19 +1,82 @@
 import os
+import re
+import csv
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
 from datetime import datetime
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
 from openpyxl import Workbook, load_workbook
+import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet 输出为可选功能
+    pa = None
+    pq = None
 
 HEADERS = [
     "标题", "链接", "up主", "up主id", "精确播放数", "历史累计弹幕数", "点赞数", "投硬币枚数",
     "收藏人数", "转发人数", "发布时间", "视频时长(秒)", "视频简介", "作者简介", "标签", "视频aid", "爬取时间"
 ]
 
-def init_excel(file_path):
-    """初始化Excel文件，写入表头"""
+# build_row 中经过 to_int 转换的列，列式/数据库输出时保持整数类型
+INT_HEADERS = {"精确播放数", "历史累计弹幕数", "点赞数", "投硬币枚数", "收藏人数", "转发人数", "视频时长(秒)"}
+
+def _new_workbook() -> Workbook:
     wb = Workbook()
     ws = wb.active
     ws.title = "Bilibili视频信息"
     ws.append(HEADERS)
-    wb.save(file_path)
+    return wb
+
+def save_workbook(wb, file_path):
+    """先保存到同目录的临时文件再替换，保存中途崩溃不会损坏原文件"""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    wb.save(tmp_path)
+    os.replace(tmp_path, file_path)
+
+def init_excel(file_path):
+    """初始化Excel文件，写入表头"""
+    save_workbook(_new_workbook(), file_path)
+
+def _numbered_parts(file_path) -> List[Tuple[int, str]]:
+    directory = os.path.dirname(os.path.abspath(file_path))
+    root, ext = os.path.splitext(os.path.basename(file_path))
+    pattern = re.compile(rf"{re.escape(root)}-(\d{{3,}}){re.escape(ext)}$")
+    parts = [(1, file_path)]
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            m = pattern.match(name)
+            if m:
+                parts.append((int(m.group(1)), os.path.join(directory, name)))
+    return sorted(parts)
+
+def excel_parts(file_path) -> List[str]:
+    """Excel 输出的全部分卷：file_path 本身及 output-002.xlsx、output-003.xlsx ...（按序号排列）"""
+    return [path for _, path in _numbered_parts(file_path)]
+
+def excel_part_path(file_path, number: int) -> str:
+    """第 number 个分卷的路径，第 1 卷即 file_path"""
+    if number <= 1:
+        return file_path
+    root, ext = os.path.splitext(file_path)
+    return f"{root}-{number:03d}{ext}"
+
+def count_rows(file_path) -> int:
+    """只读模式读取工作表的行数（含表头），不载入全部单元格"""
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        ws = wb.active
+        # 只读模式下 max_row 来自文件中的 dimension 记录，缺失时逐行统计
+        return ws.max_row if ws.max_row is not None else sum(1 for _ in ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
 
 def load_or_create_workbook(file_path):
     """打开已有Excel或新建"""
@@ -36,6 +99,29 @@ def to_int(value):
     except (ValueError, TypeError):
         return 0
 
+def build_row(video_info: dict) -> list:
+    """按 HEADERS 顺序生成一行写入值"""
+    return [
+        sanitize_value(video_info.get("title", "")),
+        sanitize_value(video_info.get("url", "")),
+        sanitize_value(video_info.get("author", "")),
+        sanitize_value(video_info.get("author_id", "")),
+        to_int(video_info.get("views")),
+        to_int(video_info.get("danmaku")),
+        to_int(video_info.get("likes")),
+        to_int(video_info.get("coins")),
+        to_int(video_info.get("favorites")),
+        to_int(video_info.get("shares")),
+        sanitize_value(video_info.get("publish_date", "")),
+        to_int(video_info.get("duration")),
+        sanitize_value(video_info.get("video_desc", "")),
+        sanitize_value(video_info.get("author_desc", "")),
+        sanitize_value(video_info.get("tags", "")),
+        sanitize_value(video_info.get("video_aid", "")),
+        datetime.now().isoformat(timespec='seconds'),
+    ]
+
+
 def append_video_info(file_path, video_info: dict):
     """
     写入视频信息到Excel，保留历史记录（不去重）
@@ -51,28 +137,9 @@ def append_video_info(file_path, video_info: dict):
         print(f"[DEBUG] 标题: {video_info.get('title')}")
         print(f"[DEBUG] 播放量: {video_info.get('views')}, 点赞: {video_info.get('likes')}")
 
-        values = [
-            sanitize_value(video_info.get("title", "")),
-            sanitize_value(video_info.get("url", "")),
-            sanitize_value(video_info.get("author", "")),
-            sanitize_value(video_info.get("author_id", "")),
-            to_int(video_info.get("views")),
-            to_int(video_info.get("danmaku")),
-            to_int(video_info.get("likes")),
-            to_int(video_info.get("coins")),
-            to_int(video_info.get("favorites")),
-            to_int(video_info.get("shares")),
-            sanitize_value(video_info.get("publish_date", "")),
-            to_int(video_info.get("duration")),
-            sanitize_value(video_info.get("video_desc", "")),
-            sanitize_value(video_info.get("author_desc", "")),
-            sanitize_value(video_info.get("tags", "")),
-            sanitize_value(video_info.get("video_aid", "")),
-            datetime.now().isoformat(timespec='seconds'),
-        ]
-
-        ws.append(values)
-        wb.save(file_path)
+        ws.append(build_row(video_info))
+        with metrics.timer("bili_excel_save_seconds"):
+            save_workbook(wb, file_path)
         print(f"[Excel] 已写入: {video_info.get('url')}")
 
         return True
@@ -80,3 +147,404 @@ def append_video_info(file_path, video_info: dict):
     except Exception as e:
         print(f"[ERROR] 写入 Excel 失败: {e}")
         return False
+
+
+class ResultSink(ABC):
+    """
+    结果输出的基类，每行数据按 HEADERS 顺序组织
+    子类实现 append_row / flush / close
+    """
+    def append(self, video_info: dict) -> bool:
+        """
+        追加一行视频信息
+        :param video_info: dict，视频信息字段应对应HEADERS
+        """
+        try:
+            with metrics.timer("bili_sink_write_seconds", sink=type(self).__name__):
+                self.append_row(build_row(video_info))
+            return True
+        except Exception as e:
+            print(f"[ERROR] 写入 {type(self).__name__} 失败: {e}")
+            return False
+
+    @abstractmethod
+    def append_row(self, row: list):
+        """
+        写入一行已按 HEADERS 排好的数据
+        :param row: list，build_row 的结果
+        """
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ExcelWriter(ResultSink):
+    """
+    整个任务期间保持工作簿打开的追加写入器
+    每行先写入日志文件（journal）保证不丢失，再按行数/时间阈值批量保存到 Excel；
+    程序崩溃后下次打开时会自动重放 journal 中未保存的行（按行号跳过崩溃前已保存的行，不会重复写入）
+    xlsx 每次保存都要重写整个文件，保存耗时随总行数增长；设置 part_rows 后单个文件最多 part_rows 行，
+    写满后续写到 output-002.xlsx、output-003.xlsx ...，保存耗时保持不变（读取时用 excel_parts 列出全部分卷）
+    """
+    def __init__(self, file_path, flush_rows: int = 5000, flush_interval: float = 120.0,
+                 part_rows: Optional[int] = None):
+        """
+        :param file_path: Excel文件路径（第 1 卷）
+        :param flush_rows: 缓冲行数达到该值时保存
+        :param flush_interval: 距上次保存超过该秒数时保存
+        :param part_rows: 每个文件的最大数据行数，超出后写入下一卷；None 表示不分卷，全部写入 file_path
+        """
+        self.file_path = file_path
+        self.journal_path = f"{file_path}.journal"
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.part_rows = part_rows
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+        self._replay_journal()
+        number, path = _numbered_parts(file_path)[-1]
+        if part_rows and os.path.exists(path) and count_rows(path) - 1 >= part_rows:
+            # 最后一卷已写满时不载入，直接开始新的一卷
+            self._open_part(number + 1)
+        else:
+            self._open_part(number)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _open_part(self, number: int):
+        self.part_number = number
+        self.part_path = excel_part_path(self.file_path, number)
+        if os.path.exists(self.part_path):
+            self.wb = load_workbook(self.part_path)
+        else:
+            self.wb = _new_workbook()
+            save_workbook(self.wb, self.part_path)
+        self.ws = self.wb.active
+        # 工作表的 max_row 每次调用都要遍历全部单元格，行数自行维护
+        self._rows = self.ws.max_row
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        entries = []
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 崩溃时写了一半的最后一行
+                    continue
+                if isinstance(entry, list):
+                    # 旧格式只有行内容，无法判断是否已保存，全部追加
+                    entries.append((None, None, entry))
+                else:
+                    entries.append((entry["part"], entry["n"], entry["row"]))
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        replayed = 0
+        for part, items in groupby(entries, key=lambda e: e[0]):
+            path = os.path.join(directory, part) if part else excel_parts(self.file_path)[-1]
+            wb = load_or_create_workbook(path)
+            ws = wb.active
+            saved = ws.max_row
+            appended = 0
+            for _, n, row in items:
+                # 行号不超过文件现有行数：该行在崩溃前已保存（保存后、清空 journal 前崩溃）
+                if n is not None and n <= saved:
+                    continue
+                ws.append(row)
+                appended += 1
+            if appended:
+                save_workbook(wb, path)
+                replayed += appended
+        if replayed:
+            print(f"[Excel] 已从 journal 恢复 {replayed} 行: {self.journal_path}")
+        os.remove(self.journal_path)
+
+    def append_row(self, row: list):
+        with self._lock:
+            entry = {"part": os.path.basename(self.part_path), "n": self._rows + 1, "row": row}
+            self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._journal.flush()
+            self.ws.append(row)
+            self._rows += 1
+            self._pending += 1
+            if self.part_rows and self._rows - 1 >= self.part_rows:
+                self._flush_locked()
+                self._open_part(self.part_number + 1)
+                print(f"[Excel] 已写满 {self.part_rows} 行，后续写入: {self.part_path}")
+            elif (self._pending >= self.flush_rows
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending:
+            with metrics.timer("bili_excel_save_seconds"):
+                save_workbook(self.wb, self.part_path)
+            print(f"[Excel] 已批量写入 {self._pending} 行: {self.part_path}")
+            # 已落盘的行无需再保留在 journal 中（此前崩溃时重放会按行号跳过已保存的行）
+            self._journal.seek(0)
+            self._journal.truncate()
+            self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._journal.close()
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+
+class CsvSink(ResultSink):
+    # 追加写入 CSV，首次创建时写入表头
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        new_file = not os.path.exists(file_path) or os.path.getsize(file_path) == 0
+        # utf-8-sig 便于 Excel 直接打开中文表头
+        self._file = open(file_path, "a", encoding="utf-8-sig" if new_file else "utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        if new_file:
+            self._writer.writerow(HEADERS)
+            self._file.flush()
+
+    def append_row(self, row: list):
+        with self._lock:
+            self._writer.writerow(row)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class JsonlSink(ResultSink):
+    # 追加写入 JSON Lines，每行一个以 HEADERS 为键的对象
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._file = open(file_path, "a", encoding="utf-8")
+
+    def append_row(self, row: list):
+        line = json.dumps(dict(zip(HEADERS, row)), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class SQLiteSink(ResultSink):
+    # 写入 SQLite 表，数值列使用 INTEGER 类型，按批提交事务
+    def __init__(self, file_path, table: str = "video_info", batch_rows: int = 500):
+        self.file_path = file_path
+        self.table = table
+        self.batch_rows = batch_rows
+        self._lock = threading.Lock()
+        self._pending: List[list] = []
+        self._conn = sqlite3.connect(file_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(
+            f'"{h}" {"INTEGER" if h in INT_HEADERS else "TEXT"}' for h in HEADERS
+        )
+        self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns})')
+        self._conn.commit()
+        placeholders = ", ".join("?" for _ in HEADERS)
+        self._insert_sql = f'INSERT INTO "{table}" VALUES ({placeholders})'
+
+    def append_row(self, row: list):
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_rows:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending:
+            self._conn.executemany(self._insert_sql, self._pending)
+            self._conn.commit()
+            self._pending = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+
+class ParquetSink(ResultSink):
+    """
+    写入 Parquet 数据集目录，每次运行生成一个新的 part 文件，按批写入 row group
+    使用 pandas.read_parquet(目录) 可一次读取全部历史数据
+    """
+    def __init__(self, dir_path, batch_rows: int = 5000):
+        if pa is None:
+            raise ImportError("Parquet 输出需要安装 pyarrow: pip install pyarrow")
+        self.dir_path = dir_path
+        self.batch_rows = batch_rows
+        self._lock = threading.Lock()
+        self._pending: List[list] = []
+        self.schema = pa.schema(
+            [(h, pa.int64() if h in INT_HEADERS else pa.string()) for h in HEADERS]
+        )
+        os.makedirs(dir_path, exist_ok=True)
+        part_name = f"part-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.parquet"
+        self.file_path = os.path.join(dir_path, part_name)
+        self._writer = None
+
+    def append_row(self, row: list):
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_rows:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        columns = list(zip(*self._pending))
+        table = pa.Table.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.file_path, self.schema)
+        self._writer.write_table(table)
+        self._pending = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+class MultiSink(ResultSink):
+    """
+    同时写入多个输出，同一行数据只生成一次（爬取时间保持一致）
+    部分输出写入失败时记录已成功的输出，同一视频重试时只补写失败的输出，避免其余输出出现重复行
+    """
+    def __init__(self, sinks: Iterable[ResultSink], state=None):
+        """
+        :param sinks: 输出列表
+        :param state: 可选的断点记录（如 JobStateStore），提供 written_sinks / mark_sinks_written /
+                      clear_sinks，用于跨进程续传时保留部分写入的进度；不传时只在本进程内记录
+        """
+        self.sinks = list(sinks)
+        self.state = state
+        self._names = [f"{i}:{type(sink).__name__}" for i, sink in enumerate(self.sinks)]
+        self._written: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _row_key(row: list) -> str:
+        # 以链接末尾的 BV 号区分视频
+        return str(row[HEADERS.index("链接")]).rstrip("/").rsplit("/", 1)[-1]
+
+    def _load_written(self, key: str) -> set:
+        with self._lock:
+            written = self._written.get(key)
+        if written is None and self.state is not None:
+            written = self.state.written_sinks(key)
+        return set(written or ())
+
+    def append_row(self, row: list):
+        key = self._row_key(row)
+        written = self._load_written(key)
+        resumed = bool(written)
+        errors = []
+        for name, sink in zip(self._names, self.sinks):
+            if name in written:
+                continue
+            try:
+                with metrics.timer("bili_sink_write_seconds", sink=type(sink).__name__):
+                    sink.append_row(row)
+                written.add(name)
+            except Exception as e:
+                errors.append(f"{type(sink).__name__}: {e}")
+        with self._lock:
+            if errors:
+                self._written[key] = written
+            else:
+                self._written.pop(key, None)
+        if self.state is not None:
+            if errors:
+                self.state.mark_sinks_written(key, written)
+            elif resumed:
+                # 此前部分写入的视频已补写完整，清除记录
+                self.state.clear_sinks(key)
+        if errors:
+            raise IOError("; ".join(errors))
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        # 逐个关闭，某个输出失败不影响其余输出落盘，最后汇总抛出
+        errors = []
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                errors.append(f"{type(sink).__name__}: {e}")
+        if errors:
+            raise IOError("关闭输出失败: " + "; ".join(errors))
+
+
+# 可选输出类型 -> (实现类, 默认文件名)
+SINKS = {
+    "excel": (ExcelWriter, "output.xlsx"),
+    "csv": (CsvSink, "output.csv"),
+    "jsonl": (JsonlSink, "output.jsonl"),
+    "sqlite": (SQLiteSink, "output.db"),
+    "parquet": (ParquetSink, "output_parquet"),
+}
+
+
+def open_sinks(kinds: Iterable[str], base_dir: str, paths: Optional[Dict[str, str]] = None,
+               state=None, options: Optional[Dict[str, dict]] = None) -> MultiSink:
+    """
+    按名称创建输出
+    :param kinds: 输出类型，取值见 SINKS
+    :param base_dir: 默认文件所在目录
+    :param paths: 可选，指定某类输出的路径，如 {"excel": "/data/out.xlsx"}
+    :param state: 可选的断点记录，见 MultiSink
+    :param options: 可选，某类输出的额外构造参数，如 {"excel": {"part_rows": 20000}}
+    """
+    paths = paths or {}
+    options = options or {}
+    sinks = []
+    try:
+        for kind in kinds:
+            if kind not in SINKS:
+                raise ValueError(f"未知的输出类型: {kind}，可选: {', '.join(SINKS)}")
+            cls, default_name = SINKS[kind]
+            sinks.append(cls(paths.get(kind) or os.path.join(base_dir, default_name), **options.get(kind, {})))
+    except Exception:
+        for sink in sinks:
+            sink.close()
+        raise
+    return MultiSink(sinks, state)
@@ -1,133 +1,462 @@
-import re
-import json
+import time
+import asyncio
 import requests
-from bs4 import BeautifulSoup
+import metrics
 from datetime import datetime
+import initial_state_parser
 from http_client import HttpClient
-from typing import Callable, Optional
+from video_cache import VideoInfoCache
+from rate_limiter import RequestScheduler, ThrottledError
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+try:
+    import aiohttp
+except ImportError:  # 异步提取器为可选功能
+    aiohttp = None
+
+WEB_BASE = "https://www.bilibili.com"
+API_BASE = "https://api.bilibili.com"
+COMMENT_BASE = "https://comment.bilibili.com"
+
+
+# get_video_info 结果中的统计字段 -> API stat 字段
+API_STAT_KEYS = {
+    "views": "view",
+    "danmaku": "danmaku",
+    "likes": "like",
+    "coins": "coin",
+    "favorites": "favorite",
+    "shares": "share",
+}
+
+
+def _count_request_error(endpoint: str, error: Exception):
+    # HTTP 状态码错误已由调度器计数，这里只统计超时、连接失败等异常
+    if not isinstance(error, requests.HTTPError):
+        metrics.inc("bili_http_errors_total", endpoint=endpoint, kind="exception")
+
+
+def _stats_from_api(stat: dict) -> dict:
+    return {key: (stat or {}).get(api_key, 0) for key, api_key in API_STAT_KEYS.items()}
+
+
+# API-first 模式下 view 接口必须包含的字段，缺失任意一项才回退到网页解析
+API_VIDEO_FIELDS = ("title", "owner", "cid", "aid", "desc", "pic")
+
+
+def _has_api_video_fields(api_data: dict) -> bool:
+    return bool(api_data) and all(api_data.get(k) is not None for k in API_VIDEO_FIELDS)
+
+
+def _parse_video_data(page: Union[str, bytes], bvid: str,
+                      log: Callable[[str], None]) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    从网页原始内容中解析 __INITIAL_STATE__.videoData 与 keywords meta（不构建 DOM）
+    :return: (videoData, keywords)，解析失败时 videoData 为 None
+    """
+    try:
+        if isinstance(page, str):
+            page = page.encode("utf-8")
+        if initial_state_parser.INITIAL_STATE_MARKER not in page:
+            log(f"[WARN] 未找到 __INITIAL_STATE__ 数据: {bvid}")
+            return None, None
+
+        video_data = initial_state_parser.extract_video_data(page)
+        if not video_data:
+            log(f"[WARN] 未能解析 videoData: {bvid}")
+            return None, None
+        return video_data, initial_state_parser.extract_keywords(page)
+    except Exception as e:
+        log(f"[PARSE ERROR] 解析网页 {bvid} 失败: {e}")
+        return None, None
+
+
+def _build_pages(video_data: dict, api_data: dict) -> list:
+    # 分P列表（页码、cid、分P标题、时长），网页与 view 接口返回相同结构，任取其一，无需逐P请求
+    pages = video_data.get("pages") or api_data.get("pages") or []
+    return [
+        {
+            "page": p.get("page", i + 1),
+            "cid": p.get("cid"),
+            "part": (p.get("part") or "").strip(),
+            "duration": p.get("duration", 0),
+        }
+        for i, p in enumerate(pages) if p.get("cid")
+    ]
+
+
+def _build_video_info(bvid: str, video_data: dict, api_data: dict, keywords: Optional[str],
+                      log: Callable[[str], None], comment_base: str = COMMENT_BASE) -> dict:
+    # 合并网页 videoData 与 API 数据，生成统一的视频信息字典
+    cid = video_data.get("cid")
+
+    # 发布时间格式化
+    pubdate_ts = api_data.get("pubdate", 0)
+    try:
+        publish_date = datetime.fromtimestamp(pubdate_ts).strftime("%Y-%m-%d %H:%M:%S") if pubdate_ts else "未知"
+    except Exception:
+        publish_date = "未知"
+
+    # 作者简介
+    video_desc = video_data.get("desc", "").strip()
+    author_desc = video_desc if video_desc else "未找到作者简介"
+
+    # 标签
+    tags_list = api_data.get("tag")
+    tags = None
+    if tags_list and isinstance(tags_list, list):
+        tags = ",".join(t.get("tag_name", "") for t in tags_list if t.get("tag_name"))
+        if not tags:
+            tags = None
+    # TODO(FinNank1ng 星丶白羽莲): 构式结构，日后考虑优化
+    if not tags:
+        try:
+            if keywords is not None:
+                keywords = keywords.strip()
+                if keywords:
+                    keyword_list = keywords.split(",")
+                    title = video_data.get("title", "").strip()
+                    if title in keyword_list:
+                        keyword_list.remove(title)
+                    if len(keyword_list) > 4:
+                        keyword_list = keyword_list[:-4]
+                    tags = ",".join(keyword_list) if keyword_list else "该视频没有标签"
+                else:
+                    tags = "该视频没有标签"
+            else:
+                tags = "该视频没有标签"
+        except Exception as e:
+            log(f"[TAG WARN] 获取标签失败: {e}")
+            tags = "该视频没有标签"
+    if not tags:
+        tags = "该视频没有标签"
+
+    # 返回信息
+    return {
+        "bvid": bvid,
+        "cid": cid,
+        "title": video_data.get("title", "无标题").strip(),
+        "author": video_data.get("owner", {}).get("name", "未知作者"),
+        "author_id": str(video_data.get("owner", {}).get("mid", "")),
+        "publish_date": publish_date,
+        "duration": api_data.get("duration", 0),
+        **_stats_from_api(api_data.get("stat", {})),
+        "video_desc": video_data.get("desc", "").strip(),
+        "author_desc": author_desc,
+        "tags": tags,
+        "cover_url": video_data.get("pic", ""),
+        "danmaku_url": f"{comment_base}/{cid}.xml" if cid else None,
+        "video_aid": str(video_data.get("aid", "")),
+        "pages": _build_pages(video_data, api_data),
+    }
+
 
 class BilibiliInfoExtractor:
     # B站视频信息提取器，结合网页和API获取视频详细信息
-    def __init__(self, log: Optional[Callable[[str], None]] = None):
+    def __init__(self, log: Optional[Callable[[str], None]] = None, pool_size: int = 10,
+                 api_first: bool = False, cache: Optional[VideoInfoCache] = None,
+                 scheduler: Optional[RequestScheduler] = None,
+                 web_base: str = WEB_BASE, api_base: str = API_BASE, comment_base: str = COMMENT_BASE):
         """
         :param log: 日志回调函数 log(str)，默认使用 print
+        :param pool_size: 每个主机的 keep-alive 连接池大小，多线程共享同一实例时应不小于线程数
+        :param api_first: 优先仅使用 API 数据构建结果，字段缺失时才下载并解析网页；
+                          view 接口不含标签，每个视频需额外请求一次标签接口（远小于整页网页），
+                          标签接口失败时按无标签处理，不回退到网页
+        :param cache: 可选的本地缓存，静态信息未过期时只通过轻量接口刷新统计数据
+        :param scheduler: 可选的请求调度器，负责限速；设置后被限流的请求抛出 ThrottledError
+        :param web_base: 视频网页地址前缀（测试时可指向本地服务）
+        :param api_base: API 地址前缀（测试时可指向本地服务）
+        :param comment_base: 弹幕 XML 地址前缀（测试时可指向本地服务）
         """
         print("[DEBUG] BilibiliInfoExtractor 初始化", flush=True)
         self.session = requests.Session()
         self.session.headers.update(HttpClient.BASE_HEADERS)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.log = log or (lambda s: print(s, flush=True))
+        self.api_first = api_first
+        self.cache = cache
+        self.scheduler = scheduler
+        self.web_base = web_base.rstrip("/")
+        self.api_base = api_base.rstrip("/")
+        self.comment_base = comment_base.rstrip("/")
+
+    def _get_page(self, url: str) -> requests.Response:
+        if self.scheduler is None:
+            return self.session.get(url, timeout=10)
+        self.scheduler.acquire("html")
+        resp = self.session.get(url, timeout=10)
+        self.scheduler.check_response("html", resp.status_code, elapsed=resp.elapsed.total_seconds())
+        return resp
+
+    def _get_json(self, url: str) -> dict:
+        if self.scheduler is None:
+            return self.session.get(url, timeout=10).json()
+        self.scheduler.acquire("api")
+        resp = self.session.get(url, timeout=10)
+        try:
+            data = resp.json()
+        except ValueError:
+            # 先交给调度器识别限流（412 等非 JSON 响应），其余情况与未设置调度器时一样抛出解析错误
+            self.scheduler.check_response("api", resp.status_code, elapsed=resp.elapsed.total_seconds())
+            raise
+        self.scheduler.check_response("api", resp.status_code, data.get("code"),
+                                      elapsed=resp.elapsed.total_seconds())
+        return data
+
+    def _get_api_data(self, bvid: str) -> dict:
+        try:
+            api_url = f"{self.api_base}/x/web-interface/view?bvid={bvid}"
+            api_resp = self._get_json(api_url)
+            return api_resp.get("data") or {}
+        except ThrottledError:
+            raise
+        except Exception as e:
+            _count_request_error("api", e)
+            self.log(f"[API ERROR] 获取API数据 {bvid} 失败: {e}")
+            return {}
+
+    def _get_api_tags(self, bvid: str) -> Optional[list]:
+        # 轻量标签接口，失败返回 None
+        try:
+            tag_url = f"{self.api_base}/x/tag/archive/tags?bvid={bvid}"
+            tag_resp = self._get_json(tag_url)
+            if tag_resp.get("code") != 0:
+                return None
+            return tag_resp.get("data") or []
+        except ThrottledError:
+            raise
+        except Exception as e:
+            _count_request_error("api", e)
+            self.log(f"[API ERROR] 获取标签数据 {bvid} 失败: {e}")
+            return None
+
+    def get_api_stats(self, bvid: str) -> Optional[dict]:
+        """
+        通过轻量统计接口获取播放、点赞等数据
+        :return: 以 API_STAT_KEYS 为键的 dict，失败返回 None
+        """
+        try:
+            stat_url = f"{self.api_base}/x/web-interface/archive/stat?bvid={bvid}"
+            stat_resp = self._get_json(stat_url)
+            if stat_resp.get("code") != 0 or not stat_resp.get("data"):
+                return None
+            return _stats_from_api(stat_resp["data"])
+        except ThrottledError:
+            raise
+        except Exception as e:
+            _count_request_error("api", e)
+            self.log(f"[API ERROR] 获取统计数据 {bvid} 失败: {e}")
+            return None
+
+    def _get_cached_video_info(self, bvid: str) -> Optional[dict]:
+        cached = self.cache.get(bvid)
+        if cached is None:
+            return None
+        video_info, static_fresh, stats_fresh = cached
+        if not static_fresh:
+            return None
+        if stats_fresh:
+            self.log(f"[CACHE] 命中缓存: {bvid}")
+            return video_info
+        stats = self.get_api_stats(bvid)
+        if stats is None:
+            return None
+        self.log(f"[CACHE] 命中缓存，已刷新统计数据: {bvid}")
+        return self.cache.update_stats(bvid, stats)
 
     def get_video_info(self, bvid: str) -> dict:
         """
         视频BV号获取完整视频信息
         :param bvid: 视频BV号，如 'BV1tG4y1s72q'
         :return: dict 包含视频详情字段
+        :raises ThrottledError: 设置了 scheduler 且请求被限流
         """
-        print(f"[DEBUG] get_video_info 调用: {bvid}", flush=True)
+        self.log(f"[DEBUG] get_video_info 调用: {bvid}")
+        start = time.perf_counter()
+        if self.cache is not None:
+            result = self._get_cached_video_info(bvid)
+            if result is not None:
+                metrics.observe("bili_video_info_seconds", time.perf_counter() - start, source="cache")
+                return result
+
+        result, api_data = self._fetch_video_info(bvid)
+        metrics.observe("bili_video_info_seconds", time.perf_counter() - start, source="fetch")
+        if result and self.cache is not None:
+            self.cache.put(bvid, result, api_data)
+        if result:
+            # 只输出摘要，完整结果已写入表格与缓存，逐条输出整个字典会淹没日志
+            self.log(f"[DEBUG] 返回数据: {bvid} {result.get('title', '')} 播放 {result.get('views')} "
+                     f"点赞 {result.get('likes')} 分P {len(result.get('pages') or [])}")
+        return result
+
+    def _fetch_video_info(self, bvid: str) -> Tuple[dict, Optional[dict]]:
+        # 返回 (视频信息, view 接口原始数据)
+        api_data = None
+        if self.api_first:
+            with metrics.timer("bili_video_info_step_seconds", step="api"):
+                api_data = self._get_api_data(bvid)
+            if _has_api_video_fields(api_data):
+                tags = api_data.get("tag") or self._get_api_tags(bvid)
+                if tags is None:
+                    # 标签只是附加字段，标签接口失败时不为它下载整页网页
+                    self.log(f"[WARN] 标签接口失败，按无标签处理: {bvid}")
+                    tags = []
+                video_info = _build_video_info(bvid, api_data, {**api_data, "tag": tags}, None, self.log,
+                                               self.comment_base)
+                return video_info, api_data
+            self.log(f"[INFO] API 数据不完整，回退到网页解析: {bvid}")
+
         try:
-            base_url = f"https://www.bilibili.com/video/{bvid}"
-            resp = self.session.get(base_url, timeout=10)
+            base_url = f"{self.web_base}/video/{bvid}"
+            with metrics.timer("bili_video_info_step_seconds", step="html_fetch"):
+                resp = self._get_page(base_url)
+                content = resp.content
             resp.raise_for_status()
+        except ThrottledError:
+            raise
         except Exception as e:
+            _count_request_error("html", e)
             self.log(f"[HTTP ERROR] 获取网页 {bvid} 失败: {e}")
-            return {}
+            return {}, api_data
 
-        try:
-            soup = BeautifulSoup(resp.text, "html.parser")
-            script_tag = soup.find("script", string=re.compile(r"window\.__INITIAL_STATE__"))
-            if not script_tag:
-                self.log(f"[WARN] 未找到 __INITIAL_STATE__ 数据: {bvid}")
-                return {}
-
-            match = re.search(r"window\.__INITIAL_STATE__=(\{.*?\});", script_tag.string)
-            if not match:
-                self.log(f"[WARN] 未能从脚本中提取 __INITIAL_STATE__ JSON: {bvid}")
-                return {}
-
-            initial_state = json.loads(match.group(1))
-            video_data = initial_state.get("videoData", {})
-            if not video_data:
-                self.log(f"[WARN] 未能解析 videoData: {bvid}")
-                return {}
-
-            cid = video_data.get("cid")
-        except Exception as e:
-            self.log(f"[PARSE ERROR] 解析网页 {bvid} 失败: {e}")
-            return {}
+        with metrics.timer("bili_video_info_step_seconds", step="html_parse"):
+            video_data, keywords = _parse_video_data(content, bvid, self.log)
+        if video_data is None:
+            return {}, api_data
 
         # API 数据
         # TODO(FinNank1ng 星丶白羽莲)：考虑复用性整合代码，双保险也需要考虑优化，API拿不到基本信息
-        try:
-            api_url = f"https://api.bilibili.com/x/web-interface/view?bvid={bvid}"
-            api_resp = self.session.get(api_url, timeout=10).json()
-            api_data = api_resp.get("data", {})
-        except Exception as e:
-            self.log(f"[API ERROR] 获取API数据 {bvid} 失败: {e}")
+        if api_data is None:
+            with metrics.timer("bili_video_info_step_seconds", step="api"):
+                api_data = self._get_api_data(bvid)
+
+        return _build_video_info(bvid, video_data, api_data, keywords, self.log, self.comment_base), api_data
+
+
+class AsyncBilibiliInfoExtractor:
+    # 基于 asyncio 的B站视频信息提取器，所有请求共享一个连接池
+    def __init__(self, log: Optional[Callable[[str], None]] = None,
+                 max_concurrency: int = 1000, pool_size: int = 100, api_first: bool = False,
+                 web_base: str = WEB_BASE, api_base: str = API_BASE, comment_base: str = COMMENT_BASE):
+        """
+        :param log: 日志回调函数 log(str)，默认使用 print
+        :param max_concurrency: 同时处理的视频数上限（信号量）
+        :param pool_size: 连接池最大连接数
+        :param api_first: 优先仅使用 API 数据构建结果，字段缺失时才下载并解析网页；
+                          标签接口与 view 接口并发请求，失败时按无标签处理，不回退到网页
+        :param web_base: 视频网页地址前缀（测试时可指向本地服务）
+        :param api_base: API 地址前缀（测试时可指向本地服务）
+        :param comment_base: 弹幕 XML 地址前缀（测试时可指向本地服务）
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncBilibiliInfoExtractor 需要安装 aiohttp: pip install aiohttp")
+        self.log = log or (lambda s: print(s, flush=True))
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.api_first = api_first
+        self.web_base = web_base.rstrip("/")
+        self.api_base = api_base.rstrip("/")
+        self.comment_base = comment_base.rstrip("/")
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                headers=HttpClient.BASE_HEADERS,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=10),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _fetch_html(self, bvid: str) -> bytes:
+        async with self._session.get(f"{self.web_base}/video/{bvid}") as resp:
+            resp.raise_for_status()
+            return await resp.read()
+
+    async def _fetch_api(self, bvid: str) -> dict:
+        async with self._session.get(f"{self.api_base}/x/web-interface/view", params={"bvid": bvid}) as resp:
+            api_resp = await resp.json(content_type=None)
+            return api_resp.get("data") or {}
+
+    async def _fetch_api_tags(self, bvid: str) -> Optional[list]:
+        async with self._session.get(f"{self.api_base}/x/tag/archive/tags", params={"bvid": bvid}) as resp:
+            tag_resp = await resp.json(content_type=None)
+            if tag_resp.get("code") != 0:
+                return None
+            return tag_resp.get("data") or []
+
+    async def _get_video_info_api_first(self, bvid: str) -> Optional[dict]:
+        # API 与标签接口并发请求，数据完整时直接返回结果，否则返回 None
+        api_data, tags = await asyncio.gather(
+            self._fetch_api(bvid), self._fetch_api_tags(bvid), return_exceptions=True
+        )
+        if isinstance(api_data, BaseException):
+            self.log(f"[API ERROR] 获取API数据 {bvid} 失败: {api_data}")
+            return None
+        if not _has_api_video_fields(api_data):
+            return None
+        if isinstance(tags, BaseException):
+            self.log(f"[API ERROR] 获取标签数据 {bvid} 失败: {tags}")
+            tags = None
+        tags = api_data.get("tag") or tags
+        if tags is None:
+            # 与同步版一致：标签接口失败时按无标签处理，不回退到网页解析
+            self.log(f"[WARN] 标签接口失败，按无标签处理: {bvid}")
+            tags = []
+        return _build_video_info(bvid, api_data, {**api_data, "tag": tags}, None, self.log, self.comment_base)
+
+    async def get_video_info(self, bvid: str) -> dict:
+        """
+        视频BV号获取完整视频信息，网页与 API 请求并发发出
+        :param bvid: 视频BV号，如 'BV1tG4y1s72q'
+        :return: dict 包含视频详情字段，失败时为空 dict
+        """
+        await self.open()
+        if self.api_first:
+            async with self._semaphore:
+                result = await self._get_video_info_api_first(bvid)
+            if result is not None:
+                return result
+            self.log(f"[INFO] API 数据不完整，回退到网页解析: {bvid}")
+
+        async with self._semaphore:
+            html, api_data = await asyncio.gather(
+                self._fetch_html(bvid), self._fetch_api(bvid), return_exceptions=True
+            )
+
+        if isinstance(html, BaseException):
+            self.log(f"[HTTP ERROR] 获取网页 {bvid} 失败: {html}")
+            return {}
+        if isinstance(api_data, BaseException):
+            self.log(f"[API ERROR] 获取API数据 {bvid} 失败: {api_data}")
             api_data = {}
 
-        # 发布时间格式化
-        pubdate_ts = api_data.get("pubdate", 0)
-        try:
-            publish_date = datetime.fromtimestamp(pubdate_ts).strftime("%Y-%m-%d %H:%M:%S") if pubdate_ts else "未知"
-        except Exception:
-            publish_date = "未知"
-
-        # 作者简介
-        video_desc = video_data.get("desc", "").strip()
-        author_desc = video_desc if video_desc else "未找到作者简介"
-
-        # 标签
-        tags_list = api_data.get("tag")
-        tags = None
-        if tags_list and isinstance(tags_list, list):
-            tags = ",".join(t.get("tag_name", "") for t in tags_list if t.get("tag_name"))
-            if not tags:
-                tags = None
-        # TODO(FinNank1ng 星丶白羽莲): 构式结构，日后考虑优化
-        if not tags:
-            try:
-                keywords_meta = soup.find("meta", itemprop="keywords")
-                if keywords_meta and keywords_meta.has_attr("content"):
-                    keywords = keywords_meta["content"].strip()
-                    if keywords:
-                        keyword_list = keywords.split(",")
-                        title = video_data.get("title", "").strip()
-                        if title in keyword_list:
-                            keyword_list.remove(title)
-                        if len(keyword_list) > 4:
-                            keyword_list = keyword_list[:-4]
-                        tags = ",".join(keyword_list) if keyword_list else "该视频没有标签"
-                    else:
-                        tags = "该视频没有标签"
-                else:
-                    tags = "该视频没有标签"
-            except Exception as e:
-                self.log(f"[TAG WARN] 获取标签失败: {e}")
-                tags = "该视频没有标签"
-        if not tags:
-            tags = "该视频没有标签"
+        video_data, keywords = _parse_video_data(html, bvid, self.log)
+        if video_data is None:
+            return {}
+        return _build_video_info(bvid, video_data, api_data, keywords, self.log, self.comment_base)
 
-        # 返回信息
-        result = {
-            "bvid": bvid,
-            "cid": cid,
-            "title": video_data.get("title", "无标题").strip(),
-            "author": video_data.get("owner", {}).get("name", "未知作者"),
-            "author_id": str(video_data.get("owner", {}).get("mid", "")),
-            "publish_date": publish_date,
-            "duration": api_data.get("duration", 0),
-            "views": api_data.get("stat", {}).get("view", 0),
-            "danmaku": api_data.get("stat", {}).get("danmaku", 0),
-            "likes": api_data.get("stat", {}).get("like", 0),
-            "coins": api_data.get("stat", {}).get("coin", 0),
-            "favorites": api_data.get("stat", {}).get("favorite", 0),
-            "shares": api_data.get("stat", {}).get("share", 0),
-            "video_desc": video_data.get("desc", "").strip(),
-            "author_desc": author_desc,
-            "tags": tags,
-            "cover_url": video_data.get("pic", ""),
-            "danmaku_url": f"https://comment.bilibili.com/{cid}.xml" if cid else None,
-            "video_aid": str(video_data.get("aid", "")),
-        }
-        print(f"[DEBUG] 返回数据: {json.dumps(result, ensure_ascii=False, indent=2)}", flush=True)
-        return result
\ No newline at end of file
+    async def get_video_info_batch(self, bvids: Iterable[str]) -> List[dict]:
+        """
+        批量并发获取视频信息，返回结果顺序与输入一致
+        :param bvids: BV号列表
+        """
+        await self.open()
+        return await asyncio.gather(*(self.get_video_info(bvid) for bvid in bvids))
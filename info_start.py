@@ -1,92 +1,446 @@
 import os
+import sys
 import time
 import threading
-from typing import Callable, Optional, Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable, Iterable, Optional, Sequence, Union
 
-from info_extractor import BilibiliInfoExtractor
-from resource_downloader import ResourceDownloader
-from info_data import append_video_info, init_excel
+from info_extractor import API_BASE, COMMENT_BASE, WEB_BASE, BilibiliInfoExtractor
+from resource_downloader import MediaPipeline, ResourceDownloader
+from info_data import ResultSink, open_sinks, init_excel
+from rate_limiter import RequestScheduler, RetryQueue, ThrottledError
+from video_cache import VideoInfoCache
+from job_state import JobStateStore, RESOURCE_STAGES
+from danmaku_store import DanmakuStore
+from danmaku_segments import DanmakuSegmentFetcher
+from bvid_store import BvidStore, STATUS_DONE, STATUS_FAILED, open_bvid_store, store_path_for
+from paths import resolve_path
+from progress import ProgressTracker
+from profiling import RunProfiler, profile_dir_for
+import metrics
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-_excel_lock = threading.Lock()
+def _download_data(bvid: str, sink: ResultSink, logger: Callable[[str], None],
+                   extractor: Optional[BilibiliInfoExtractor] = None, job: Optional[JobStateStore] = None,
+                   bvid_store: Optional[BvidStore] = None, tracker: Optional[ProgressTracker] = None):
+    # 断点续传：信息已提取并写表的视频直接复用记录，避免重复写入
+    if job is not None and "metadata" not in job.pending_stages(bvid, ("metadata",)):
+        video_info = job.load_video_info(bvid)
+        if video_info:
+            logger(f"[RESUME] 信息已提取，跳过: {bvid}")
+            return video_info
 
-
-def _abs(p: Optional[Union[str, Callable]], default_name: str) -> str:
-    if callable(p):
-        p = None
-    if p:
-        return p if os.path.isabs(p) else os.path.join(BASE_DIR, str(p))
-    return os.path.join(BASE_DIR, default_name)
-
-
-def load_bvid_list(file_path: str):
-    if not os.path.exists(file_path):
-        return []
-    with open(file_path, "r", encoding="utf-8") as f:
-        return [line.strip() for line in f if line.strip()]
+    # 传入共享的 extractor 可复用其连接池（keep-alive / TLS）
+    extractor = extractor or BilibiliInfoExtractor()
+    if tracker is None:
+        with metrics.timer("bili_stage_seconds", stage="metadata"):
+            return _extract_info(bvid, sink, logger, extractor, job, bvid_store)
+    tracker.stage_started("metadata")
+    try:
+        with metrics.timer("bili_stage_seconds", stage="metadata"):
+            video_info = _extract_info(bvid, sink, logger, extractor, job, bvid_store)
+    except ThrottledError:
+        tracker.stage_retried("metadata")
+        raise
+    except Exception:
+        tracker.stage_finished("metadata", False)
+        raise
+    tracker.stage_finished("metadata", True)
+    return video_info
 
 
-def _download_data(bvid: str, excel_path: str, logger: Callable[[str], None]):
-    extractor = BilibiliInfoExtractor()
+def _extract_info(bvid: str, sink: ResultSink, logger: Callable[[str], None], extractor: BilibiliInfoExtractor,
+                  job: Optional[JobStateStore], bvid_store: Optional[BvidStore]):
     video_info = extractor.get_video_info(bvid)
+    if not video_info:
+        if job is not None:
+            job.mark(bvid, "metadata", False, "未获取到视频信息")
+        if bvid_store is not None:
+            bvid_store.set_status(bvid, STATUS_FAILED, "未获取到视频信息")
+        raise RuntimeError("未获取到视频信息")
     video_info["url"] = f"https://www.bilibili.com/video/{bvid}"
 
-    with _excel_lock:
-        append_video_info(excel_path, video_info)
+    if sink.append(video_info):
         logger(f"[Excel] 信息已写入: {bvid}")
+        if job is not None:
+            job.save_video_info(bvid, video_info)
+            job.mark(bvid, "metadata", True)
+        if bvid_store is not None:
+            bvid_store.set_status(bvid, STATUS_DONE)
+    else:
+        if job is not None:
+            job.mark(bvid, "metadata", False, "写入表格失败")
+        if bvid_store is not None:
+            bvid_store.set_status(bvid, STATUS_FAILED, "写入表格失败")
 
     logger(f"[INFO] 信息提取完成: {video_info.get('title', '')}")
     return video_info
 
 
-def _download_resources(video_info: dict, output_dir: str):
+def _total(bvid_list) -> str:
+    # 日志中显示的总数，流式来源总数未知
+    return str(len(bvid_list)) if hasattr(bvid_list, "__len__") else "?"
+
+
+def _resource_stages(video_info: dict, job: Optional[JobStateStore]):
+    # 返回 (需要执行的资源阶段, 阶段回调, 失败阶段列表)；未启用断点记录时执行全部阶段
+    # 失败阶段列表由回调填充，全部阶段结束后据此判断该视频是否成功
+    failed = []
+    bvid = video_info["bvid"]
+    stages = list(RESOURCE_STAGES) if job is None else job.pending_stages(bvid, RESOURCE_STAGES)
+
+    def on_stage(stage, ok, error):
+        if not ok:
+            failed.append(stage)
+        if job is not None:
+            job.mark(bvid, stage, ok, error)
+    return stages, on_stage, failed
+
+
+def _download_resources(video_info: dict, downloader: ResourceDownloader, job: Optional[JobStateStore] = None) -> bool:
+    """
+    :return: 全部资源阶段成功（或无需下载）返回 True
+    """
     try:
-        downloader = ResourceDownloader(output_dir=output_dir)
-        downloader.download_all(video_info)
+        stages, on_stage, failed = _resource_stages(video_info, job)
+        if not stages:
+            return True
+        downloader.download_all(video_info, stages=stages, on_stage=on_stage)
     except Exception as e:
         print(f"[ERROR] 下载资源失败: {video_info.get('url')} - {e}", flush=True)
+        return False
+    return not failed
+
+
+def _requeue(retries: RetryQueue, bvid: str, attempt: int, error: ThrottledError,
+             logger: Callable[[str], None], job: Optional[JobStateStore]) -> bool:
+    # 被限流的 BV 号延迟重试，超过次数后记为失败
+    if retries.push(bvid, attempt + 1):
+        logger(f"[RETRY] {bvid} {error}，已安排第 {attempt + 1} 次重试")
+        return True
+    logger(f"[ERROR] 提取 {bvid} 多次被限流，放弃: {error}")
+    if job is not None:
+        job.mark(bvid, "metadata", False, str(error))
+    return False
+
+
+def _run_sequential(bvid_list, sink: ResultSink, output_dir, logger, scheduler: RequestScheduler,
+                    extractor: BilibiliInfoExtractor, job: Optional[JobStateStore], audio_format: str,
+                    danmaku_store: Optional[DanmakuStore], danmaku_segments: Optional[DanmakuSegmentFetcher],
+                    bvid_store: Optional[BvidStore], tracker: ProgressTracker):
+    # 逐条顺序处理，被限流的 BV 号退避后插队重试
+    total = _total(bvid_list)
+    source = iter(bvid_list)
+    exhausted = False
+    retries = RetryQueue(scheduler)
+    # 整个任务共用一个下载器，封面/弹幕请求复用连接池
+    with ResourceDownloader(output_dir=output_dir, scheduler=scheduler, audio_format=audio_format,
+                            danmaku_store=danmaku_store, danmaku_segments=danmaku_segments,
+                            progress=tracker, web_base=extractor.web_base,
+                            comment_base=extractor.comment_base) as downloader:
+        idx = 0
+        while True:
+            tracker.set_gauge("retry_pending", len(retries))
+            item = retries.pop_ready()
+            if item is None:
+                bvid = None if exhausted else next(source, None)
+                if bvid is None:
+                    exhausted = True
+                    if not len(retries):
+                        break
+                    time.sleep(retries.next_delay() or 0)
+                    continue
+                item = (bvid, 0)
+            bvid, attempt = item
+            if attempt == 0:
+                idx += 1
+            logger(f"[MAIN] ({idx}/{total}) 提取视频信息 {bvid} ...")
+            try:
+                video_info = _download_data(bvid, sink, logger, extractor, job, bvid_store, tracker)
+            except ThrottledError as e:
+                if not _requeue(retries, bvid, attempt, e, logger, job):
+                    tracker.video_finished(False)
+                continue
+            except Exception as e:
+                logger(f"[ERROR] 提取 {bvid} 出错: {e}")
+                tracker.video_finished(False)
+                continue
+
+            logger(f"[MAIN] ({idx}/{total}) 下载视频资源 {bvid} ...")
+            try:
+                ok = _download_resources(video_info, downloader, job)
+            except Exception as e:
+                logger(f"[ERROR] 下载 {bvid} 出错: {e}")
+                ok = False
+            tracker.video_finished(ok)
+
+
+def _run_concurrent(bvid_list, sink: ResultSink, output_dir, logger, scheduler: RequestScheduler,
+                    extractor: BilibiliInfoExtractor, job: Optional[JobStateStore],
+                    extract_workers: int, download_workers: int, transcode_workers: Optional[int],
+                    audio_format: str, danmaku_store: Optional[DanmakuStore],
+                    danmaku_segments: Optional[DanmakuSegmentFetcher], bvid_store: Optional[BvidStore],
+                    tracker: ProgressTracker):
+    # 信息提取使用线程池，提取完成后立即提交到媒体流水线（网络下载池 + 转码池）
+    total = _total(bvid_list)
+    source = iter(bvid_list)
+    # 同时排队的提取任务上限，BV 号来源为流式迭代器时按需读取
+    max_pending = extract_workers * 4
+    progress = {"extracted": 0, "downloaded": 0}
+    progress_lock = threading.Lock()
+    retries = RetryQueue(scheduler)
+
+    def extract_task(bvid):
+        logger(f"[MAIN] 提取视频信息 {bvid} ...")
+        return _download_data(bvid, sink, logger, extractor, job, bvid_store, tracker)
+
+    def on_downloaded(failed, future):
+        with progress_lock:
+            progress["downloaded"] += 1
+            done = progress["downloaded"]
+        try:
+            bvid = future.result()
+        except Exception as e:
+            logger(f"[ERROR] 下载资源出错: {e}")
+            tracker.video_finished(False)
+            return
+        tracker.video_finished(not failed)
+        if failed:
+            logger(f"[WARN] ({done}/{total}) 视频资源部分失败 {bvid}: {', '.join(failed)}")
+        else:
+            logger(f"[MAIN] ({done}/{total}) 视频资源下载完成 {bvid}")
+
+    downloader = ResourceDownloader(output_dir=output_dir, log=logger, scheduler=scheduler,
+                                    audio_format=audio_format, danmaku_store=danmaku_store,
+                                    danmaku_segments=danmaku_segments, progress=tracker,
+                                    web_base=extractor.web_base, comment_base=extractor.comment_base)
+    with downloader, MediaPipeline(downloader, io_workers=download_workers,
+                                   transcode_workers=transcode_workers) as pipeline:
+        with ThreadPoolExecutor(max_workers=extract_workers, thread_name_prefix="extract") as extract_pool:
+            pending = {}
+            exhausted = False
+            while True:
+                tracker.set_gauge("retry_pending", len(retries))
+                tracker.set_gauge("extract_pending", len(pending))
+                tracker.set_gauge("media_videos", pipeline.pending_videos)
+                tracker.set_gauge("media_transcodes", pipeline.pending_transcodes)
+                while not exhausted and len(pending) < max_pending:
+                    bvid = next(source, None)
+                    if bvid is None:
+                        exhausted = True
+                    else:
+                        pending[extract_pool.submit(extract_task, bvid)] = (bvid, 0)
+                if not pending and not len(retries) and exhausted:
+                    break
+                item = retries.pop_ready()
+                while item is not None:
+                    pending[extract_pool.submit(extract_task, item[0])] = item
+                    item = retries.pop_ready()
+                if not pending:
+                    time.sleep(retries.next_delay() or 0)
+                    continue
+
+                finished, _ = wait(pending, timeout=retries.next_delay(), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    bvid, attempt = pending.pop(future)
+                    try:
+                        video_info = future.result()
+                    except ThrottledError as e:
+                        if not _requeue(retries, bvid, attempt, e, logger, job):
+                            tracker.video_finished(False)
+                        continue
+                    except Exception as e:
+                        logger(f"[ERROR] 提取 {bvid} 出错: {e}")
+                        tracker.video_finished(False)
+                        continue
+                    with progress_lock:
+                        progress["extracted"] += 1
+                        done = progress["extracted"]
+                    logger(f"[MAIN] ({done}/{total}) 信息提取完成 {bvid}，开始下载视频资源")
+                    try:
+                        stages, on_stage, failed = _resource_stages(video_info, job)
+                        pipeline.submit(video_info, stages, on_stage).add_done_callback(
+                            partial(on_downloaded, failed))
+                    except Exception as e:
+                        logger(f"[ERROR] 下载 {bvid} 出错: {e}")
+                        tracker.video_finished(False)
 
 
 def run_extraction(
         bvid_file: Optional[Union[str, Callable]] = None,
         excel_path: Optional[Union[str, Callable]] = None,
         output_dir: Optional[Union[str, Callable]] = None,
-        log: Optional[Callable[[str], None]] = None
+        log: Optional[Callable[[str], None]] = None,
+        concurrent: bool = False,
+        extract_workers: int = 4,
+        download_workers: int = 2,
+        requests_per_second: float = 1 / 0.6,
+        api_first: bool = False,
+        sinks: Sequence[str] = ("excel",),
+        excel_part_rows: Optional[int] = None,
+        cache_file: Optional[str] = None,
+        job_file: Optional[str] = None,
+        max_retries: int = 5,
+        transcode_workers: Optional[int] = None,
+        audio_format: str = "m4a",
+        index_danmaku: bool = False,
+        full_danmaku: bool = False,
+        bvids: Optional[Iterable[str]] = None,
+        progress: Optional[Callable[[dict], None]] = None,
+        progress_interval: float = 1.0,
+        metrics_port: Optional[int] = None,
+        metrics_host: str = "127.0.0.1",
+        profile: Optional[str] = None,
+        profile_dir: Optional[str] = None,
+        web_base: str = WEB_BASE,
+        api_base: str = API_BASE,
+        comment_base: str = COMMENT_BASE
 ):
+    """
+    :param concurrent: 是否启用并发模式（信息提取与资源下载使用独立线程池）
+    :param extract_workers: 并发模式下信息提取线程数
+    :param download_workers: 并发模式下封面/弹幕/视频等网络下载线程数
+    :param transcode_workers: 并发模式下 ffmpeg 音频提取并发数，默认等于 CPU 核数
+    :param audio_format: 音频格式，m4a 直接保留原始音频流不重新编码，mp3 需 ffmpeg 转码
+    :param index_danmaku: 将弹幕解析为列式文件（output/{bvid}/danmaku.parquet）并写入全局索引，需要 pyarrow
+    :param full_danmaku: 通过分段弹幕接口获取全部历史弹幕（按视频时长每 6 分钟一段并发请求），
+                         默认只下载 XML 接口返回的最近弹幕
+    :param bvids: 直接传入 BV 号（列表或 bv_discovery.discover 等流式迭代器），传入时忽略 bvid_file；
+                  迭代器按提取进度逐个读取，无需先写入列表文件
+    :param progress: 进度回调 progress(快照)，每 progress_interval 秒调用一次，任务结束时再调用一次（finished 为 True）；
+                     快照包含各阶段计数、下载字节数与速度、请求耗时分位数、限速状态与预计剩余时间，
+                     可使用 progress.StatusLinePrinter / JsonProgressWriter 输出
+    :param metrics_port: 设置时在该端口提供 Prometheus 指标（http://metrics_host:metrics_port/metrics），
+                         包括请求耗时与错误/限流计数、网页解析、结果写入、yt-dlp/ffmpeg 耗时及各队列长度；
+                         未设置时不记录指标
+    :param metrics_host: 指标服务监听地址，默认只允许本机访问
+    :param profile: 性能分析模式，None 为关闭：spans 记录各阶段耗时区间，cprofile 另外对各线程运行 cProfile，
+                    sample 另外定时采样全部线程调用栈；结束时写出报告与火焰图折叠栈文件（见 profiling.RunProfiler）
+    :param profile_dir: 性能分析报告目录，默认为 output_dir 旁的 profiles 目录
+    :param web_base: 视频网页地址前缀，api_base / comment_base 为 API 与弹幕 XML 地址前缀（基准测试时指向本地模拟服务）
+    :param requests_per_second: 网页/API/封面/弹幕各类请求的最大频率（每秒），<= 0 表示不限速；
+                                被限流时自动降速，恢复后逐步回升
+    :param api_first: 仅用 API 数据构建视频信息，字段缺失时才回退网页解析
+    :param sinks: 结果输出类型，可多选: excel / csv / jsonl / sqlite / parquet，
+                  除 excel 外均保存在 excel_path 所在目录
+    :param excel_part_rows: 设置时 Excel 每个文件最多保存该行数，写满后续写到 output-002.xlsx 等分卷；
+                            默认不分卷，全部写入 excel_path
+    :param cache_file: 视频信息本地缓存数据库路径，传入即启用缓存
+    :param job_file: 断点记录数据库路径，传入即启用断点续传；全部阶段完成后记录自动清空
+    :param max_retries: 被限流（HTTP 412/429、code -412）的 BV 号最大重试次数
+    """
     logger = log or (lambda msg: print(msg, flush=True))
 
-    bvid_file = _abs(bvid_file, "BVID_list.txt")
-    excel_path = _abs(excel_path, "output.xlsx")
-    output_dir = _abs(output_dir, "output")
+    bvid_file = resolve_path(bvid_file, "BVID_list.txt")
+    excel_path = resolve_path(excel_path, "output.xlsx")
+    output_dir = resolve_path(output_dir, "output")
     os.makedirs(output_dir, exist_ok=True)
 
-    if not os.path.exists(excel_path):
+    if "excel" in sinks and not os.path.exists(excel_path):
         init_excel(excel_path)
 
-    bvid_list = load_bvid_list(bvid_file)
-    if not bvid_list:
-        logger("[INFO] 没有需要处理的 BV 号")
-        return
-
-    logger(f"[MAIN] 共 {len(bvid_list)} 个视频等待处理")
+    streaming = bvids is not None and not isinstance(bvids, (list, tuple))
+    # 从 BV 号列表读取时同时记录每个 BV 号的提取状态
+    bvid_store = None
+    if bvids is None and (os.path.exists(bvid_file) or os.path.exists(store_path_for(bvid_file))):
+        bvid_store = open_bvid_store(bvid_file)
+    bvid_list = (bvid_store.all_bvids() if bvid_store is not None else []) if bvids is None else bvids
+    if not streaming:
+        bvid_list = list(bvid_list)
+        if not bvid_list:
+            logger("[INFO] 没有需要处理的 BV 号")
+            if bvid_store is not None:
+                bvid_store.close()
+            return
 
-    # 逐条顺序处理
-    for idx, bvid in enumerate(bvid_list, start=1):
-        logger(f"[MAIN] ({idx}/{len(bvid_list)}) 提取视频信息 {bvid} ...")
-        try:
-            video_info = _download_data(bvid, excel_path, logger)
-        except Exception as e:
-            logger(f"[ERROR] 提取 {bvid} 出错: {e}")
-            continue
+    job = JobStateStore(resolve_path(job_file, "job_state.db")) if job_file else None
+    processed = []
+    if streaming:
+        def track(source):
+            # 记录实际读取的 BV 号，供任务结束时判断是否全部完成并清理其断点记录
+            for bvid in source:
+                processed.append(bvid)
+                if job is not None and not job.pending_stages(bvid):
+                    continue
+                tracker.video_discovered()
+                yield bvid
+        bvid_list = track(bvid_list)
+        logger("[MAIN] 从 BV 号来源流式读取，边获取边处理")
+    else:
+        processed = bvid_list
+        if job is not None:
+            total = len(bvid_list)
+            bvid_list = [bvid for bvid in bvid_list if job.pending_stages(bvid)]
+            if total != len(bvid_list):
+                logger(f"[RESUME] 从断点继续，跳过已完成的 {total - len(bvid_list)} 个视频")
+        logger(f"[MAIN] 共 {len(bvid_list)} 个视频等待处理")
 
-        logger(f"[MAIN] ({idx}/{len(bvid_list)}) 下载视频资源 {bvid} ...")
-        try:
-            _download_resources(video_info, output_dir)
-        except Exception as e:
-            logger(f"[ERROR] 下载 {bvid} 出错: {e}")
+    scheduler = RequestScheduler(rate=requests_per_second, max_retries=max_retries)
+    tracker = ProgressTracker(total=None if streaming else len(bvid_list), scheduler=scheduler,
+                              interval=progress_interval)
+    if progress is not None:
+        tracker.subscribe(progress)
+    tracker.start()
+    metrics_server = collector = None
+    if metrics_port is not None:
+        metrics_server = metrics.start_metrics_server(metrics_port, metrics_host)
+        collector = metrics.progress_collector(tracker)
+        metrics.registry().add_collector(collector)
+        logger(f"[MAIN] 指标服务: http://{metrics_host}:{metrics_server.port}/metrics")
+    profiler = None
+    if profile:
+        profiler = RunProfiler(resolve_path(profile_dir, "profiles") if profile_dir else profile_dir_for(output_dir),
+                               mode=profile, log=logger).start()
+        logger(f"[MAIN] 性能分析已开启: {profile}")
+    cache = VideoInfoCache(resolve_path(cache_file, "video_cache.db")) if cache_file else None
+    danmaku_store = DanmakuStore(output_dir) if index_danmaku else None
+    danmaku_segments = DanmakuSegmentFetcher(scheduler=scheduler, api_base=api_base) if full_danmaku else None
+    # 输出（含 Excel 工作簿）在整个任务期间保持打开，结束（或异常退出）时统一保存
+    try:
+        with open_sinks(sinks, os.path.dirname(excel_path), {"excel": excel_path}, state=job,
+                        options={"excel": {"part_rows": excel_part_rows}}) as sink:
+            if concurrent:
+                logger(f"[MAIN] 并发模式: 提取线程 {extract_workers}, 下载线程 {download_workers}")
+                extractor = BilibiliInfoExtractor(log=logger, pool_size=max(10, extract_workers),
+                                                  api_first=api_first, cache=cache, scheduler=scheduler,
+                                                  web_base=web_base, api_base=api_base, comment_base=comment_base)
+                _run_concurrent(bvid_list, sink, output_dir, logger, scheduler, extractor, job,
+                                max(1, extract_workers), max(1, download_workers), transcode_workers, audio_format,
+                                danmaku_store, danmaku_segments, bvid_store, tracker)
+            else:
+                extractor = BilibiliInfoExtractor(log=logger, api_first=api_first, cache=cache,
+                                                  scheduler=scheduler, web_base=web_base, api_base=api_base,
+                                                  comment_base=comment_base)
+                _run_sequential(bvid_list, sink, output_dir, logger, scheduler, extractor, job, audio_format,
+                                danmaku_store, danmaku_segments, bvid_store, tracker)
 
-        # 可选：限制请求频率
-        time.sleep(0.6)
+        if job is not None:
+            # 断点数据库可能被多个 BV 号列表共用，只检查与清理本次任务的 BV 号
+            failed = job.failed(processed)
+            if failed:
+                logger(f"[RESUME] {len(failed)} 个视频存在失败阶段，重新运行将只重试失败部分")
+            elif job.is_finished(processed):
+                job.clear(processed)
+    finally:
+        tracker.stop()
+        if profiler is not None:
+            try:
+                logger(f"[MAIN] 性能分析报告: {profiler.stop()}")
+            except Exception as e:
+                logger(f"[ERROR] 写出性能分析报告失败: {e}")
+        if metrics_server is not None:
+            metrics.registry().remove_collector(collector)
+            metrics_server.close()
+        if cache is not None:
+            cache.close()
+        if job is not None:
+            job.close()
+        if danmaku_store is not None:
+            danmaku_store.close()
+        if danmaku_segments is not None:
+            danmaku_segments.close()
+        if bvid_store is not None:
+            bvid_store.close()
 
     logger("[MAIN] 所有任务已完成")
 
@@ -95,6 +449,21 @@ def simple_logger(msg):
     print(msg)
 
 if __name__ == "__main__":
+    import argparse
+    from progress import StatusLinePrinter, JsonProgressWriter
+
+    parser = argparse.ArgumentParser(description="提取 BVID_list.txt 中的视频信息与资源")
+    parser.add_argument("--progress", choices=["line", "json", "none"], default="line",
+                        help="进度输出：line 为状态行（stderr），json 为每秒一行 JSON")
+    parser.add_argument("--progress-file", help="JSON 进度写入的文件，默认输出到 stdout")
+    parser.add_argument("--metrics-port", type=int, help="在该端口提供 Prometheus 指标（/metrics）")
+    parser.add_argument("--metrics-host", default="127.0.0.1", help="指标服务监听地址")
+    parser.add_argument("--profile", choices=["spans", "cprofile", "sample"],
+                        help="性能分析：spans 为各阶段耗时，cprofile / sample 另外记录函数级数据，报告写入 profiles 目录")
+    parser.add_argument("--excel-part-rows", type=int,
+                        help="Excel 每个文件的最大行数，写满后续写到 output-002.xlsx 等分卷，默认不分卷")
+    args = parser.parse_args()
+
     bvid_file = os.path.join(os.path.dirname(__file__), "BVID_list.txt")
 
     excel_path = os.path.join(os.path.dirname(__file__), "output.xlsx")
@@ -103,11 +472,22 @@ if __name__ == "__main__":
 
     os.makedirs(output_dir, exist_ok=True)
 
+    progress = None
+    if args.progress == "line":
+        progress = StatusLinePrinter()
+    elif args.progress == "json":
+        progress = JsonProgressWriter(args.progress_file or sys.stdout)
+
     run_extraction(
         bvid_file=bvid_file,
         excel_path=excel_path,
         output_dir=output_dir,
-        log=simple_logger
+        log=simple_logger,
+        progress=progress,
+        metrics_port=args.metrics_port,
+        metrics_host=args.metrics_host,
+        profile=args.profile,
+        excel_part_rows=args.excel_part_rows
     )
 
     print("测试完成！")
\ No newline at end of file
@@ -0,0 +1,139 @@
+import re
+import json
+import html
+from typing import Optional, Union
+
+# 视频页中内嵌的初始状态脚本标记（赋值号前后允许空白）
+INITIAL_STATE_MARKER = b"window.__INITIAL_STATE__"
+_ASSIGN_RE = re.compile(rb'\s*=\s*')
+
+# 结构字符：对象/数组括号与字符串起始引号
+_STRUCT_RE = re.compile(rb'[{}\[\]"]')
+# 从字符串起始引号之后匹配到结束引号（处理转义）
+_STRING_TAIL_RE = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_COLON_RE = re.compile(rb'\s*:\s*')
+_KEYWORDS_META_RE = re.compile(rb'<meta\b[^>]*\bitemprop=["\']keywords["\'][^>]*>', re.I)
+_CONTENT_ATTR_RE = re.compile(rb'\bcontent=(?:"([^"]*)"|\'([^\']*)\')', re.I)
+
+
+def _to_bytes(data: Union[str, bytes]) -> bytes:
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+def _scan_to_end(buf: bytes, start: int) -> int:
+    """
+    从 buf[start]（必须是 '{' 或 '['）开始扫描，跳过字符串内容，返回配对括号之后的位置
+    """
+    depth = 0
+    pos = start
+    while True:
+        m = _STRUCT_RE.search(buf, pos)
+        if m is None:
+            raise ValueError("JSON 对象未闭合")
+        c = buf[m.start()]
+        if c == 0x22:  # '"'
+            sm = _STRING_TAIL_RE.match(buf, m.end())
+            if sm is None:
+                raise ValueError("JSON 字符串未闭合")
+            pos = sm.end()
+            continue
+        if c in (0x7B, 0x5B):  # '{' '['
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return m.end()
+        pos = m.end()
+
+
+def _find_member_value(buf: bytes, obj_start: int, key: bytes) -> int:
+    """
+    在 buf[obj_start] 开始的对象中查找顶层成员 key，返回其值的起始位置，找不到返回 -1
+    """
+    depth = 0
+    pos = obj_start
+    while True:
+        m = _STRUCT_RE.search(buf, pos)
+        if m is None:
+            return -1
+        c = buf[m.start()]
+        if c == 0x22:
+            sm = _STRING_TAIL_RE.match(buf, m.end())
+            if sm is None:
+                return -1
+            if depth == 1:
+                colon = _COLON_RE.match(buf, sm.end())
+                if colon and buf[m.end():sm.end() - 1] == key:
+                    return colon.end()
+            pos = sm.end()
+            continue
+        if c in (0x7B, 0x5B):
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return -1
+        pos = m.end()
+
+
+def _locate_initial_state(buf: bytes) -> int:
+    idx = buf.find(INITIAL_STATE_MARKER)
+    while idx >= 0:
+        assign = _ASSIGN_RE.match(buf, idx + len(INITIAL_STATE_MARKER))
+        if assign and buf[assign.end():assign.end() + 1] == b"{":
+            return assign.end()
+        idx = buf.find(INITIAL_STATE_MARKER, idx + 1)
+    return -1
+
+
+def extract_initial_state_json(data: Union[str, bytes]) -> Optional[bytes]:
+    """
+    截取完整的 __INITIAL_STATE__ JSON 文本（未解码）
+    :param data: 网页原始内容
+    :return: JSON bytes，未找到返回 None
+    """
+    buf = _to_bytes(data)
+    start = _locate_initial_state(buf)
+    if start < 0:
+        return None
+    return buf[start:_scan_to_end(buf, start)]
+
+
+def extract_initial_state(data: Union[str, bytes]) -> Optional[dict]:
+    """解码完整的 __INITIAL_STATE__ 对象，未找到返回 None"""
+    raw = extract_initial_state_json(data)
+    return json.loads(raw) if raw is not None else None
+
+
+def extract_video_data(data: Union[str, bytes]) -> Optional[dict]:
+    """
+    仅解码 __INITIAL_STATE__.videoData 子树，其余部分只做括号扫描不做 JSON 解码
+    :param data: 网页原始内容
+    :return: videoData dict，未找到返回 None
+    """
+    buf = _to_bytes(data)
+    start = _locate_initial_state(buf)
+    if start < 0:
+        return None
+    value_start = _find_member_value(buf, start, b"videoData")
+    if value_start < 0 or value_start >= len(buf):
+        return None
+    if buf[value_start] != 0x7B:
+        return None
+    return json.loads(buf[value_start:_scan_to_end(buf, value_start)])
+
+
+def extract_keywords(data: Union[str, bytes]) -> Optional[str]:
+    """
+    读取 <meta itemprop="keywords"> 的 content
+    :return: 关键词字符串，未找到返回 None
+    """
+    buf = _to_bytes(data)
+    meta = _KEYWORDS_META_RE.search(buf)
+    if not meta:
+        return None
+    content = _CONTENT_ATTR_RE.search(meta.group(0))
+    if not content:
+        return None
+    value = content.group(1) if content.group(1) is not None else content.group(2)
+    return html.unescape(value.decode("utf-8", errors="replace"))
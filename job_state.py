@@ -0,0 +1,167 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+# 每个 BV 号的处理阶段：信息提取（含写表）、封面、弹幕、视频、音频
+STAGES = ("metadata", "cover", "danmaku", "video", "audio")
+RESOURCE_STAGES = STAGES[1:]
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# 按 BV 号批量查询/删除时每条语句的参数个数（低于 SQLite 的变量数上限）
+_BATCH = 500
+
+
+def _batches(bvids: Iterable[str]):
+    bvids = list(dict.fromkeys(bvids))
+    for i in range(0, len(bvids), _BATCH):
+        yield bvids[i:i + _BATCH]
+
+
+class JobStateStore:
+    """
+    提取任务的断点记录（SQLite），按 (bvid, 阶段) 保存处理状态
+    重启后只执行未完成或失败的阶段，信息提取完成的视频不会重复写入表格
+    多个 BV 号列表可共用同一个数据库：failed / clear 按本次任务的 BV 号限定范围，互不影响
+    """
+    def __init__(self, db_path: str):
+        """
+        :param db_path: 断点数据库路径
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stage_state ("
+            " bvid TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (bvid, stage))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS video_info ("
+            " bvid TEXT PRIMARY KEY,"
+            " info_json TEXT NOT NULL)"
+        )
+        # 多输出部分写入失败时已成功写入的输出，重试时跳过，避免重复行
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sink_state ("
+            " bvid TEXT NOT NULL,"
+            " sink TEXT NOT NULL,"
+            " PRIMARY KEY (bvid, sink))"
+        )
+        self._conn.commit()
+
+    def pending_stages(self, bvid: str, stages: Iterable[str] = STAGES) -> List[str]:
+        """返回尚未完成（未开始或失败）的阶段，保持 STAGES 顺序"""
+        with self._lock:
+            done = {row[0] for row in self._conn.execute(
+                "SELECT stage FROM stage_state WHERE bvid = ? AND status = ?", (bvid, STATUS_DONE)
+            )}
+        return [s for s in stages if s not in done]
+
+    def mark(self, bvid: str, stage: str, ok: bool, error: Optional[str] = None):
+        """记录某阶段的执行结果"""
+        status = STATUS_DONE if ok else STATUS_FAILED
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO stage_state (bvid, stage, status, attempts, error, updated_at)"
+                " VALUES (?, ?, ?, 1, ?, ?)"
+                " ON CONFLICT(bvid, stage) DO UPDATE SET"
+                " status = excluded.status, attempts = attempts + 1,"
+                " error = excluded.error, updated_at = excluded.updated_at",
+                (bvid, stage, status, error, time.time())
+            )
+            self._conn.commit()
+
+    def save_video_info(self, bvid: str, video_info: dict):
+        """保存提取结果，供重启后的资源下载阶段复用"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO video_info VALUES (?, ?)",
+                (bvid, json.dumps(video_info, ensure_ascii=False))
+            )
+            self._conn.commit()
+
+    def load_video_info(self, bvid: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT info_json FROM video_info WHERE bvid = ?", (bvid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def written_sinks(self, bvid: str) -> Set[str]:
+        """返回该视频已成功写入的输出名称"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT sink FROM sink_state WHERE bvid = ?", (bvid,))}
+
+    def mark_sinks_written(self, bvid: str, sinks: Iterable[str]):
+        """记录部分写入时已成功的输出"""
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO sink_state VALUES (?, ?)",
+                                   [(bvid, sink) for sink in sinks])
+            self._conn.commit()
+
+    def clear_sinks(self, bvid: str):
+        """所有输出都已写入后清除部分写入记录"""
+        with self._lock:
+            self._conn.execute("DELETE FROM sink_state WHERE bvid = ?", (bvid,))
+            self._conn.commit()
+
+    def failed(self, bvids: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        返回 {bvid: [失败阶段]}
+        :param bvids: 只统计这些 BV 号，None 表示全部记录
+        """
+        result: Dict[str, List[str]] = {}
+        with self._lock:
+            if bvids is None:
+                rows = self._conn.execute(
+                    "SELECT bvid, stage FROM stage_state WHERE status = ?", (STATUS_FAILED,)
+                ).fetchall()
+            else:
+                rows = []
+                for batch in _batches(bvids):
+                    rows += self._conn.execute(
+                        f"SELECT bvid, stage FROM stage_state WHERE status = ?"
+                        f" AND bvid IN ({', '.join('?' for _ in batch)})", (STATUS_FAILED, *batch)
+                    ).fetchall()
+        for bvid, stage in rows:
+            result.setdefault(bvid, []).append(stage)
+        return result
+
+    def is_finished(self, bvids: Iterable[str]) -> bool:
+        """列表中所有 BV 号的全部阶段是否都已完成"""
+        with self._lock:
+            finished = {row[0] for row in self._conn.execute(
+                "SELECT bvid FROM stage_state WHERE status = ? GROUP BY bvid HAVING COUNT(*) = ?",
+                (STATUS_DONE, len(STAGES))
+            )}
+        return all(bvid in finished for bvid in bvids)
+
+    def clear(self, bvids: Optional[Iterable[str]] = None):
+        """
+        删除断点记录（任务全部完成后调用）
+        :param bvids: 只删除这些 BV 号的记录，None 表示清空全部
+        """
+        with self._lock:
+            if bvids is None:
+                self._conn.execute("DELETE FROM stage_state")
+                self._conn.execute("DELETE FROM video_info")
+                self._conn.execute("DELETE FROM sink_state")
+            else:
+                for batch in _batches(bvids):
+                    placeholders = ", ".join("?" for _ in batch)
+                    self._conn.execute(f"DELETE FROM stage_state WHERE bvid IN ({placeholders})", batch)
+                    self._conn.execute(f"DELETE FROM video_info WHERE bvid IN ({placeholders})", batch)
+                    self._conn.execute(f"DELETE FROM sink_state WHERE bvid IN ({placeholders})", batch)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,193 @@
+import os
+import re
+import time
+import queue
+import logging
+import threading
+from logging.handlers import RotatingFileHandler
+from typing import List, Tuple
+
+# 日志消息沿用 "[标签] 内容" 的写法，按标签判断级别，未带已知标签的按 INFO 处理
+_TAG_RE = re.compile(r"^\s*\[([A-Za-z]+)\]")
+_TAG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "WARN": logging.WARNING,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+# 日志文件每行格式：2024-01-01 12:00:00,123 INFO    [MAIN] 内容
+LOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+FINISHED = "__FINISHED__"
+
+# (时间戳, 级别, 内容)
+LogRecord = Tuple[float, int, str]
+
+
+def level_of(msg: str) -> int:
+    m = _TAG_RE.match(msg)
+    return _TAG_LEVELS.get(m.group(1).upper(), logging.INFO) if m else logging.INFO
+
+
+class BatchingLogSender:
+    """
+    提取子进程使用的日志回调：消息先放入本地缓冲，由后台线程按时间间隔或条数批量放入跨进程队列，
+    每批一次 put，避免逐条序列化与唤醒界面进程
+    """
+    def __init__(self, log_queue, flush_interval: float = 0.2, max_batch: int = 500,
+                 min_level: int = logging.DEBUG):
+        """
+        :param log_queue: multiprocessing.Queue
+        :param flush_interval: 最长发送间隔（秒）
+        :param max_batch: 缓冲达到该条数时立即发送
+        :param min_level: 低于该级别的消息直接丢弃
+        """
+        self.log_queue = log_queue
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.min_level = min_level
+        self._buffer: List[LogRecord] = []
+        self._lock = threading.Lock()
+        self._full = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-sender", daemon=True)
+        self._thread.start()
+
+    def __call__(self, msg: str):
+        level = level_of(msg)
+        if level < self.min_level:
+            return
+        with self._lock:
+            self._buffer.append((time.time(), level, msg))
+            if len(self._buffer) >= self.max_batch:
+                self._full.set()
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._full.clear()
+        if batch:
+            self.log_queue.put(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._full.wait(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        """停止后台线程并发送剩余消息"""
+        self._stop.set()
+        self._full.set()
+        self._thread.join()
+        self.flush()
+
+
+class LogReceiver:
+    """
+    界面进程一侧：非阻塞地取出批量日志，写入按大小轮转的日志文件
+    队列中的 dict 为进度快照（progress.ProgressTracker），只保留最新一个在 progress 属性中
+    """
+    def __init__(self, log_queue, log_path: str, max_bytes: int = 5 * 1024 * 1024, backup_count: int = 5):
+        """
+        :param log_queue: multiprocessing.Queue
+        :param log_path: 日志文件路径，超过 max_bytes 时轮转为 .1 ~ .{backup_count}
+        """
+        self.log_queue = log_queue
+        self.handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count,
+                                           encoding="utf-8")
+        self.progress = None
+        self._second = None
+        self._second_text = ""
+
+    def _format(self, created: float, level: int, msg: str) -> str:
+        second = int(created)
+        if second != self._second:
+            self._second, self._second_text = second, time.strftime(LOG_TIME_FORMAT, time.localtime(second))
+        return f"{self._second_text},{int(created % 1 * 1000):03d} {logging.getLevelName(level):<7} {msg}"
+
+    def write(self, records: List[LogRecord], chunk: int = 1000):
+        """格式化后按块写入，每块只做一次轮转检查与写入"""
+        for i in range(0, len(records), chunk):
+            text = "\n".join(self._format(*r) for r in records[i:i + chunk])
+            self.handler.handle(logging.makeLogRecord({"msg": text, "levelno": logging.INFO}))
+        self.handler.flush()
+
+    def poll(self, max_batches: int = 10) -> Tuple[List[LogRecord], bool]:
+        """
+        取出当前已到达的日志（每次最多 max_batches 批，避免长时间占用界面线程）并写入文件
+        :return: (取出的记录, 是否收到结束标记)
+        """
+        records, finished = [], False
+        for _ in range(max_batches):
+            try:
+                item = self.log_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, dict):
+                self.progress = item
+                continue
+            if item == FINISHED:
+                finished = True
+                break
+            records.extend(item)
+        if records:
+            self.write(records)
+        return records, finished
+
+    def close(self):
+        self.handler.close()
+
+
+class LogTail:
+    """
+    按文件偏移量增量读取日志：每次只读取上次之后新增的内容，发现文件被轮转或截断时从头读取
+    """
+    def __init__(self, path: str, initial_bytes: int = 1024 * 1024):
+        """
+        :param initial_bytes: 首次读取时只读取文件末尾的字节数
+        """
+        self.path = path
+        self.initial_bytes = initial_bytes
+        self._offset = None
+        self._inode = None
+        self._partial = b""
+        self._skip_first = False
+
+    def read_new(self) -> List[str]:
+        """返回新增的完整行（不含换行符）"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        if self._offset is None:
+            self._offset = max(0, st.st_size - self.initial_bytes)
+            self._skip_first = self._offset > 0
+        elif st.st_ino != self._inode or st.st_size < self._offset:
+            self._offset, self._partial, self._skip_first = 0, b"", False
+        self._inode = st.st_ino
+        if st.st_size == self._offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+        self._offset += len(data)
+        data = self._partial + data
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+        if self._skip_first and lines:
+            # 从文件中间开始读取时第一行不完整（可能要到之后的读取才出现换行）
+            lines.pop(0)
+            self._skip_first = False
+        return [line.decode("utf-8", errors="replace").rstrip("\r") for line in lines]
+
+
+def parse_line_level(line: str, previous: int = logging.INFO) -> int:
+    """
+    解析日志文件中一行的级别（LogReceiver 写入的格式），多行消息的后续行沿用上一行的级别
+    """
+    parts = line.split(None, 3)
+    if len(parts) >= 3:
+        level = logging.getLevelName(parts[2])
+        if isinstance(level, int):
+            return level
+    return previous
@@ -0,0 +1,294 @@
+import bisect
+import threading
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 指标默认关闭：未调用 enable / start_metrics_server 时，各记录函数只做一次判断后直接返回
+# 输出 Prometheus 文本格式（text/plain; version=0.0.4），不依赖 prometheus_client
+
+_FAST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_SLOW_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# 名称 -> (类型, 说明, 直方图分桶)
+METRICS = {
+    "bili_http_request_duration_seconds": ("histogram", "请求耗时（按请求类型）", _FAST_BUCKETS),
+    "bili_http_requests_total": ("counter", "请求数（按请求类型与 HTTP 状态码）", None),
+    "bili_http_throttled_total": ("counter", "被限流的请求数", None),
+    "bili_http_errors_total": ("counter", "出错的请求数（http 为 4xx/5xx，api 为非 0 code，exception 为网络异常等）", None),
+    "bili_video_info_seconds": ("histogram", "get_video_info 总耗时（source 为 cache 或 fetch）", _FAST_BUCKETS),
+    "bili_video_info_step_seconds": ("histogram", "get_video_info 各步骤耗时（html_fetch / html_parse / api）",
+                                     _FAST_BUCKETS),
+    "bili_sink_write_seconds": ("histogram", "写入一行结果的耗时（按输出类型）", _FAST_BUCKETS),
+    "bili_excel_save_seconds": ("histogram", "Excel 工作簿保存耗时", _SLOW_BUCKETS),
+    "bili_media_seconds": ("histogram", "媒体处理耗时（ytdlp 下载合并 / ffmpeg 音频提取）", _SLOW_BUCKETS),
+    "bili_stage_seconds": ("histogram", "各阶段耗时（metadata / cover / danmaku / video / audio）", _SLOW_BUCKETS),
+    "bili_videos_total": ("counter", "处理结束的视频数（result 为 processed / failed）", None),
+    "bili_stage_total": ("counter", "各阶段结束次数（result 为 done / failed / retried）", None),
+    "bili_stage_active": ("gauge", "各阶段进行中的数量", None),
+    "bili_downloaded_bytes_total": ("counter", "已下载字节数", None),
+    "bili_queue_depth": ("gauge", "各队列当前长度", None),
+    "bili_rate_limit_rate": ("gauge", "各类请求当前允许的速率（每秒）", None),
+    "bili_rate_limited": ("gauge", "各类请求是否处于降速状态（1 为降速中）", None),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+# 采集函数返回 [(指标名, 标签, 值)]，在每次抓取时调用
+Collector = Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for k, v in items)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    进程内指标存储：计数器、直方图与当前值，可被任意线程更新
+    另可注册采集函数，在抓取时读取其他组件的状态（如进度统计、调度器速率）
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[Labels, float]] = {}
+        # 直方图: 名称 -> 标签 -> [各桶计数..., 总和, 次数]
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        self._collectors: List[Collector] = []
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = METRICS[name][2]
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            data = series.get(key)
+            if data is None:
+                data = series[key] = [0] * (len(buckets) + 2)
+            index = bisect.bisect_left(buckets, value)
+            if index < len(buckets):
+                data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def histogram_totals(self, name: str) -> Dict[Labels, Tuple[int, float]]:
+        """直方图各标签的 (次数, 总和)"""
+        with self._lock:
+            return {labels: (int(data[-1]), data[-2]) for labels, data in self._histograms.get(name, {}).items()}
+
+    def add_collector(self, collector: Collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Collector):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式输出全部指标"""
+        with self._lock:
+            values = {name: dict(series) for name, series in self._values.items()}
+            histograms = {name: {k: list(v) for k, v in series.items()} for name, series in self._histograms.items()}
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    values.setdefault(name, {})[_labels(labels)] = value
+            except Exception as e:
+                print(f"[ERROR] 指标采集出错: {e}", flush=True)
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            if name not in values and name not in histograms:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind != "histogram":
+                for labels, value in sorted(values[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            for labels, data in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(buckets, data):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {int(data[-1])}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(data[-2])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {int(data[-1])}")
+        return "\n".join(lines) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def enable() -> MetricsRegistry:
+    """开启指标记录（重复调用返回同一个存储）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+
+def registry() -> Optional[MetricsRegistry]:
+    return _registry
+
+
+def enabled() -> bool:
+    return _registry is not None
+
+
+# ---------- 记录函数（未开启时为空操作） ----------
+def inc(name: str, value: float = 1, **labels):
+    if _registry is not None:
+        _registry.inc(name, value, **labels)
+
+
+def set_gauge(name: str, value: float, **labels):
+    if _registry is not None:
+        _registry.set(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    if _registry is not None:
+        _registry.observe(name, value, **labels)
+
+
+# 耗时区间监听器（profiling 模块在性能分析期间注册），计时代码块同时作为分析区间
+_span_listener = None
+
+
+def set_span_listener(listener):
+    """
+    注册区间监听器：需提供 enter(区间名) -> 标记 与 exit(标记)，传入 None 取消
+    区间名由指标名与标签值组成，如 bili_media_seconds{step=ytdlp} -> media:ytdlp
+    """
+    global _span_listener
+    _span_listener = listener
+
+
+def span_listener():
+    return _span_listener
+
+
+def span_name(name: str, labels: dict) -> str:
+    base = name[len("bili_"):] if name.startswith("bili_") else name
+    base = base[:-len("_seconds")] if base.endswith("_seconds") else base
+    return f"{base}:{','.join(str(v) for v in labels.values())}" if labels else base
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "start", "listener", "token")
+
+    def __init__(self, name: str, labels: dict):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.listener = _span_listener
+        if self.listener is not None:
+            self.token = self.listener.enter(span_name(self.name, self.labels))
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, perf_counter() - self.start, **self.labels)
+        if self.listener is not None:
+            self.listener.exit(self.token)
+
+
+_NULL_TIMER = nullcontext()
+
+
+def timer(name: str, **labels):
+    """with timer(名称, 标签=...): 记录代码块耗时到直方图，指标与性能分析都未开启时返回空上下文"""
+    if _registry is None and _span_listener is None:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+def progress_collector(tracker) -> Collector:
+    """
+    把 progress.ProgressTracker 的快照转换为指标：视频/阶段计数、下载字节数、
+    队列长度（快照 gauges），以及调度器中各类请求的当前速率与降速状态
+    """
+    def collect():
+        snap = tracker.snapshot()
+        yield "bili_videos_total", {"result": "processed"}, snap["processed"]
+        yield "bili_videos_total", {"result": "failed"}, snap["failed"]
+        for stage, counters in snap["stages"].items():
+            yield "bili_stage_active", {"stage": stage}, counters["active"]
+            for result in ("done", "failed", "retried"):
+                yield "bili_stage_total", {"stage": stage, "result": result}, counters[result]
+        yield "bili_downloaded_bytes_total", {}, snap["bytes"]
+        for queue, depth in snap["gauges"].items():
+            yield "bili_queue_depth", {"queue": queue}, depth
+        for endpoint, stats in snap["requests"].items():
+            yield "bili_rate_limit_rate", {"endpoint": endpoint}, stats["rate"]
+            yield "bili_rate_limited", {"endpoint": endpoint}, 1 if stats["limited"] else 0
+    return collect
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = (_registry.render() if _registry is not None else "").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取请求不写入日志
+        pass
+
+
+class MetricsServer:
+    """在后台线程中提供 /metrics 的 HTTP 服务"""
+    def __init__(self, port: int, host: str = "127.0.0.1"):
+        """
+        :param port: 监听端口，0 表示随机分配（实际端口见 self.port）
+        :param host: 监听地址，默认只允许本机访问
+        """
+        enable()
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self.host = host
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> MetricsServer:
+    """开启指标记录并启动 HTTP 导出服务"""
+    return MetricsServer(port, host)
@@ -0,0 +1,367 @@
+import os
+import time
+import sqlite3
+import argparse
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+try:
+    from openpyxl import load_workbook
+    from info_data import count_rows, excel_parts
+except ImportError:
+    load_workbook = None
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # 未安装 watchdog 时按修改时间定期比对
+    Observer = None
+    FileSystemEventHandler = object
+
+INDEX_FILE_NAME = "output_index.db"
+
+
+def format_size(size_bytes: float) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size_bytes < 1024:
+            return f"{size_bytes:.2f} {unit}"
+        size_bytes /= 1024
+    return f"{size_bytes:.2f} PB"
+
+
+def count_excel_rows(excel_path: str) -> int:
+    """统计 Excel 数据行数（不含表头，包括 output-002.xlsx 等后续分卷），只读模式读取，不载入 pandas"""
+    return sum(max(0, count_rows(path) - 1) for path in excel_parts(excel_path) if os.path.exists(path))
+
+
+class _DirtyHandler(FileSystemEventHandler):
+    def __init__(self, index: "OutputIndex"):
+        self.index = index
+
+    def on_any_event(self, event):
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path:
+                self.index.mark_dirty(path)
+
+
+class OutputIndex:
+    """
+    output 目录索引（SQLite）：记录每个 BV 文件夹的文件列表、大小与修改时间，以及 Excel 行数
+    首次全量扫描后只重新扫描有变化的文件夹：安装了 watchdog 时由文件系统事件（inotify 等）标记，
+    否则按文件夹及其子文件夹的修改时间比对；界面直接读取索引，不再遍历目录
+    文件夹修改时间只反映文件增删与替换，原地改写已有文件不会改变它：watchdog 的修改事件可以覆盖这种情况，
+    未安装 watchdog 时需由 request_scan(deep=True)（界面的刷新按钮）逐个文件比对
+    """
+    def __init__(self, output_dir: str, db_path: Optional[str] = None, excel_path: Optional[str] = None):
+        """
+        :param output_dir: output 目录（BV 子文件夹所在目录）
+        :param db_path: 索引数据库路径，默认 output_dir/output_index.db
+        :param excel_path: 可选，统计行数的 Excel 文件
+        """
+        self.output_dir = output_dir
+        self.excel_path = excel_path
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._dirty: Set[str] = set()
+        self._full_scan_needed = True
+        self._deep_scan_needed = False
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+        os.makedirs(output_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path or os.path.join(output_dir, INDEX_FILE_NAME), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS folders ("
+            " name TEXT PRIMARY KEY,"
+            " mtime REAL NOT NULL,"
+            " signature TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " file_count INTEGER NOT NULL,"
+            " scanned_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_folders_mtime ON folders(mtime)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " folder TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime REAL NOT NULL,"
+            " PRIMARY KEY (folder, path))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    # ---------- 扫描 ----------
+    @staticmethod
+    def _signature(folder_path: str, subdirs: List[str]) -> Optional[str]:
+        """
+        文件夹及其已知子文件夹（多P的 p{n}）的修改时间，文件增删、替换都会改变它；
+        原地改写文件（不经临时文件替换）不会改变目录修改时间，由文件系统事件或深度扫描发现
+        """
+        try:
+            parts = [str(os.stat(folder_path).st_mtime_ns)]
+            for sub in subdirs:
+                parts.append(f"{sub}:{os.stat(os.path.join(folder_path, sub)).st_mtime_ns}")
+        except OSError:
+            return None
+        return "|".join(parts)
+
+    def _walk_folder(self, name: str):
+        folder_path = os.path.join(self.output_dir, name)
+        files, subdirs = [], []
+        for root, dirs, names in os.walk(folder_path):
+            if root == folder_path:
+                subdirs = sorted(dirs)
+            for f in names:
+                fp = os.path.join(root, f)
+                try:
+                    st = os.stat(fp)
+                except OSError:
+                    continue
+                files.append((os.path.relpath(fp, folder_path).replace(os.sep, "/"), st.st_size, st.st_mtime))
+        return files, subdirs
+
+    def _stored_signatures(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, signature FROM folders"))
+
+    def _index_folder(self, name: str) -> bool:
+        """重新扫描单个文件夹，文件列表、大小或修改时间有变化时写入索引，文件夹已不存在时删除记录，返回记录是否变化"""
+        folder_path = os.path.join(self.output_dir, name)
+        if not os.path.isdir(folder_path):
+            with self._lock:
+                cur = self._conn.execute("DELETE FROM folders WHERE name = ?", (name,))
+                self._conn.execute("DELETE FROM files WHERE folder = ?", (name,))
+                self._conn.commit()
+            return bool(cur.rowcount)
+        files, subdirs = self._walk_folder(name)
+        signature = self._signature(folder_path, subdirs)
+        if signature is None:
+            return False
+        with self._lock:
+            stored = self._conn.execute("SELECT path, size, mtime FROM files WHERE folder = ?", (name,)).fetchall()
+            old = self._conn.execute("SELECT signature FROM folders WHERE name = ?", (name,)).fetchone()
+        if old is not None and old[0] == signature and sorted(stored) == sorted(files):
+            return False
+        mtime = max([os.path.getmtime(folder_path)] + [f[2] for f in files])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO folders VALUES (?, ?, ?, ?, ?, ?)",
+                (name, mtime, signature, sum(f[1] for f in files), len(files), time.time())
+            )
+            self._conn.execute("DELETE FROM files WHERE folder = ?", (name,))
+            self._conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?)", [(name, *f) for f in files])
+            self._conn.commit()
+        return True
+
+    def _index_excel(self) -> bool:
+        if not self.excel_path or load_workbook is None:
+            return False
+        mtimes = [os.path.getmtime(p) for p in excel_parts(self.excel_path) if os.path.exists(p)]
+        signature = "|".join(map(str, mtimes))
+        if self._meta("excel_signature") == signature:
+            return False
+        rows = 0
+        if mtimes:
+            try:
+                rows = count_excel_rows(self.excel_path)
+            except Exception:
+                rows = 0
+        self._set_meta(excel_signature=signature, excel_mtime=str(max(mtimes)) if mtimes else "",
+                       excel_rows=str(rows))
+        return True
+
+    def scan(self, names: Optional[Set[str]] = None, deep: bool = False) -> int:
+        """
+        增量扫描：names 为空时比对全部文件夹的修改时间，只重新扫描新增、变化或删除的文件夹；
+        传入 names 时只扫描这些文件夹（文件系统事件标记的）
+        :param deep: 逐个文件比对大小与修改时间（遍历全部文件夹），可发现原地改写的文件
+        :return: 变化的文件夹数
+        """
+        with self._scan_lock:
+            changed = 0
+            if names is None and deep:
+                try:
+                    current = {e.name for e in os.scandir(self.output_dir) if e.is_dir()}
+                except OSError:
+                    current = set()
+                names = current | set(self._stored_signatures())
+            elif names is None:
+                stored = self._stored_signatures()
+                try:
+                    current = {e.name for e in os.scandir(self.output_dir) if e.is_dir()}
+                except OSError:
+                    current = set()
+                names = set(stored) - current
+                for name in current:
+                    old = stored.get(name)
+                    subdirs = [p.split(":", 1)[0] for p in old.split("|")[1:]] if old else []
+                    if old is None or self._signature(os.path.join(self.output_dir, name), subdirs) != old:
+                        names.add(name)
+            for name in sorted(names):
+                if self._index_folder(name):
+                    changed += 1
+            excel_changed = self._index_excel()
+            if changed or excel_changed:
+                self._set_meta(version=str(self.version() + 1))
+            self._set_meta(scanned_at=str(time.time()))
+            return changed
+
+    # ---------- 后台线程 ----------
+    def mark_dirty(self, path: str):
+        """文件系统事件回调：标记事件所在的 BV 文件夹，由后台线程重新扫描"""
+        rel = os.path.relpath(path, self.output_dir)
+        if rel.startswith(".."):
+            if self.excel_path and os.path.abspath(path) in map(os.path.abspath, excel_parts(self.excel_path)):
+                self._wakeup.set()
+            return
+        name = rel.split(os.sep, 1)[0]
+        # 索引数据库自身的写入不触发扫描
+        if name == "." or name.startswith(INDEX_FILE_NAME):
+            return
+        with self._lock:
+            self._dirty.add(name)
+        self._wakeup.set()
+
+    def request_scan(self, deep: bool = False):
+        """
+        请求后台线程尽快做一次全量比对（如界面点击刷新）
+        :param deep: 逐个文件比对，发现目录修改时间不变的原地改写
+        """
+        if deep:
+            self._deep_scan_needed = True
+        self._full_scan_needed = True
+        self._wakeup.set()
+
+    def start(self, interval: float = 30, log: Optional[Callable[[str], None]] = None):
+        """
+        启动后台索引线程
+        :param interval: 未安装 watchdog 时全量比对的间隔（秒），安装后只在启动与 request_scan 时全量比对
+        """
+        if self._thread is not None:
+            return
+        logger = log or (lambda s: print(s, flush=True))
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_DirtyHandler(self), self.output_dir, recursive=True)
+                if self.excel_path:
+                    self._observer.schedule(_DirtyHandler(self), os.path.dirname(os.path.abspath(self.excel_path)))
+                self._observer.start()
+            except Exception as e:
+                logger(f"[ERROR] 目录监听启动失败，改为定期比对修改时间: {e}")
+                self._observer = None
+        self._thread = threading.Thread(target=self._run, args=(interval, logger),
+                                        name="output-index", daemon=True)
+        self._thread.start()
+
+    def _run(self, interval: float, logger):
+        while not self._stop.is_set():
+            # 先清除唤醒标记，扫描期间到达的事件会让下一轮立即开始
+            self._wakeup.clear()
+            try:
+                if self._full_scan_needed or self._observer is None:
+                    deep, self._deep_scan_needed = self._deep_scan_needed, False
+                    self._full_scan_needed = False
+                    self.scan(deep=deep)
+                else:
+                    with self._lock:
+                        dirty, self._dirty = self._dirty, set()
+                    self.scan(dirty)
+            except Exception as e:
+                logger(f"[ERROR] output 目录索引失败: {e}")
+            self._wakeup.wait(None if self._observer is not None else interval)
+            # 下载过程中事件密集，稍等片刻合并为一次扫描
+            self._stop.wait(0.5)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # ---------- 查询 ----------
+    def _meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values):
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", list(values.items()))
+            self._conn.commit()
+
+    def version(self) -> int:
+        """索引内容版本号，有变化的扫描后加 1，界面据此判断是否需要刷新"""
+        return int(self._meta("version") or 0)
+
+    def scanned(self) -> bool:
+        """是否已完成过扫描"""
+        return self._meta("scanned_at") is not None
+
+    def folder_names(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT name FROM folders ORDER BY name")]
+
+    def files(self, name: str) -> List[str]:
+        """文件夹内的文件相对路径（多P子文件夹中的文件为 p{n}/文件名）"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT path FROM files WHERE folder = ? ORDER BY path", (name,))]
+
+    def summary(self) -> dict:
+        """
+        统计信息：文件夹总数、今日有更新的数量、最近更新的文件夹及时间、总大小、Excel 行数与修改时间
+        """
+        today = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+        with self._lock:
+            count, total_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM folders").fetchone()
+            today_count = self._conn.execute(
+                "SELECT COUNT(*) FROM folders WHERE mtime >= ?", (today,)).fetchone()[0]
+            last = self._conn.execute("SELECT name, mtime FROM folders ORDER BY mtime DESC LIMIT 1").fetchone()
+        excel_mtime = self._meta("excel_mtime")
+        return {
+            "count": count,
+            "today_count": today_count,
+            "last_name": last[0] if last else None,
+            "last_mtime": last[1] if last else None,
+            "total_size": total_size,
+            "excel_rows": int(self._meta("excel_rows") or 0),
+            "excel_mtime": float(excel_mtime) if excel_mtime else None,
+        }
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="扫描 output 目录并更新索引")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "output"),
+                        help="BV 子文件夹所在目录")
+    parser.add_argument("--excel", default=os.path.join(os.path.dirname(__file__), "output.xlsx"),
+                        help="统计行数的 Excel 文件")
+    args = parser.parse_args()
+
+    with OutputIndex(args.output, excel_path=args.excel) as index:
+        start = time.time()
+        changed = index.scan()
+        info = index.summary()
+        print(f"[INDEX] 扫描完成，{changed} 个文件夹有变化，用时 {time.time() - start:.2f} 秒")
+        print(f"[INDEX] 共 {info['count']} 个文件夹，总大小 {format_size(info['total_size'])}，"
+              f"Excel {info['excel_rows']} 行")
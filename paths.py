@@ -0,0 +1,27 @@
+import os
+from typing import Callable, Optional, Union
+from bvid_store import open_bvid_store, store_path_for
+
+# 命令行与 GUI 共用的路径规则；只依赖 bvid_store，统计快照等轻量入口导入时不会加载 yt_dlp 等下载依赖
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def resolve_path(p: Optional[Union[str, Callable]], default_name: str) -> str:
+    """
+    解析输入/输出路径：未指定时使用项目目录下的默认文件名，相对路径相对项目目录
+    :param p: 路径；GUI 信号可能传入回调对象，按未指定处理
+    :param default_name: 默认文件名
+    """
+    if callable(p):
+        p = None
+    if p:
+        return p if os.path.isabs(p) else os.path.join(BASE_DIR, str(p))
+    return os.path.join(BASE_DIR, default_name)
+
+
+def load_bvid_list(file_path: str):
+    # BV 号保存在同名 .db 中，BVID_list.txt 有变化时自动同步
+    if not os.path.exists(file_path) and not os.path.exists(store_path_for(file_path)):
+        return []
+    with open_bvid_store(file_path) as store:
+        return store.all_bvids()
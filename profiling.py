@@ -0,0 +1,331 @@
+import io
+import os
+import re
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+# 性能分析模式：
+#   spans   只记录各阶段耗时区间（metrics.timer 包裹的代码块），开销最小
+#   cprofile 另外对每个线程运行 cProfile，合并后输出 profile.pstats
+#   sample  另外按固定间隔采样全部线程的调用栈（墙钟时间，包含等待），输出 samples.folded
+# 未启动 RunProfiler 时不注册区间监听器，metrics.timer 在指标也关闭时直接返回空上下文
+PROFILE_MODES = ("spans", "cprofile", "sample")
+
+_THREAD_SUFFIX_RE = re.compile(r"(?:[-_]\d+)+$")
+
+
+def thread_role(name: str) -> str:
+    """线程名去掉编号后缀作为火焰图的根节点，如 extract_3 -> extract、Thread-5 -> Thread"""
+    return _THREAD_SUFFIX_RE.sub("", name) or name
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _write_folded(path: str, stacks: Dict[str, float]):
+    # 折叠栈格式（每行 "根;...;叶 数值"），可直接交给 flamegraph.pl / speedscope / inferno 生成火焰图
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, value in sorted(stacks.items()):
+            if value > 0:
+                f.write(f"{stack} {int(round(value))}\n")
+
+
+class SpanRecorder:
+    """
+    区间耗时记录器，作为 metrics 的区间监听器使用：
+    按线程维护嵌套的区间栈，统计每个区间的次数、总耗时、最大耗时与自身耗时（扣除子区间），
+    并按 "线程角色;外层区间;内层区间" 累计自身耗时（微秒）生成折叠栈
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # 区间名 -> [次数, 总耗时, 最大耗时, 自身耗时]
+        self._spans: Dict[str, List[float]] = {}
+        self._folded: Dict[str, float] = {}
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = [thread_role(threading.current_thread().name)]
+        return stack
+
+    def enter(self, name: str):
+        stack = self._stack()
+        # [区间名, 开始时间, 子区间耗时]
+        frame = [name, perf_counter(), 0.0]
+        stack.append(frame)
+        return frame
+
+    def exit(self, frame):
+        elapsed = perf_counter() - frame[1]
+        stack = self._stack()
+        # 区间未按嵌套顺序结束时（生成器等）丢弃其内部未结束的区间
+        while len(stack) > 1 and stack[-1] is not frame:
+            stack.pop()
+        if len(stack) == 1:
+            return
+        path = ";".join([stack[0]] + [f[0] for f in stack[1:]])
+        stack.pop()
+        if len(stack) > 1:
+            stack[-1][2] += elapsed
+        self_time = max(0.0, elapsed - frame[2])
+        with self._lock:
+            data = self._spans.get(frame[0])
+            if data is None:
+                data = self._spans[frame[0]] = [0, 0.0, 0.0, 0.0]
+            data[0] += 1
+            data[1] += elapsed
+            data[2] = max(data[2], elapsed)
+            data[3] += self_time
+            self._folded[path] = self._folded.get(path, 0.0) + self_time * 1e6
+
+    def span_stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: {"count": int(c), "total": total, "mean": total / c if c else 0.0,
+                           "max": longest, "self": own}
+                    for name, (c, total, longest, own) in self._spans.items()}
+
+    def folded(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._folded)
+
+
+class _ThreadProfiles:
+    """为启动后新建的每个线程各运行一个 cProfile（cProfile 只记录调用 enable 的线程）"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiles: List[cProfile.Profile] = []
+        self.errors = 0
+
+    def _enable(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 同一时间只允许一个分析器的解释器版本上，只记录主线程
+            with self._lock:
+                self.errors += 1
+            return
+        with self._lock:
+            self.profiles.append(profile)
+
+    def _bootstrap(self, frame, event, arg):
+        # threading.setprofile 在新线程开始运行前调用：换成该线程自己的 cProfile
+        sys.setprofile(None)
+        self._enable()
+
+    def start(self):
+        self._enable()
+        threading.setprofile(self._bootstrap)
+
+    def stop(self) -> Optional[pstats.Stats]:
+        threading.setprofile(None)
+        if self.profiles:
+            self.profiles[0].disable()
+        stats = None
+        with self._lock:
+            profiles = list(self.profiles)
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # 没有记录到任何调用的线程
+                continue
+        return stats
+
+
+class _StackSampler:
+    """后台线程按间隔采样全部线程的 Python 调用栈，累计为折叠栈（数值为采样次数）"""
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.leaves: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        labels = {}
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                self.leaves[stack[0]] += 1
+                stack.append(thread_role(names.get(ident, "unknown")))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class RunProfiler:
+    """
+    一次提取任务的性能分析：start 后记录各阶段耗时区间，并按模式运行 cProfile 或调用栈采样；
+    stop 时在 out_dir/run-时间/ 下写出:
+      report.txt / report.json  各区间次数、总耗时、平均/最大耗时、自身耗时及占运行时长比例
+      spans.folded              区间折叠栈（自身耗时，微秒）
+      profile.pstats            cprofile 模式的合并结果（可用 snakeviz、gprof2dot 查看）
+      samples.folded            sample 模式的调用栈折叠栈（采样次数）
+    同一时间只能有一个分析在运行
+    """
+    def __init__(self, out_dir: str, mode: str = "spans", sample_interval: float = 0.005,
+                 log: Optional[Callable[[str], None]] = None):
+        """
+        :param out_dir: 报告根目录，每次运行新建 run-YYYYmmdd-HHMMSS 子目录
+        :param mode: spans / cprofile / sample
+        :param sample_interval: sample 模式的采样间隔（秒）
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"未知的性能分析模式: {mode}，可选 {', '.join(PROFILE_MODES)}")
+        self.out_dir = out_dir
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.log = log or (lambda msg: print(msg, flush=True))
+        self.recorder = SpanRecorder()
+        self.report_dir = None
+        self._profiles = None
+        self._sampler = None
+        self._started = None
+        self._wall_started = None
+
+    def start(self) -> "RunProfiler":
+        if metrics.span_listener() is not None:
+            raise RuntimeError("已有性能分析在运行")
+        self._wall_started = time.time()
+        self._started = perf_counter()
+        metrics.set_span_listener(self.recorder)
+        if self.mode == "cprofile":
+            self._profiles = _ThreadProfiles()
+            self._profiles.start()
+        elif self.mode == "sample":
+            self._sampler = _StackSampler(self.sample_interval)
+            self._sampler.start()
+        return self
+
+    def stop(self) -> str:
+        """停止分析并写出报告，返回报告目录"""
+        elapsed = perf_counter() - self._started
+        stats = None
+        if self._profiles is not None:
+            stats = self._profiles.stop()
+            if self._profiles.errors:
+                self.log(f"[WARN] {self._profiles.errors} 个线程无法启用 cProfile，结果只包含部分线程")
+        if self._sampler is not None:
+            self._sampler.stop()
+        metrics.set_span_listener(None)
+
+        name = "run-" + time.strftime("%Y%m%d-%H%M%S", time.localtime(self._wall_started))
+        report_dir = os.path.join(self.out_dir, name)
+        suffix = 1
+        while os.path.exists(report_dir):
+            suffix += 1
+            report_dir = os.path.join(self.out_dir, f"{name}-{suffix}")
+        os.makedirs(report_dir)
+        self.report_dir = report_dir
+
+        spans = self.recorder.span_stats()
+        _write_folded(os.path.join(report_dir, "spans.folded"), self.recorder.folded())
+        report = {
+            "run": os.path.basename(report_dir),
+            "mode": self.mode,
+            "started": self._wall_started,
+            "elapsed": elapsed,
+            "spans": spans,
+        }
+        if stats is not None:
+            stats.dump_stats(os.path.join(report_dir, "profile.pstats"))
+            report["threads_profiled"] = len(self._profiles.profiles)
+            report["top_functions"] = self._top_functions(stats)
+        if self._sampler is not None:
+            _write_folded(os.path.join(report_dir, "samples.folded"), self._sampler.stacks)
+            report["samples"] = self._sampler.samples
+            report["sample_interval"] = self.sample_interval
+            report["stack_samples"] = sum(self._sampler.leaves.values())
+            report["top_leaves"] = [{"function": leaf, "samples": count}
+                                    for leaf, count in self._sampler.leaves.most_common(30)]
+
+        with open(os.path.join(report_dir, "report.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(report_dir, "report.txt"), "w", encoding="utf-8") as f:
+            f.write(format_report(report, stats))
+        return report_dir
+
+    @staticmethod
+    def _top_functions(stats: pstats.Stats, limit: int = 30) -> List[dict]:
+        rows = []
+        for (filename, line, func), (cc, nc, tt, ct, callers) in stats.stats.items():
+            rows.append({"function": f"{func} ({os.path.basename(filename)}:{line})",
+                         "calls": nc, "tottime": tt, "cumtime": ct})
+        rows.sort(key=lambda r: r["tottime"], reverse=True)
+        return rows[:limit]
+
+
+def format_report(report: dict, stats: Optional[pstats.Stats] = None) -> str:
+    """把报告格式化为文本表格（区间按总耗时降序）"""
+    elapsed = report["elapsed"]
+    lines = [
+        f"性能分析报告 {report['run']}",
+        f"模式: {report['mode']}  开始: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(report['started']))}"
+        f"  运行时长: {elapsed:.2f}s",
+        "占比为区间总耗时 / 运行时长，多线程并发时合计可超过 100%",
+        "",
+        f"{'区间':<36}{'次数':>8}{'总耗时(s)':>12}{'平均(ms)':>11}{'最大(ms)':>11}{'自身(s)':>10}{'占比':>8}",
+    ]
+    for name, s in sorted(report["spans"].items(), key=lambda item: item[1]["total"], reverse=True):
+        share = s["total"] / elapsed if elapsed > 0 else 0.0
+        lines.append(f"{name:<36}{s['count']:>8}{s['total']:>12.3f}{s['mean'] * 1000:>11.1f}"
+                     f"{s['max'] * 1000:>11.1f}{s['self']:>10.3f}{share:>8.1%}")
+    if not report["spans"]:
+        lines.append("（未记录到区间）")
+
+    if stats is not None:
+        lines += ["", f"cProfile（{report['threads_profiled']} 个线程合并，按自身耗时排序前 30 项）:"]
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats("tottime").print_stats(30)
+        lines.append(buffer.getvalue().rstrip())
+    if "top_leaves" in report:
+        total = report["stack_samples"] or 1
+        lines += ["", f"调用栈采样（{report['samples']} 次，间隔 {report['sample_interval'] * 1000:.0f}ms，"
+                      f"墙钟时间含等待）栈顶函数前 30 项:"]
+        for item in report["top_leaves"]:
+            lines.append(f"{item['samples']:>8}  {item['samples'] / total:>6.1%}  {item['function']}")
+    return "\n".join(lines) + "\n"
+
+
+def profile_dir_for(output_dir: str) -> str:
+    """报告默认保存在 output 目录旁的 profiles 目录"""
+    return os.path.join(os.path.dirname(os.path.abspath(output_dir)), "profiles")
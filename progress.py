@@ -0,0 +1,219 @@
+import sys
+import json
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, TextIO, Union
+from job_state import STAGES
+from rate_limiter import RequestScheduler
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+def format_bytes(size: float) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class ProgressTracker:
+    """
+    提取任务的进度统计，可被任意线程更新：
+    各阶段（信息提取、封面、弹幕、视频、音频）进行中/完成/失败数、下载字节数、
+    各类请求的耗时分位数与限速状态（来自 RequestScheduler.stats），以及最近速度与预计剩余时间
+    start 后按间隔向订阅者推送快照（dict，可直接序列化为 JSON）
+    """
+    def __init__(self, total: Optional[int] = None, scheduler: Optional[RequestScheduler] = None,
+                 interval: float = 1.0, window: float = 60.0):
+        """
+        :param total: 视频总数，流式来源未知时为 None
+        :param scheduler: 可选的请求调度器，快照中附带其请求统计
+        :param interval: 推送快照的间隔（秒）
+        :param window: 计算速度与剩余时间使用的最近时间窗口（秒）
+        """
+        self.total = total
+        self.scheduler = scheduler
+        self.interval = interval
+        self.window = window
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._stages = {stage: {"active": 0, "done": 0, "failed": 0, "retried": 0} for stage in STAGES}
+        self._processed = 0
+        self._failed = 0
+        self._discovered = 0
+        self._bytes = 0
+        self._gauges: Dict[str, float] = {}
+        self._samples = deque()
+        self._listeners: List[Callable[[dict], None]] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------- 更新 ----------
+    def set_total(self, total: Optional[int]):
+        with self._lock:
+            self.total = total
+
+    def video_discovered(self):
+        """流式来源读取到一个新的 BV 号"""
+        with self._lock:
+            self._discovered += 1
+
+    def stage_started(self, stage: str):
+        with self._lock:
+            self._stages[stage]["active"] += 1
+
+    def stage_finished(self, stage: str, ok: bool):
+        with self._lock:
+            counters = self._stages[stage]
+            counters["active"] -= 1
+            counters["done" if ok else "failed"] += 1
+
+    def stage_retried(self, stage: str):
+        """阶段被限流中断，稍后重试（不计为失败）"""
+        with self._lock:
+            counters = self._stages[stage]
+            counters["active"] -= 1
+            counters["retried"] += 1
+
+    def video_finished(self, ok: bool = True):
+        """一个视频处理结束（ok=False 表示信息提取失败，或有资源阶段下载失败）"""
+        with self._lock:
+            if ok:
+                self._processed += 1
+            else:
+                self._failed += 1
+
+    def add_bytes(self, size: int):
+        with self._lock:
+            self._bytes += size
+
+    def set_gauge(self, name: str, value: float):
+        """记录当前值类指标，如等待重试的 BV 号数"""
+        with self._lock:
+            self._gauges[name] = value
+
+    # ---------- 快照 ----------
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            finished = self._processed + self._failed
+            self._samples.append((now, finished, self._bytes))
+            while len(self._samples) > 2 and now - self._samples[0][0] > self.window:
+                self._samples.popleft()
+            t0, finished0, bytes0 = self._samples[0]
+            span = now - t0
+            video_rate = (finished - finished0) / span if span > 0 else 0.0
+            byte_rate = (self._bytes - bytes0) / span if span > 0 else 0.0
+            total = self.total
+            remaining = total - finished if total is not None else None
+            snap = {
+                "time": time.time(),
+                "elapsed": now - self._started,
+                "total": total,
+                "discovered": self._discovered,
+                "processed": self._processed,
+                "failed": self._failed,
+                "stages": {stage: dict(c) for stage, c in self._stages.items()},
+                "bytes": self._bytes,
+                "bytes_per_sec": byte_rate,
+                "videos_per_min": video_rate * 60,
+                "eta": remaining / video_rate if remaining is not None and video_rate > 0 else None,
+                "gauges": dict(self._gauges),
+            }
+        snap["requests"] = self.scheduler.stats() if self.scheduler is not None else {}
+        snap["limited"] = [name for name, s in snap["requests"].items() if s["limited"]]
+        return snap
+
+    # ---------- 推送 ----------
+    def subscribe(self, listener: Callable[[dict], None]):
+        self._listeners.append(listener)
+
+    def _emit(self, snap: dict):
+        for listener in list(self._listeners):
+            try:
+                listener(snap)
+            except Exception as e:
+                print(f"[ERROR] 进度回调出错: {e}", flush=True)
+
+    def start(self):
+        """启动后台线程，每 interval 秒推送一次快照"""
+        if self._thread is not None or not self._listeners:
+            return
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._emit(self.snapshot())
+
+    def stop(self):
+        """停止推送并发送最终快照（finished 为 True）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._listeners:
+            self._emit(dict(self.snapshot(), finished=True))
+
+
+def format_status(snap: dict) -> str:
+    """把快照格式化为一行状态文本"""
+    finished = snap["processed"] + snap["failed"]
+    if snap["total"]:
+        head = f"{finished}/{snap['total']} ({finished / snap['total']:.1%})"
+    else:
+        head = f"{finished}/{snap['discovered'] or '?'}"
+    active = [f"{stage} {c['active']}" for stage, c in snap["stages"].items() if c["active"]]
+    parts = [
+        head,
+        f"失败 {snap['failed']}",
+        f"{snap['videos_per_min']:.1f} 个/分",
+        f"{format_bytes(snap['bytes_per_sec'])}/s",
+        f"剩余 {format_duration(snap['eta'])}",
+        "进行中 " + (", ".join(active) if active else "无"),
+    ]
+    if snap["limited"]:
+        parts.append("限速中 " + ", ".join(f"{name} {snap['requests'][name]['rate']:.2f}/s"
+                                         for name in snap["limited"]))
+    return "[PROGRESS] " + " | ".join(parts)
+
+
+class StatusLinePrinter:
+    """命令行状态行：终端中原地刷新，重定向到文件时逐行输出"""
+    def __init__(self, stream: TextIO = None):
+        self.stream = stream or sys.stderr
+        self.inline = hasattr(self.stream, "isatty") and self.stream.isatty()
+
+    def __call__(self, snap: dict):
+        line = format_status(snap)
+        if self.inline:
+            end = "\n" if snap.get("finished") else ""
+            self.stream.write(f"\r\033[K{line}{end}")
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+class JsonProgressWriter:
+    """JSON Lines 进度输出，每个快照一行，供其他程序读取"""
+    def __init__(self, target: Union[str, TextIO]):
+        """
+        :param target: 输出文件路径（追加写入）或已打开的文本流
+        """
+        self._own = isinstance(target, str)
+        self.stream = open(target, "a", encoding="utf-8") if self._own else target
+
+    def __call__(self, snap: dict):
+        self.stream.write(json.dumps(snap, ensure_ascii=False) + "\n")
+        self.stream.flush()
+        if snap.get("finished") and self._own:
+            self.stream.close()
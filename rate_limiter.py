@@ -0,0 +1,236 @@
+import heapq
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+import metrics
+
+
+class RateLimiter:
+    # 全局请求频率限制（令牌桶），可在多个线程间共享
+    def __init__(self, rate: float = 1 / 0.6, burst: int = 1):
+        """
+        :param rate: 每秒允许的请求数，<= 0 表示不限速
+        :param burst: 令牌桶容量，允许的瞬时突发请求数
+        """
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """阻塞直到取得一个令牌"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# B站限流特征：HTTP 412/429，或 API 返回 code -412 / -799（请求过于频繁）
+THROTTLE_STATUS_CODES = (412, 429)
+THROTTLE_API_CODES = (-412, -799)
+
+# 分别限速的请求类型：视频网页、API、CDN 图片、弹幕 XML、分段弹幕
+ENDPOINTS = ("html", "api", "image", "comment", "segment")
+# 默认速率高于全局速率的请求类型：分段弹幕同一视频需要并发请求多段
+_MIN_DEFAULT_RATES = {"segment": 5.0}
+# 每类请求保留最近多少次响应耗时用于计算分位数
+_LATENCY_SAMPLES = 1000
+
+
+class ThrottledError(Exception):
+    # 请求被B站限流
+    def __init__(self, endpoint: str, detail: str):
+        super().__init__(f"{endpoint} 请求被限流: {detail}")
+        self.endpoint = endpoint
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    # 按 AIMD 调整速率的令牌桶：限流时乘性降速，成功时加性恢复到上限
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.2,
+                 increase: float = 0.05, decrease: float = 0.5, fallback_rate: float = 1.0):
+        """
+        :param rate: 初始（也是最大）速率，<= 0 表示不限速，直到第一次被限流
+        :param min_rate: 降速下限
+        :param increase: 每次成功请求增加的速率
+        :param decrease: 被限流时速率乘以该系数
+        :param fallback_rate: 不限速状态下第一次被限流时采用的速率
+        """
+        super().__init__(rate=rate, burst=burst)
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.fallback_rate = fallback_rate
+
+    def on_success(self):
+        with self._lock:
+            if self.rate <= 0:
+                return
+            new_rate = self.rate + self.increase
+            self.rate = min(self.max_rate, new_rate) if self.max_rate > 0 else new_rate
+
+    def on_throttle(self):
+        with self._lock:
+            current = self.rate if self.rate > 0 else self.fallback_rate
+            self.rate = max(self.min_rate, current * self.decrease)
+            # 清空积攒的令牌，立即生效
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+class RequestScheduler:
+    """
+    全局请求调度器，可被任意线程/工作模型共享
+    每类请求有独立的自适应令牌桶，并提供带抖动的指数退避时间
+    """
+    def __init__(self, rate: float = 1 / 0.6, rates: Optional[Dict[str, float]] = None,
+                 backoff_base: float = 2.0, backoff_max: float = 300.0, max_retries: int = 5):
+        """
+        :param rate: 各类请求默认的最大速率（每秒），<= 0 表示不限速
+        :param rates: 按请求类型单独指定最大速率，如 {"image": 10}；
+                      未指定时 segment（分段弹幕）默认至少每秒 5 次，其余使用 rate
+        :param backoff_base: 第一次重试的基础等待秒数
+        :param backoff_max: 重试等待上限
+        :param max_retries: 被限流后的最大重试次数
+        """
+        rates = rates or {}
+        self.limiters = {name: AdaptiveRateLimiter(rates.get(name, self._default_rate(name, rate)))
+                         for name in ENDPOINTS}
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retries = max_retries
+        self._stats_lock = threading.Lock()
+        self._requests = dict.fromkeys(ENDPOINTS, 0)
+        self._throttled = dict.fromkeys(ENDPOINTS, 0)
+        self._latencies = {name: deque(maxlen=_LATENCY_SAMPLES) for name in ENDPOINTS}
+
+    @staticmethod
+    def _default_rate(endpoint: str, rate: float) -> float:
+        if rate <= 0:
+            return rate
+        return max(rate, _MIN_DEFAULT_RATES.get(endpoint, rate))
+
+    def acquire(self, endpoint: str):
+        self.limiters[endpoint].acquire()
+
+    def report(self, endpoint: str, throttled: bool):
+        if throttled:
+            self.limiters[endpoint].on_throttle()
+        else:
+            self.limiters[endpoint].on_success()
+
+    def check_response(self, endpoint: str, status_code: int, api_code: Optional[int] = None,
+                       elapsed: Optional[float] = None):
+        """
+        根据响应判断是否被限流并调整速率，被限流时抛出 ThrottledError
+        :param api_code: JSON 接口返回的 code（如有）
+        :param elapsed: 请求耗时（秒，如 resp.elapsed.total_seconds()），计入延迟统计
+        """
+        throttled = status_code in THROTTLE_STATUS_CODES or api_code in THROTTLE_API_CODES
+        with self._stats_lock:
+            self._requests[endpoint] += 1
+            if throttled:
+                self._throttled[endpoint] += 1
+            if elapsed is not None:
+                self._latencies[endpoint].append(elapsed)
+        if metrics.enabled():
+            metrics.inc("bili_http_requests_total", endpoint=endpoint, status=status_code)
+            if elapsed is not None:
+                metrics.observe("bili_http_request_duration_seconds", elapsed, endpoint=endpoint)
+            if throttled:
+                metrics.inc("bili_http_throttled_total", endpoint=endpoint)
+            if status_code >= 400:
+                metrics.inc("bili_http_errors_total", endpoint=endpoint, kind="http")
+            elif api_code not in (None, 0):
+                metrics.inc("bili_http_errors_total", endpoint=endpoint, kind="api")
+        if status_code in THROTTLE_STATUS_CODES:
+            self.report(endpoint, True)
+            raise ThrottledError(endpoint, f"HTTP {status_code}")
+        if api_code in THROTTLE_API_CODES:
+            self.report(endpoint, True)
+            raise ThrottledError(endpoint, f"code {api_code}")
+        self.report(endpoint, False)
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（指数退避 + 随机抖动）"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def rates(self) -> Dict[str, float]:
+        """当前各类请求的速率"""
+        return {name: limiter.rate for name, limiter in self.limiters.items()}
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        各类请求的统计：当前/最大速率、是否处于降速状态、请求数、被限流次数、
+        最近请求耗时的 p50/p90/p99（秒，无样本时为 None）
+        """
+        result = {}
+        with self._stats_lock:
+            for name, limiter in self.limiters.items():
+                samples = sorted(self._latencies[name])
+                pick = (lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]) if samples \
+                    else (lambda q: None)
+                result[name] = {
+                    "rate": limiter.rate,
+                    "max_rate": limiter.max_rate,
+                    "limited": limiter.rate > 0 and (limiter.max_rate <= 0 or limiter.rate < limiter.max_rate),
+                    "requests": self._requests[name],
+                    "throttled": self._throttled[name],
+                    "p50": pick(0.5),
+                    "p90": pick(0.9),
+                    "p99": pick(0.99),
+                }
+        return result
+
+
+class RetryQueue:
+    # 延迟重试队列：按到期时间取出，超过最大重试次数的条目直接丢弃
+    def __init__(self, scheduler: RequestScheduler):
+        self.scheduler = scheduler
+        self._heap = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def push(self, item, attempt: int) -> bool:
+        """
+        安排第 attempt 次重试
+        :return: 超过最大重试次数时返回 False
+        """
+        if attempt > self.scheduler.max_retries:
+            return False
+        ready_at = time.monotonic() + self.scheduler.backoff(attempt - 1)
+        with self._lock:
+            heapq.heappush(self._heap, (ready_at, self._seq, item, attempt))
+            self._seq += 1
+        return True
+
+    def pop_ready(self) -> Optional[Tuple[object, int]]:
+        """取出一个已到期的 (item, attempt)，没有则返回 None"""
+        with self._lock:
+            if self._heap and self._heap[0][0] <= time.monotonic():
+                _, _, item, attempt = heapq.heappop(self._heap)
+                return item, attempt
+        return None
+
+    def next_delay(self) -> Optional[float]:
+        """距离最近一个条目到期的秒数，队列为空返回 None"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
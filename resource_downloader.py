@@ -1,44 +1,205 @@
 import os
+import glob
 import json
-import requests
 import yt_dlp
 import subprocess
 import threading
 import gc
-from http_client import HttpClient
-from info_extractor import BilibiliInfoExtractor
+import metrics
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+from danmaku_segments import DanmakuSegmentFetcher
+from danmaku_store import DanmakuStore
+from file_downloader import FileDownloader
+from info_extractor import BilibiliInfoExtractor, COMMENT_BASE, WEB_BASE
+from job_state import RESOURCE_STAGES
+from progress import ProgressTracker
+from rate_limiter import RequestScheduler
+
+# 音频输出格式：m4a 直接保留 yt-dlp 下载的原始音频流（或 -c:a copy 封装），mp3 需要重新编码
+AUDIO_FORMATS = ("m4a", "mp3")
+# yt-dlp 保留的分离音频流扩展名（keepvideo 时文件名为 video.f<格式ID>.<ext>）
+_AUDIO_STREAM_EXTS = (".m4a",)
+# 视频阶段失败时音频阶段的失败原因（音频依赖视频阶段下载的文件）
+AUDIO_SKIPPED = "视频下载失败，跳过音频提取"
+
 
 class ResourceDownloader:
-    def __init__(self, output_dir="output", log: callable = None):
+    def __init__(self, output_dir="output", log: callable = None, scheduler: Optional[RequestScheduler] = None,
+                 audio_format: str = "m4a", danmaku_store: Optional[DanmakuStore] = None,
+                 danmaku_segments: Optional[DanmakuSegmentFetcher] = None, page_workers: int = 4,
+                 progress: Optional[ProgressTracker] = None, web_base: str = WEB_BASE,
+                 comment_base: str = COMMENT_BASE):
         """
         :param output_dir: 下载保存目录
         :param log: 日志回调函数 log(str)
+        :param scheduler: 可选的请求调度器，对封面（image）与弹幕（comment）请求限速
+                          （封面与弹幕共用连接池，支持断点续传，未变化的文件不会重复下载）
+        :param audio_format: 音频格式 m4a（不重新编码）/ mp3（libmp3lame 转码）
+        :param danmaku_store: 可选的弹幕列式存储，弹幕下载后解析写入
+        :param danmaku_segments: 可选的分段弹幕抓取器，传入时通过分段接口获取全部历史弹幕，
+                                 而不是 XML 接口的最近弹幕
+        :param page_workers: 多P视频同时下载的分P数，各分P保存在 {bvid}/p{n}/ 下
+        :param progress: 可选的进度统计，记录各阶段进行中/完成/失败数与下载字节数
+        :param web_base: 交给 yt-dlp 的视频网页地址前缀（测试时可指向本地服务）
+        :param comment_base: 多P视频弹幕 XML 地址前缀（测试时可指向本地服务）
         """
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"不支持的音频格式: {audio_format}，可选: {', '.join(AUDIO_FORMATS)}")
         self.output_dir = output_dir
         self.log = log or (lambda s: print(s, flush=True))
+        self.scheduler = scheduler
+        self.audio_format = audio_format
+        self.danmaku_store = danmaku_store
+        self.danmaku_segments = danmaku_segments
+        self.progress = progress
+        self.web_base = web_base.rstrip("/")
+        self.comment_base = comment_base.rstrip("/")
+        self.files = FileDownloader(scheduler=scheduler, log=self.log,
+                                    on_bytes=progress.add_bytes if progress is not None else None)
+        self.page_workers = max(1, page_workers)
+        self._page_pool = None
+        self._page_pool_lock = threading.Lock()
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def download_all(self, video_info: dict):
-        # 下载五件套（封面、弹幕、视频、音频、metadata）
+    def download_all(self, video_info: dict, stages: Optional[Iterable[str]] = None,
+                     on_stage: Optional[Callable[[str, bool, Optional[str]], None]] = None):
+        """
+        下载五件套（封面、弹幕、视频、音频、metadata），各阶段互不影响
+        :param stages: 需要执行的阶段，默认 RESOURCE_STAGES 全部执行
+        :param on_stage: 阶段完成回调 on_stage(阶段, 是否成功, 错误信息)
+        """
         bvid = video_info["bvid"]
         save_dir = os.path.join(self.output_dir, bvid)
         os.makedirs(save_dir, exist_ok=True)
+        stages = set(RESOURCE_STAGES if stages is None else stages)
 
         # metadata
         self._save_metadata_json(video_info, save_dir)
 
         # 封面
-        if video_info.get("cover_url"):
-            self._download_cover(video_info["cover_url"], save_dir)
+        if "cover" in stages:
+            self._run_stage("cover", bvid, on_stage, self._download_cover, video_info.get("cover_url"), save_dir)
 
         # 弹幕
-        if video_info.get("danmaku_url"):
-            self._download_danmaku(video_info["danmaku_url"], save_dir, bvid)
+        if "danmaku" in stages:
+            self._run_stage("danmaku", bvid, on_stage, self._danmaku_stage, video_info, save_dir)
+
+        # 视频 + 音频
+        video_ok = True
+        if "video" in stages:
+            video_ok = self._run_stage("video", bvid, on_stage, self._video_stage, video_info, save_dir,
+                                       "audio" in stages)
+        if "audio" in stages:
+            if video_ok:
+                self._run_stage("audio", bvid, on_stage, self._audio_stage, video_info, save_dir)
+            else:
+                self._fail_stage("audio", bvid, on_stage, AUDIO_SKIPPED)
+
+    def _run_stage(self, stage, bvid, on_stage, func, *args) -> bool:
+        if self.progress is not None:
+            self.progress.stage_started(stage)
+        try:
+            with metrics.timer("bili_stage_seconds", stage=stage):
+                func(*args)
+        except Exception as e:
+            self.log(f"[ERROR] {bvid} {stage} 下载失败: {e}")
+            self._stage_failed(stage, on_stage, str(e))
+            return False
+        if self.progress is not None:
+            self.progress.stage_finished(stage, True)
+        if on_stage:
+            on_stage(stage, True, None)
+        return True
 
-        # 视频 + 音频 线程下载
-        thread = threading.Thread(target=self.download_video_and_audio, args=(bvid, save_dir))
-        thread.start()
-        thread.join()
+    def _fail_stage(self, stage, bvid, on_stage, reason: str):
+        """
+        不执行阶段，直接记为失败（前置阶段失败时使用），下次运行会重试
+        """
+        if self.progress is not None:
+            self.progress.stage_started(stage)
+        self.log(f"[WARN] {bvid} {stage} 已跳过: {reason}")
+        self._stage_failed(stage, on_stage, reason)
+
+    def _stage_failed(self, stage, on_stage, error: str):
+        if self.progress is not None:
+            self.progress.stage_finished(stage, False)
+        if on_stage:
+            on_stage(stage, False, error)
+
+    # ---------- 分P ----------
+    @staticmethod
+    def page_targets(video_info: dict, save_dir: str) -> list:
+        """
+        返回需要下载的分P [(页码, cid, 时长, 保存目录)]
+        单P视频保持原有目录结构，多P视频每P保存在 {bvid}/p{n}/ 下
+        """
+        pages = video_info.get("pages") or []
+        if len(pages) <= 1:
+            return [(None, video_info.get("cid"), video_info.get("duration"), save_dir)]
+        return [(p["page"], p["cid"], p.get("duration"), os.path.join(save_dir, f"p{p['page']}")) for p in pages]
+
+    def _map_pages(self, func, targets: list):
+        # 单P直接执行；多P在分P线程池中并行，全部完成后汇总失败的分P
+        if len(targets) == 1:
+            func(*targets[0])
+            return
+        with self._page_pool_lock:
+            if self._page_pool is None:
+                self._page_pool = ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix="page")
+        futures = [(t[0], self._page_pool.submit(func, *t)) for t in targets]
+        errors = []
+        for page, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(f"P{page}: {e}")
+        if errors:
+            raise RuntimeError(f"{len(errors)}/{len(targets)} 个分P失败: {'; '.join(errors[:3])}")
+
+    def _danmaku_stage(self, video_info: dict, save_dir: str):
+        bvid = video_info["bvid"]
+
+        def run(page, cid, duration, page_dir):
+            os.makedirs(page_dir, exist_ok=True)
+            url = video_info.get("danmaku_url") if page is None else f"{self.comment_base}/{cid}.xml"
+            self._download_danmaku(url, page_dir, bvid, cid, duration,
+                                   store_key=bvid if page is None else f"{bvid}/p{page}")
+        self._map_pages(run, self.page_targets(video_info, save_dir))
+
+    def _video_stage(self, video_info: dict, save_dir: str, keep_streams: bool = True):
+        """
+        :param keep_streams: 之后还要执行音频阶段时保留分离的音频流；音频已完成（断点续传）或不需要时
+                             不保留，并清理上次中断留下的 video.f*.* 流文件
+        """
+        bvid = video_info["bvid"]
+        self._map_pages(lambda page, cid, duration, page_dir: self._download_video(bvid, page_dir, page,
+                                                                                   keep_streams),
+                        self.page_targets(video_info, save_dir))
+
+    def _audio_stage(self, video_info: dict, save_dir: str):
+        # 音频提取在转码池中执行，各分P依次处理，不占用分P下载线程
+        errors = []
+        targets = self.page_targets(video_info, save_dir)
+        for page, _, _, page_dir in targets:
+            try:
+                self._extract_audio(page_dir)
+            except Exception as e:
+                errors.append(f"P{page}: {e}" if page is not None else str(e))
+        if errors:
+            raise RuntimeError(errors[0] if len(targets) == 1 else
+                               f"{len(errors)}/{len(targets)} 个分P失败: {'; '.join(errors[:3])}")
+
+    def close(self):
+        if self._page_pool is not None:
+            self._page_pool.shutdown(wait=True)
+        self.files.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def _save_metadata_json(self, video_info, save_dir):
         path = os.path.join(save_dir, "metadata.json")
@@ -47,58 +208,259 @@ class ResourceDownloader:
         self.log(f"[Metadata] metadata.json 已保存: {path}")
 
     def _download_cover(self, url, save_dir):
+        if not url:
+            return
         cover_path = os.path.join(save_dir, "cover.jpg")
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        with open(cover_path, "wb") as f:
-            f.write(resp.content)
-        self.log(f"[Cover] 封面已保存: {cover_path}")
+        if self.files.download(url, cover_path, endpoint="image"):
+            self.log(f"[Cover] 封面已保存: {cover_path}")
+        else:
+            self.log(f"[Cover] 封面未变化，跳过: {cover_path}")
 
-    def _download_danmaku(self, danmaku_url, save_dir, bvid):
+    def _download_danmaku(self, danmaku_url, save_dir, bvid, cid=None, duration=None, store_key=None):
         output_path = os.path.join(save_dir, "danmaku.xml")
-        resp = HttpClient.get(
-            danmaku_url,
-            referer=f"https://www.bilibili.com/video/{bvid}/",
-            timeout=15
-        )
-        resp.raise_for_status()
-        with open(output_path, "wb") as f:
-            f.write(resp.content)
-        self.log(f"[Danmaku] 弹幕已保存: {output_path}")
+        referer = f"https://www.bilibili.com/video/{bvid}/"
+        if self.danmaku_segments is not None and cid:
+            count = self.danmaku_segments.download_xml(cid, duration or 0, output_path, referer=referer)
+            self.log(f"[Danmaku] 全部历史弹幕已保存（{count} 条）: {output_path}")
+        elif not danmaku_url:
+            return
+        elif self.files.download(danmaku_url, output_path, referer=referer, endpoint="comment"):
+            self.log(f"[Danmaku] 弹幕已保存: {output_path}")
+        else:
+            self.log(f"[Danmaku] 弹幕未变化，跳过: {output_path}")
+        if self.danmaku_store is not None:
+            # 列式文件可通过 danmaku_store.py 重新生成，解析失败不影响弹幕阶段结果
+            try:
+                count = self.danmaku_store.ingest(store_key or bvid, output_path)
+                if count >= 0:
+                    self.log(f"[Danmaku] {store_key or bvid} 已写入列式存储 {count} 条")
+            except Exception as e:
+                self.log(f"[ERROR] {bvid} 弹幕解析失败: {e}")
 
     def download_video_and_audio(self, bvid: str, save_dir: str):
+        try:
+            self._download_video(bvid, save_dir)
+            self._extract_audio(save_dir)
+        except Exception as e:
+            print(f"[Video/Audio ERROR] {bvid} 下载失败: {e}")
+
+    def _download_video(self, bvid: str, save_dir: str, page: Optional[int] = None, keep_streams: bool = True):
         os.makedirs(save_dir, exist_ok=True)
         video_path = os.path.join(save_dir, "video.mp4")
-        mp3_path = os.path.join(save_dir, "video.mp3")
-        url = f"https://www.bilibili.com/video/{bvid}"
+        url = f"{self.web_base}/video/{bvid}"
+        if page is not None:
+            # noplaylist 时 yt-dlp 只下载 URL 指定的分P
+            url += f"?p={page}"
 
         try:
             ydl_opts = {
                 "outtmpl": os.path.join(save_dir, "video.%(ext)s"),
                 "format": "bv+ba/b",
                 "merge_output_format": "mp4",
+                # m4a 模式保留合并前的音频流，音频阶段直接改名即可，无需再从 mp4 中分离
+                "keepvideo": self.audio_format == "m4a" and keep_streams,
                 "noplaylist": True,
                 "quiet": False,  # 可以看下载进度
             }
-            print(f"[DEBUG] 开始下载 {bvid} 到 {save_dir}")
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            if self.progress is not None:
+                ydl_opts["progress_hooks"] = [self._ytdlp_bytes_hook()]
+            print(f"[DEBUG] 开始下载 {bvid}{f' P{page}' if page else ''} 到 {save_dir}")
+            with metrics.timer("bili_media_seconds", step="ytdlp"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 ydl.download([url])
             print(f"[Video] 视频已保存: {video_path}")
+            if not keep_streams:
+                self._remove_streams(save_dir)
+        finally:
+            gc.collect()
+
+    def _ytdlp_bytes_hook(self):
+        # yt-dlp 回调给出的是单个文件的累计字节数，换算为增量计入进度统计
+        seen = {}
+
+        def hook(d):
+            if d.get("status") not in ("downloading", "finished"):
+                return
+            name = d.get("filename")
+            current = d.get("downloaded_bytes") or 0
+            delta = current - seen.get(name, 0)
+            if delta > 0:
+                seen[name] = current
+                self.progress.add_bytes(delta)
+        return hook
 
-            if os.path.exists(video_path):
-                cmd = [
-                    "ffmpeg", "-y", "-i", video_path,
-                    "-vn", "-acodec", "libmp3lame", "-q:a", "2", mp3_path
-                ]
+    def _extract_audio(self, save_dir: str):
+        video_path = os.path.join(save_dir, "video.mp4")
+        if self.audio_format == "m4a" and self._take_audio_stream(save_dir):
+            return
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"视频文件不存在，跳过音频提取: {video_path}")
+
+        audio_path = os.path.join(save_dir, f"video.{self.audio_format}")
+        if self.audio_format == "m4a":
+            # 只做封装转换，不解码音频
+            codec_args = ["-c:a", "copy"]
+        else:
+            codec_args = ["-acodec", "libmp3lame", "-q:a", "2"]
+        cmd = ["ffmpeg", "-y", "-i", video_path, "-vn", *codec_args, audio_path]
+        try:
+            with metrics.timer("bili_media_seconds", step="ffmpeg"):
+                subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+            print(f"[Audio] 音频已提取: {audio_path}")
+        except subprocess.CalledProcessError as e:
+            print(f"[Audio ERROR] 提取失败: {e.stderr.decode('utf-8')}")
+            raise
+
+    def _take_audio_stream(self, save_dir: str) -> bool:
+        """
+        使用 yt-dlp 保留的原始音频流作为 video.m4a，并清理合并前的视频流
+        :return: 找到音频流返回 True
+        """
+        parts = glob.glob(os.path.join(glob.escape(save_dir), "video.f*.*"))
+        streams = [p for p in parts if os.path.splitext(p)[1].lower() in _AUDIO_STREAM_EXTS]
+        if not streams:
+            return False
+        audio_path = os.path.join(save_dir, "video.m4a")
+        os.replace(streams[0], audio_path)
+        self._remove_streams(save_dir)
+        print(f"[Audio] 音频已保存（原始音频流）: {audio_path}")
+        return True
+
+    @staticmethod
+    def _remove_streams(save_dir: str):
+        # 删除 yt-dlp 合并前的分离流（video.f<格式ID>.<ext>）
+        for p in glob.glob(os.path.join(glob.escape(save_dir), "video.f*.*")):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+
+class MediaPipeline:
+    """
+    分阶段的媒体下载流水线：
+    封面、弹幕、视频（yt-dlp）在网络 I/O 线程池中并行下载，
+    音频提取（ffmpeg）在独立的转码池中执行，两者之间用有界队列衔接，
+    网络下载与 CPU 转码可以同时进行
+    """
+    def __init__(self, downloader: ResourceDownloader, io_workers: int = 4,
+                 transcode_workers: Optional[int] = None, max_pending_videos: Optional[int] = None,
+                 max_pending_transcodes: Optional[int] = None):
+        """
+        :param downloader: 实际执行各阶段的 ResourceDownloader
+        :param io_workers: 网络下载线程数
+        :param transcode_workers: 转码并发数，默认等于 CPU 核数（ffmpeg 为独立进程，线程只负责等待）
+        :param max_pending_videos: 最多同时排队的视频数，超过时 submit 阻塞
+        :param max_pending_transcodes: 最多等待转码的任务数，超过时网络线程阻塞
+        """
+        self.downloader = downloader
+        self.io_workers = max(1, io_workers)
+        self.transcode_workers = max(1, transcode_workers or os.cpu_count() or 1)
+        self._io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="media-io")
+        self._transcode_pool = ThreadPoolExecutor(max_workers=self.transcode_workers,
+                                                  thread_name_prefix="media-transcode")
+        self._video_slots = threading.BoundedSemaphore(max_pending_videos or self.io_workers * 4)
+        self._transcode_slots = threading.BoundedSemaphore(max_pending_transcodes or self.transcode_workers * 2)
+        self._depth_lock = threading.Lock()
+        self._pending_videos = 0
+        self._pending_transcodes = 0
+
+    @property
+    def pending_videos(self) -> int:
+        """已提交但尚未全部完成的视频数"""
+        return self._pending_videos
+
+    @property
+    def pending_transcodes(self) -> int:
+        """已排队或正在进行的音频转码数"""
+        return self._pending_transcodes
+
+    def _add_depth(self, videos: int = 0, transcodes: int = 0):
+        with self._depth_lock:
+            self._pending_videos += videos
+            self._pending_transcodes += transcodes
+
+    def submit(self, video_info: dict, stages: Optional[Iterable[str]] = None,
+               on_stage: Optional[Callable[[str, bool, Optional[str]], None]] = None) -> Future:
+        """
+        提交一个视频的资源下载，排队视频过多时阻塞
+        :param stages: 需要执行的阶段，默认 RESOURCE_STAGES 全部执行
+        :param on_stage: 阶段完成回调 on_stage(阶段, 是否成功, 错误信息)，会在工作线程中调用
+        :return: 该视频全部阶段结束时完成的 Future，结果为 bvid
+        """
+        bvid = video_info["bvid"]
+        save_dir = os.path.join(self.downloader.output_dir, bvid)
+        os.makedirs(save_dir, exist_ok=True)
+        stages = [s for s in RESOURCE_STAGES if s in set(RESOURCE_STAGES if stages is None else stages)]
+        done = Future()
+
+        self.downloader._save_metadata_json(video_info, save_dir)
+        if not stages:
+            done.set_result(bvid)
+            return done
+
+        self._video_slots.acquire()
+        self._add_depth(videos=1)
+        remaining = [len(stages)]
+        lock = threading.Lock()
+
+        def finish():
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._add_depth(videos=-1)
+                self._video_slots.release()
+                done.set_result(bvid)
+
+        def run(stage, func, *args):
+            try:
+                return self.downloader._run_stage(stage, bvid, on_stage, func, *args)
+            finally:
+                finish()
+
+        def submit_audio():
+            # 转码队列已满时在此阻塞，形成背压
+            self._transcode_slots.acquire()
+            self._add_depth(transcodes=1)
+
+            def transcode():
                 try:
-                    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-                    print(f"[Audio] 音频已提取: {mp3_path}")
-                except subprocess.CalledProcessError as e:
-                    print(f"[Audio ERROR] 提取失败: {e.stderr.decode('utf-8')}")
+                    run("audio", self.downloader._audio_stage, video_info, save_dir)
+                finally:
+                    self._add_depth(transcodes=-1)
+                    self._transcode_slots.release()
+            self._transcode_pool.submit(transcode)
+
+        def video_then_audio():
+            video_ok = run("video", self.downloader._video_stage, video_info, save_dir, "audio" in stages)
+            if "audio" not in stages:
+                return
+            if video_ok:
+                submit_audio()
             else:
-                print(f"[Audio] 视频文件不存在，跳过音频提取: {video_path}")
+                try:
+                    self.downloader._fail_stage("audio", bvid, on_stage, AUDIO_SKIPPED)
+                finally:
+                    finish()
 
-        except Exception as e:
-            print(f"[Video/Audio ERROR] {bvid} 下载失败: {e}")
-        finally:
-            gc.collect()
+        if "cover" in stages:
+            self._io_pool.submit(run, "cover", self.downloader._download_cover, video_info.get("cover_url"), save_dir)
+        if "danmaku" in stages:
+            self._io_pool.submit(run, "danmaku", self.downloader._danmaku_stage, video_info, save_dir)
+        if "video" in stages:
+            self._io_pool.submit(video_then_audio)
+        elif "audio" in stages:
+            self._io_pool.submit(submit_audio)
+        return done
+
+    def close(self):
+        """等待全部任务完成并关闭线程池"""
+        # 音频任务由网络线程提交，需先等网络池结束
+        self._io_pool.shutdown(wait=True)
+        self._transcode_pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,188 @@
+import os
+import time
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, Union
+
+from paths import load_bvid_list, resolve_path
+from info_extractor import API_BASE, API_STAT_KEYS, BilibiliInfoExtractor
+from rate_limiter import RequestScheduler, RetryQueue, ThrottledError
+
+STATS_COLUMNS = tuple(API_STAT_KEYS)
+
+
+class StatsSnapshotStore:
+    """
+    播放/点赞等统计数据的时间序列存储（SQLite），每行以 (bvid, 爬取时间) 为键
+    只保存整数计数，按批提交
+    """
+    def __init__(self, db_path: str, batch_rows: int = 1000):
+        """
+        :param db_path: 数据库路径
+        :param batch_rows: 缓冲行数达到该值时提交
+        """
+        self.db_path = db_path
+        self.batch_rows = batch_rows
+        self._lock = threading.Lock()
+        self._pending = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"{c} INTEGER NOT NULL" for c in STATS_COLUMNS)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stats_snapshot ("
+            " bvid TEXT NOT NULL,"
+            " crawled_at INTEGER NOT NULL,"
+            f" {columns},"
+            " PRIMARY KEY (bvid, crawled_at)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+        placeholders = ", ".join("?" for _ in range(len(STATS_COLUMNS) + 2))
+        self._insert_sql = f"INSERT OR REPLACE INTO stats_snapshot VALUES ({placeholders})"
+
+    def append(self, bvid: str, crawled_at: int, stats: dict):
+        row = (bvid, crawled_at, *(int(stats.get(c) or 0) for c in STATS_COLUMNS))
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_rows:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending:
+            self._conn.executemany(self._insert_sql, self._pending)
+            self._conn.commit()
+            self._pending = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def history(self, bvid: str):
+        """按时间顺序返回某视频的全部快照 [(crawled_at, {统计字段: 值}), ...]"""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT crawled_at, {', '.join(STATS_COLUMNS)} FROM stats_snapshot"
+                " WHERE bvid = ? ORDER BY crawled_at", (bvid,)
+            ).fetchall()
+        return [(row[0], dict(zip(STATS_COLUMNS, row[1:]))) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def run_stats_snapshot(
+        bvid_file: Optional[Union[str, Callable]] = None,
+        db_path: Optional[Union[str, Callable]] = None,
+        log: Optional[Callable[[str], None]] = None,
+        workers: int = 8,
+        requests_per_second: float = 5.0,
+        max_retries: int = 5,
+        api_base: str = API_BASE
+):
+    """
+    统计快照模式：只通过轻量统计接口抓取播放、弹幕、点赞、投币、收藏、转发，
+    不请求网页、不写 Excel、不下载任何媒体文件
+    :param bvid_file: BV 号列表文件
+    :param db_path: 快照数据库路径
+    :param workers: 并发请求线程数
+    :param requests_per_second: 统计接口最大请求频率，被限流时自动降速
+    :param max_retries: 被限流的 BV 号最大重试次数
+    :param api_base: API 地址前缀（测试时可指向本地服务）
+    """
+    logger = log or (lambda msg: print(msg, flush=True))
+    bvid_file = resolve_path(bvid_file, "BVID_list.txt")
+    db_path = resolve_path(db_path, "stats_snapshot.db")
+
+    bvid_list = load_bvid_list(bvid_file)
+    if not bvid_list:
+        logger("[INFO] 没有需要处理的 BV 号")
+        return
+
+    logger(f"[STATS] 共 {len(bvid_list)} 个视频，开始抓取统计快照")
+    scheduler = RequestScheduler(rate=requests_per_second, max_retries=max_retries)
+    extractor = BilibiliInfoExtractor(log=logger, pool_size=max(10, workers), scheduler=scheduler,
+                                      api_base=api_base)
+    retries = RetryQueue(scheduler)
+    counts = {"ok": 0, "failed": 0}
+    started = time.monotonic()
+
+    def fetch(bvid):
+        stats = extractor.get_api_stats(bvid)
+        return int(time.time()), stats
+
+    with StatsSnapshotStore(db_path) as store, \
+            ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="stats") as pool:
+        # 同时在途的请求数有上限，完成一个再从列表取下一个；
+        # 全部提前提交时 wait 每轮都要遍历整个 pending，十万级 BV 号会退化为 O(n²)
+        max_pending = max(1, workers) * 4
+        source = iter(bvid_list)
+        exhausted = False
+        pending = {}
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                bvid = next(source, None)
+                if bvid is None:
+                    exhausted = True
+                else:
+                    pending[pool.submit(fetch, bvid)] = (bvid, 0)
+            if not pending and not len(retries) and exhausted:
+                break
+            item = retries.pop_ready()
+            while item is not None:
+                pending[pool.submit(fetch, item[0])] = item
+                item = retries.pop_ready()
+            if not pending:
+                time.sleep(retries.next_delay() or 0)
+                continue
+
+            finished, _ = wait(pending, timeout=retries.next_delay(), return_when=FIRST_COMPLETED)
+            for future in finished:
+                bvid, attempt = pending.pop(future)
+                try:
+                    crawled_at, stats = future.result()
+                except ThrottledError as e:
+                    if not retries.push(bvid, attempt + 1):
+                        counts["failed"] += 1
+                        logger(f"[ERROR] {bvid} 多次被限流，放弃: {e}")
+                    continue
+                except Exception as e:
+                    counts["failed"] += 1
+                    logger(f"[ERROR] 获取 {bvid} 统计数据出错: {e}")
+                    continue
+                if stats is None:
+                    counts["failed"] += 1
+                    continue
+                store.append(bvid, crawled_at, stats)
+                counts["ok"] += 1
+                done = counts["ok"] + counts["failed"]
+                if done % 1000 == 0:
+                    logger(f"[STATS] ({done}/{len(bvid_list)}) 已完成")
+
+    elapsed = time.monotonic() - started
+    logger(f"[STATS] 快照完成: 成功 {counts['ok']}，失败 {counts['failed']}，耗时 {elapsed:.1f}s，保存至 {db_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="B站视频统计数据快照（不下载媒体）")
+    parser.add_argument("--bvid-file", default=os.path.join(os.path.dirname(__file__), "BVID_list.txt"))
+    parser.add_argument("--db", default=os.path.join(os.path.dirname(__file__), "stats_snapshot.db"))
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=5.0, help="每秒最大请求数")
+    args = parser.parse_args()
+
+    run_stats_snapshot(
+        bvid_file=args.bvid_file,
+        db_path=args.db,
+        workers=args.workers,
+        requests_per_second=args.rate
+    )
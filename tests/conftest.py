@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+# 测试直接导入项目根目录下的模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import Fixtures  # noqa: E402
+from benchmarks.mock_server import MockBilibiliServer  # noqa: E402
+
+# 测试用的录制夹具（网页、分段弹幕等）
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class NoTagFixtures(Fixtures):
+    """标签接口总是返回错误的合成数据"""
+    def tags(self, bvid):
+        return b'{"code":-400,"message":"request error"}'
+
+
+@pytest.fixture
+def mock_factory():
+    """
+    按需启动模拟服务：mock_factory(fixtures=None, **MockBilibiliServer 参数)，
+    默认使用小网页的合成数据，测试结束时全部关闭
+    """
+    servers = []
+
+    def start(fixtures=None, **kwargs):
+        server = MockBilibiliServer(fixtures or Fixtures(recorded_dir=None, page_size=20 * 1024), **kwargs)
+        servers.append(server.start())
+        return server
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def mock(mock_factory):
+    return mock_factory()
+
+
+@pytest.fixture
+def recorded_mock(mock_factory):
+    """回放 tests/fixtures 中录制数据的模拟服务"""
+    return mock_factory(Fixtures(recorded_dir=FIXTURES_DIR))
+
+
+@pytest.fixture
+def no_tag_mock(mock_factory):
+    return mock_factory(NoTagFixtures(recorded_dir=None, page_size=20 * 1024))
+
+
+@pytest.fixture
+def no_media(monkeypatch):
+    """视频/音频阶段依赖 yt-dlp 与 ffmpeg，替换为空操作，只验证信息提取、封面与弹幕"""
+    from resource_downloader import ResourceDownloader
+    monkeypatch.setattr(ResourceDownloader, "_video_stage", lambda self, *args, **kwargs: None)
+    monkeypatch.setattr(ResourceDownloader, "_audio_stage", lambda self, *args: None)
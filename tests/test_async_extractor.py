@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from info_extractor import AsyncBilibiliInfoExtractor
+
+
+def _batch(mock, bvids, base=None, **kwargs):
+    base = base or mock.base_url
+
+    async def run():
+        async with AsyncBilibiliInfoExtractor(log=lambda *a: None, web_base=base, api_base=base,
+                                              comment_base=base, **kwargs) as extractor:
+            return await extractor.get_video_info_batch(bvids)
+
+    return asyncio.run(run())
+
+
+def test_batch_from_html_keeps_order(mock):
+    bvids = mock.fixtures.bvids(3)
+    results = _batch(mock, bvids)
+    assert [r["bvid"] for r in results] == bvids
+    assert results[0]["title"] == f"基准测试视频 {bvids[0]}"
+    assert results[0]["cid"] == 10170001
+    assert results[0]["tags"]
+    assert mock.hits["page"] == 3
+    assert mock.hits["view"] == 3
+
+
+def test_batch_api_first_skips_html(mock):
+    bvids = mock.fixtures.bvids(2)
+    results = _batch(mock, bvids, api_first=True)
+    assert [r["title"] for r in results] == [f"基准测试视频 {b}" for b in bvids]
+    assert all(r["tags"] for r in results)
+    assert mock.hits["page"] == 0
+    assert mock.hits["tags"] == 2
+
+
+def test_missing_page_returns_empty(mock):
+    results = _batch(mock, mock.fixtures.bvids(1), base=mock.base_url + "/missing")
+    assert results == [{}]
+
+
+def test_api_first_keeps_result_when_tags_fail(no_tag_mock):
+    bvids = no_tag_mock.fixtures.bvids(1)
+    results = _batch(no_tag_mock, bvids, api_first=True)
+    assert results[0]["title"] == f"基准测试视频 {bvids[0]}"
+    assert results[0]["tags"] == "该视频没有标签"
+    assert no_tag_mock.hits["page"] == 0
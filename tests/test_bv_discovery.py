@@ -0,0 +1,44 @@
+import pytest
+
+from benchmarks.fixtures import FAVORITE_VIDEOS, SPACE_VIDEOS, synthetic_bvids
+from bv_discovery import DiscoveryClient, DiscoverySource, FavoritesSource, UploaderSource, discover
+from rate_limiter import RequestScheduler
+
+
+def test_discovery_source_is_abstract():
+    with pytest.raises(TypeError):
+        DiscoverySource()
+
+
+def test_discover_dedups_across_sources(mock):
+    sources = [FavoritesSource(1), UploaderSource(2)]
+    found = list(discover(sources, log=lambda s: None, api_base=mock.base_url,
+                          scheduler=RequestScheduler(rate=0)))
+    assert found == synthetic_bvids(SPACE_VIDEOS)
+    assert mock.hits["favorites"] == -(-FAVORITE_VIDEOS // 20)
+    assert mock.hits["space"] == -(-SPACE_VIDEOS // 50)
+    assert mock.hits["nav"] == 1
+
+
+def test_discover_uses_default_scheduler(mock, monkeypatch):
+    clients = []
+    original = DiscoveryClient.__init__
+
+    def init(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        clients.append(self)
+    monkeypatch.setattr(DiscoveryClient, "__init__", init)
+    found = list(discover([FavoritesSource(1)], log=lambda s: None, api_base=mock.base_url))
+    assert len(found) == FAVORITE_VIDEOS
+    assert isinstance(clients[0].scheduler, RequestScheduler)
+    assert clients[0].scheduler.stats()["api"]["requests"] == mock.hits["favorites"]
+
+
+def test_discover_retries_throttled_pages(mock):
+    mock.throttle_every = 2
+    scheduler = RequestScheduler(rate=0, backoff_base=0.01)
+    # 两页，第二页第一次请求被限流（限流后降速，保持页数少以控制耗时）
+    found = list(discover([FavoritesSource(1, page_size=23)], log=lambda s: None, api_base=mock.base_url,
+                          scheduler=scheduler, prefetch=1))
+    assert found == synthetic_bvids(FAVORITE_VIDEOS)
+    assert scheduler.stats()["api"]["throttled"] == 1
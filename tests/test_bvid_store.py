@@ -0,0 +1,49 @@
+import os
+
+from bvid_store import av_to_bv, open_bvid_store
+
+BVIDS = [av_to_bv(170001 + i) for i in range(4)]
+
+
+def _write(path, lines, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    # 同一秒内多次写入时修改时间可能不变，显式设置
+    os.utime(path, (mtime, mtime))
+
+
+def test_removed_bvid_not_reimported_after_txt_edit(tmp_path):
+    txt = str(tmp_path / "BVID_list.txt")
+    _write(txt, BVIDS[:3], 1000)
+    with open_bvid_store(txt) as store:
+        assert store.all_bvids() == BVIDS[:3]
+        store.remove_many([BVIDS[1]])
+
+    _write(txt, BVIDS, 2000)
+    with open_bvid_store(txt) as store:
+        assert store.all_bvids() == [BVIDS[0], BVIDS[2], BVIDS[3]]
+
+
+def test_lines_removed_from_txt_are_removed_from_store(tmp_path):
+    txt = str(tmp_path / "BVID_list.txt")
+    _write(txt, BVIDS[:3], 1000)
+    with open_bvid_store(txt) as store:
+        store.add(BVIDS[3])
+
+    _write(txt, [BVIDS[0], BVIDS[2]], 2000)
+    with open_bvid_store(txt) as store:
+        # 只在界面中添加的 BV 号不受 txt 影响
+        assert store.all_bvids() == [BVIDS[0], BVIDS[2], BVIDS[3]]
+
+
+def test_line_readded_to_txt_is_imported_again(tmp_path):
+    txt = str(tmp_path / "BVID_list.txt")
+    _write(txt, BVIDS[:2], 1000)
+    with open_bvid_store(txt) as store:
+        store.remove_many([BVIDS[1]])
+    _write(txt, BVIDS[:1], 2000)
+    open_bvid_store(txt).close()
+
+    _write(txt, BVIDS[:2], 3000)
+    with open_bvid_store(txt) as store:
+        assert store.all_bvids() == BVIDS[:2]
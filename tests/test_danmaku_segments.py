@@ -0,0 +1,59 @@
+import os
+import xml.etree.ElementTree as ET
+
+from danmaku_segments import DanmakuSegmentFetcher, decode_segment, segment_count
+from rate_limiter import RequestScheduler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CID = 10170001
+
+
+def _segment(index):
+    with open(os.path.join(FIXTURES_DIR, f"{CID}.seg{index}.so"), "rb") as f:
+        return f.read()
+
+
+def test_decode_segment_reads_fields_and_skips_unknown():
+    records = decode_segment(_segment(1))
+    assert [r[7] for r in records] == [1500000000000000001, 1500000000000000002, 1500000000000000003]
+    assert records[1] == (12.345, 5, 25, 16711680, 1700000000, 0, "e5f6a7b8", 1500000000000000002, "第一条弹幕")
+    assert records[2][:6] == (359.999, 4, 18, 65280, 1700000200, 1)
+    assert decode_segment(b"") == []
+
+
+def test_segment_count():
+    assert segment_count(0) == 1
+    assert segment_count(360) == 1
+    assert segment_count(361) == 2
+
+
+def test_fetcher_downloads_segments_in_order(recorded_mock, tmp_path):
+    scheduler = RequestScheduler()
+    fetcher = DanmakuSegmentFetcher(scheduler=scheduler, api_base=recorded_mock.base_url)
+    try:
+        records = fetcher.fetch(CID, duration=400)
+        path = str(tmp_path / "danmaku.xml")
+        count = fetcher.download_xml(CID, 400, path)
+    finally:
+        fetcher.close()
+
+    assert [r[8] for r in records] == ["第一条弹幕", "第二条 & <测试>", "控制字符\x07保留", "第二段"]
+    assert recorded_mock.hits["danmaku_segment"] == 4
+    # 分段请求独立限速，不占用弹幕 XML 的速率
+    assert scheduler.stats()["segment"]["requests"] == 4
+    assert scheduler.stats()["comment"]["requests"] == 0
+    assert scheduler.limiters["segment"].rate > scheduler.limiters["comment"].rate
+
+    assert count == 4
+    root = ET.parse(path).getroot()
+    assert root.findtext("chatid") == str(CID)
+    assert [d.text for d in root.iter("d")] == ["第一条弹幕", "第二条 & <测试>", "控制字符保留", "第二段"]
+    assert root.find("d").get("p").startswith("12.34500,5,25,16711680,1700000000,0,e5f6a7b8,")
+
+
+def test_missing_segment_is_empty(recorded_mock):
+    fetcher = DanmakuSegmentFetcher(api_base=recorded_mock.base_url)
+    try:
+        assert fetcher.fetch(CID + 1, duration=60) == []
+    finally:
+        fetcher.close()
@@ -0,0 +1,63 @@
+import os
+import shutil
+
+import pytest
+
+from danmaku_store import DanmakuStore, iter_danmaku, parse_p
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "danmaku_sample.xml")
+
+
+def test_parse_p_fields():
+    assert parse_p("12.345,5,25,16711680,1700000100,0,e5f6a7b8,1500000000000000002,10") == (
+        12.345, 5, 25, 16711680, 1700000100, 0, "e5f6a7b8", 1500000000000000002)
+    # 旧格式缺少弹幕池 / 用户哈希 / 弹幕ID 时使用默认值
+    assert parse_p("1.5,1,25,16777215,1700000000") == (1.5, 1, 25, 16777215, 1700000000, 0, "", 0)
+
+
+def test_iter_danmaku_skips_malformed():
+    items = list(iter_danmaku(FIXTURE))
+    assert [i[-1] for i in items] == ["前排 & 打卡", "第一条弹幕", "高能 前方高能", ""]
+    assert items[2][:7] == (65.25, 4, 18, 65280, 1700000200, 1, "0c0d0e0f")
+
+
+@pytest.fixture
+def store(tmp_path):
+    pytest.importorskip("pyarrow")
+    for bvid in ("BV17x411w7KC", "BV17x411w7KD"):
+        os.makedirs(tmp_path / bvid)
+        shutil.copy(FIXTURE, tmp_path / bvid / "danmaku.xml")
+    with DanmakuStore(str(tmp_path), batch_rows=2) as s:
+        yield s
+
+
+def test_ingest_skips_unchanged_files(store, tmp_path):
+    assert store.ingest("BV17x411w7KC") == 4
+    assert store.ingest("BV17x411w7KC") == -1
+    xml_path = tmp_path / "BV17x411w7KC" / "danmaku.xml"
+    st = os.stat(xml_path)
+    os.utime(xml_path, (st.st_atime, st.st_mtime + 10))
+    assert store.ingest("BV17x411w7KC") == 4
+    assert store.stats("BV17x411w7KC") == {"count": 4, "max_time": pytest.approx(359.999, abs=1e-3),
+                                           "first_ts": 1700000000, "last_ts": 1700000300}
+
+
+def test_query_by_time_window_and_keyword(store):
+    assert store.ingest_tree(log=lambda s: None) == 2
+    rows = list(store.query(start=10, end=100))
+    assert sorted((r["bvid"], r["text"]) for r in rows) == [
+        ("BV17x411w7KC", "第一条弹幕"), ("BV17x411w7KC", "高能 前方高能"),
+        ("BV17x411w7KD", "第一条弹幕"), ("BV17x411w7KD", "高能 前方高能")]
+    rows = list(store.query(bvids=["BV17x411w7KD"], keyword="高能", columns=["time"]))
+    assert rows == [{"time": pytest.approx(65.25), "bvid": "BV17x411w7KD"}]
+    rows = list(store.query(since=1700000300, columns=["timestamp", "text"]))
+    assert sorted(r["bvid"] for r in rows) == ["BV17x411w7KC", "BV17x411w7KD"]
+    assert {(r["timestamp"], r["text"]) for r in rows} == {(1700000300, "")}
+    assert store.query_table(start=400).num_rows == 0
+
+
+def test_index_excludes_videos_outside_window(store):
+    store.ingest("BV17x411w7KC")
+    # 发送时间全部早于 since 的视频在索引阶段即被排除
+    assert store._candidates(None, None, 1800000000, None) == []
+    assert [r[0] for r in store._candidates(None, 300, None, None)] == ["BV17x411w7KC"]
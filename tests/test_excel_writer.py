@@ -0,0 +1,76 @@
+import json
+import os
+
+from openpyxl import load_workbook
+
+from info_data import HEADERS, ExcelWriter, excel_parts, init_excel
+
+
+def _row(i):
+    return [f"标题{i}", f"https://www.bilibili.com/video/{i}"] + [""] * (len(HEADERS) - 2)
+
+
+def _titles(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return [r[0] for r in wb.active.iter_rows(min_row=2, values_only=True)]
+    finally:
+        wb.close()
+
+
+def test_rows_roll_over_to_new_parts(tmp_path):
+    path = str(tmp_path / "output.xlsx")
+    init_excel(path)
+    writer = ExcelWriter(path, flush_rows=2, part_rows=3)
+    for i in range(7):
+        writer.append_row(_row(i))
+    writer.close()
+
+    parts = excel_parts(path)
+    assert [os.path.basename(p) for p in parts] == ["output.xlsx", "output-002.xlsx", "output-003.xlsx"]
+    assert [_titles(p) for p in parts] == [["标题0", "标题1", "标题2"], ["标题3", "标题4", "标题5"], ["标题6"]]
+    assert not os.path.exists(writer.journal_path)
+
+    # 重新打开时从最后一卷继续
+    writer = ExcelWriter(path, part_rows=3)
+    writer.append_row(_row(7))
+    writer.close()
+    assert _titles(parts[2]) == ["标题6", "标题7"]
+
+
+def test_rows_stay_in_one_file_by_default(tmp_path):
+    path = str(tmp_path / "output.xlsx")
+    init_excel(path)
+    writer = ExcelWriter(path, flush_rows=2)
+    for i in range(7):
+        writer.append_row(_row(i))
+    writer.close()
+    assert excel_parts(path) == [path]
+    assert _titles(path) == [f"标题{i}" for i in range(7)]
+
+
+def test_journal_replay_skips_rows_saved_before_crash(tmp_path):
+    path = str(tmp_path / "output.xlsx")
+    init_excel(path)
+    writer = ExcelWriter(path, flush_rows=100)
+    for i in range(3):
+        writer.append_row(_row(i))
+    # 模拟保存成功后、清空 journal 前崩溃：保存工作簿但保留 journal，再追加未保存的一行
+    writer.wb.save(path)
+    writer.append_row(_row(3))
+    writer._journal.close()
+
+    ExcelWriter(path).close()
+    assert _titles(path) == ["标题0", "标题1", "标题2", "标题3"]
+
+
+def test_legacy_journal_is_replayed(tmp_path):
+    path = str(tmp_path / "output.xlsx")
+    init_excel(path)
+    with open(f"{path}.journal", "w", encoding="utf-8") as f:
+        f.write(json.dumps(_row(0), ensure_ascii=False) + "\n")
+        f.write('["写了一半')
+
+    ExcelWriter(path).close()
+    assert _titles(path) == ["标题0"]
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from file_downloader import PART_SUFFIX, FileDownloader
+
+
+@pytest.fixture
+def downloader():
+    received = []
+    # 小块写入，连接中断前已收到的内容落盘
+    fd = FileDownloader(log=lambda s: None, on_bytes=received.append, chunk_size=1000)
+    fd.received = received
+    yield fd
+    fd.close()
+
+
+def _cover_url(mock):
+    return f"{mock.base_url}/bfs/archive/cover.jpg"
+
+
+def _interrupt(mock, downloader, dest, keep=5000):
+    mock.truncate_body = keep
+    with pytest.raises(Exception):
+        downloader.download(_cover_url(mock), dest)
+    mock.truncate_body = 0
+
+
+def test_resume_truncated_part(mock, downloader, tmp_path):
+    dest = str(tmp_path / "cover.jpg")
+    _interrupt(mock, downloader, dest)
+    assert os.path.getsize(dest + PART_SUFFIX) == 5000
+    downloader.received.clear()
+
+    assert downloader.download(_cover_url(mock), dest) is True
+    with open(dest, "rb") as f:
+        assert f.read() == mock.fixtures.cover
+    # 只请求了剩余部分
+    assert sum(downloader.received) == len(mock.fixtures.cover) - 5000
+    assert not os.path.exists(dest + PART_SUFFIX)
+
+
+def test_unchanged_file_skipped_with_304(mock, downloader, tmp_path):
+    dest = str(tmp_path / "cover.jpg")
+    assert downloader.download(_cover_url(mock), dest) is True
+    downloader.received.clear()
+    assert downloader.download(_cover_url(mock), dest) is False
+    assert downloader.received == []
+    assert mock.hits["cover"] == 2
+
+
+def test_changed_etag_downloads_in_full(mock, downloader, tmp_path):
+    dest = str(tmp_path / "cover.jpg")
+    downloader.download(_cover_url(mock), dest)
+    mock.fixtures.cover = bytes(reversed(mock.fixtures.cover))
+    downloader.received.clear()
+    assert downloader.download(_cover_url(mock), dest) is True
+    assert sum(downloader.received) == len(mock.fixtures.cover)
+    with open(dest, "rb") as f:
+        assert f.read() == mock.fixtures.cover
+
+
+def test_changed_part_restarts_from_zero(mock, downloader, tmp_path):
+    # 续传时服务端内容已变化：If-Range 不匹配，返回完整内容
+    dest = str(tmp_path / "cover.jpg")
+    _interrupt(mock, downloader, dest)
+    mock.fixtures.cover = bytes(reversed(mock.fixtures.cover))
+    assert downloader.download(_cover_url(mock), dest) is True
+    with open(dest, "rb") as f:
+        assert f.read() == mock.fixtures.cover
+
+
+def test_interrupted_redownload_of_same_size_is_not_kept(mock, downloader, tmp_path):
+    dest = str(tmp_path / "cover.jpg")
+    downloader.download(_cover_url(mock), dest)
+    old = mock.fixtures.cover
+    mock.fixtures.cover = bytes(reversed(old))
+    _interrupt(mock, downloader, dest)
+    os.remove(dest + PART_SUFFIX)
+    # 记录未完成，旧文件大小相同也要重新下载
+    assert downloader.download(_cover_url(mock), dest) is True
+    with open(dest, "rb") as f:
+        assert f.read() == mock.fixtures.cover
+
+
+def test_invalid_resume_offset_restarts(mock, downloader, tmp_path):
+    dest = str(tmp_path / "cover.jpg")
+    _interrupt(mock, downloader, dest)
+    with open(dest + PART_SUFFIX, "ab") as f:
+        f.write(b"\0" * len(mock.fixtures.cover))
+    assert downloader.download(_cover_url(mock), dest) is True
+    with open(dest, "rb") as f:
+        assert f.read() == mock.fixtures.cover
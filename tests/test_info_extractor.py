@@ -0,0 +1,27 @@
+import pytest
+
+from info_extractor import BilibiliInfoExtractor
+from rate_limiter import RequestScheduler
+
+
+def _extractor(mock, logs, scheduler=None, api_base=None, **kwargs):
+    return BilibiliInfoExtractor(log=logs.append, scheduler=scheduler, web_base=mock.base_url,
+                                 api_base=api_base or mock.base_url, comment_base=mock.base_url, **kwargs)
+
+
+@pytest.mark.parametrize("scheduler", [None, RequestScheduler(rate=0)])
+def test_non_json_api_body_is_an_error_in_both_modes(mock, scheduler):
+    logs = []
+    extractor = _extractor(mock, logs, scheduler, api_base=mock.base_url + "/missing")
+    bvid = mock.fixtures.bvids(1)[0]
+    assert extractor.get_api_stats(bvid) is None
+    assert extractor._get_api_data(bvid) == {}
+    assert len([line for line in logs if line.startswith("[API ERROR]")]) == 2
+
+
+def test_api_first_keeps_result_when_tags_fail(no_tag_mock):
+    bvid = no_tag_mock.fixtures.bvids(1)[0]
+    info = _extractor(no_tag_mock, [], api_first=True).get_video_info(bvid)
+    assert info["title"] == f"基准测试视频 {bvid}"
+    assert info["tags"] == "该视频没有标签"
+    assert no_tag_mock.hits["page"] == 0
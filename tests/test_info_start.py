@@ -0,0 +1,26 @@
+from info_start import _download_resources, _resource_stages
+from resource_downloader import ResourceDownloader
+
+
+class _Downloader(ResourceDownloader):
+    def __init__(self, output_dir, failing=()):
+        super().__init__(output_dir=output_dir, log=lambda s: None)
+        self.failing = set(failing)
+
+    def download_all(self, video_info, stages=None, on_stage=None):
+        for stage in stages:
+            on_stage(stage, stage not in self.failing, "error" if stage in self.failing else None)
+
+
+def test_resource_stages_records_failures():
+    stages, on_stage, failed = _resource_stages({"bvid": "BV17x411w7KC"}, None)
+    on_stage("cover", True, None)
+    on_stage("video", False, "403")
+    assert "video" in stages
+    assert failed == ["video"]
+
+
+def test_download_resources_reports_stage_failure(tmp_path):
+    video_info = {"bvid": "BV17x411w7KC"}
+    assert _download_resources(video_info, _Downloader(str(tmp_path))) is True
+    assert _download_resources(video_info, _Downloader(str(tmp_path), failing=["audio"])) is False
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+import initial_state_parser as parser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _page(name):
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+def test_nested_terminators_inside_strings():
+    page = _page("video_page_nested.html")
+    video_data = parser.extract_video_data(page)
+    assert video_data["bvid"] == "BV17x411w7KC"
+    assert video_data["title"] == "标题里有 }; 和 ]"
+    assert video_data["desc"] == '第一行\n第二行 {"json": [1, 2]};'
+    assert video_data["pages"][0]["cid"] == 10170001
+    # 完整对象同样按括号配对截取，不会停在字符串中的 "};"
+    state = parser.extract_initial_state(page)
+    assert state["related"][0]["title"] == "推荐};视频"
+    assert state["isClient"] is False
+    assert parser.extract_keywords(page) == '嵌套测试,单机游戏,"引号",bilibili'
+
+
+def test_escaped_quotes_and_backslashes():
+    page = _page("video_page_escaped.html")
+    video_data = parser.extract_video_data(page)
+    assert video_data["title"] == '引号 "}" 与反斜杠 \\'
+    assert video_data["desc"] == "结尾反斜杠\\"
+    assert video_data["pic"] == "http://i0.hdslb.com/bfs/archive/cover.jpg"
+    assert parser.extract_initial_state(page)["upData"]["name"] == '"{"'
+    assert parser.extract_keywords(page) == "转义测试,标签A"
+
+
+def test_str_input_matches_bytes():
+    page = _page("video_page_nested.html")
+    assert parser.extract_video_data(page.decode("utf-8")) == parser.extract_video_data(page)
+
+
+def test_missing_state():
+    page = _page("video_page_missing_state.html")
+    assert parser.extract_video_data(page) is None
+    assert parser.extract_initial_state_json(page) is None
+    assert parser.extract_keywords(page) is None
+    assert parser.extract_video_data(b"<html></html>") is None
+
+
+def test_state_without_video_data():
+    page = b'<script>window.__INITIAL_STATE__={"video":{"videoData":{"bvid":"x"}},"videoData":null};</script>'
+    assert parser.extract_video_data(page) is None
+    assert json.loads(parser.extract_initial_state_json(page))["video"]["videoData"]["bvid"] == "x"
+
+
+def test_truncated_state_raises():
+    page = b'<script>window.__INITIAL_STATE__={"videoData":{"title":"unclosed'
+    with pytest.raises(ValueError):
+        parser.extract_initial_state(page)
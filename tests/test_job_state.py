@@ -0,0 +1,24 @@
+from job_state import STAGES, JobStateStore
+
+
+def test_clear_and_failed_are_scoped_to_given_bvids(tmp_path):
+    job = JobStateStore(str(tmp_path / "job_state.db"))
+    try:
+        for stage in STAGES:
+            job.mark("BV1a", stage, True)
+        job.save_video_info("BV1a", {"bvid": "BV1a"})
+        # 另一个列表中断的任务：一个阶段失败，一个阶段未开始
+        job.mark("BV1b", "metadata", True)
+        job.mark("BV1b", "cover", False, "timeout")
+        job.save_video_info("BV1b", {"bvid": "BV1b"})
+
+        assert job.failed(["BV1a"]) == {}
+        assert job.failed() == {"BV1b": ["cover"]}
+        assert job.is_finished(["BV1a"])
+
+        job.clear(["BV1a"])
+        assert job.pending_stages("BV1a") == list(STAGES)
+        assert job.load_video_info("BV1b") == {"bvid": "BV1b"}
+        assert job.pending_stages("BV1b") == list(STAGES[1:])
+    finally:
+        job.close()
@@ -0,0 +1,125 @@
+import logging
+import os
+import queue
+import time
+
+from log_pipeline import FINISHED, BatchingLogSender, LogReceiver, LogTail, parse_line_level
+
+
+def _drain(q):
+    batches = []
+    while True:
+        try:
+            batches.append(q.get_nowait())
+        except queue.Empty:
+            return batches
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_sender_batches_by_count():
+    q = queue.Queue()
+    # 间隔足够长，只有条数达到 max_batch 时才会发送
+    sender = BatchingLogSender(q, flush_interval=60, max_batch=3)
+    try:
+        for i in range(3):
+            sender(f"[INFO] 消息{i}")
+        _wait_for(lambda: not q.empty())
+        batch = q.get_nowait()
+        assert [r[2] for r in batch] == ["[INFO] 消息0", "[INFO] 消息1", "[INFO] 消息2"]
+        assert batch[0][1] == logging.INFO
+    finally:
+        sender.close()
+
+
+def test_sender_batches_by_interval_and_close_flushes_rest():
+    q = queue.Queue()
+    sender = BatchingLogSender(q, flush_interval=0.05, max_batch=1000, min_level=logging.INFO)
+    sender("[ERROR] 失败")
+    sender("[DEBUG] 被丢弃")
+    _wait_for(lambda: not q.empty())
+    assert [(r[1], r[2]) for r in q.get_nowait()] == [(logging.ERROR, "[ERROR] 失败")]
+
+    sender.flush_interval = 60
+    sender("[WARN] 剩余")
+    sender.close()
+    assert [[r[2] for r in batch] for batch in _drain(q)] == [["[WARN] 剩余"]]
+
+
+def test_receiver_keeps_progress_apart_from_records(tmp_path):
+    q = queue.Queue()
+    path = tmp_path / "logs.txt"
+    receiver = LogReceiver(q, str(path))
+    try:
+        now = time.time()
+        q.put([(now, logging.INFO, "[MAIN] 开始")])
+        q.put({"done": 1})
+        q.put({"done": 2})
+        q.put([(now, logging.ERROR, "[ERROR] 失败")])
+        q.put(FINISHED)
+        q.put([(now, logging.INFO, "[MAIN] 结束标记之后")])
+        records, finished = receiver.poll()
+        assert finished
+        assert [r[2] for r in records] == ["[MAIN] 开始", "[ERROR] 失败"]
+        # 只保留最新的进度快照，不写入日志文件
+        assert receiver.progress == {"done": 2}
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2
+        assert lines[0].split(None, 3)[2:] == ["INFO", "[MAIN] 开始"]
+        assert lines[1].split(None, 3)[2:] == ["ERROR", "[ERROR] 失败"]
+    finally:
+        receiver.close()
+
+
+def test_tail_drops_partial_first_line(tmp_path):
+    path = tmp_path / "logs.txt"
+    path.write_bytes(b"line-one\nline-two\nline-three\n")
+    tail = LogTail(str(path), initial_bytes=len(b"two\nline-three\n"))
+    assert tail.read_new() == ["line-three"]
+
+
+def test_tail_drops_partial_first_line_before_newline_arrives(tmp_path):
+    path = tmp_path / "logs.txt"
+    path.write_bytes(b"0123456789")
+    tail = LogTail(str(path), initial_bytes=4)
+    assert tail.read_new() == []
+    with open(path, "ab") as f:
+        f.write(b"9\nnext\n")
+    assert tail.read_new() == ["next"]
+
+
+def test_tail_follows_appends_rotation_and_truncation(tmp_path):
+    path = tmp_path / "logs.txt"
+    path.write_bytes(b"a\n")
+    tail = LogTail(str(path))
+    assert tail.read_new() == ["a"]
+
+    # 未写完的行留到下次读取
+    with open(path, "ab") as f:
+        f.write(b"b\nc")
+    assert tail.read_new() == ["b"]
+    with open(path, "ab") as f:
+        f.write(b"c\n")
+    assert tail.read_new() == ["cc"]
+
+    # 轮转：原文件改名后新建同名文件
+    os.replace(path, tmp_path / "logs.txt.1")
+    path.write_bytes(b"rotated\n")
+    assert tail.read_new() == ["rotated"]
+
+    # 截断：同一文件变短后从头读取
+    path.write_bytes(b"x\n")
+    assert tail.read_new() == ["x"]
+
+
+def test_parse_line_level_keeps_previous_for_continuation_lines():
+    assert parse_line_level("2024-01-01 12:00:00,123 ERROR   [ERROR] 失败") == logging.ERROR
+    assert parse_line_level("Traceback (most recent call last):", logging.ERROR) == logging.ERROR
+    assert parse_line_level("  File \"x.py\", line 1, in <module>", logging.WARNING) == logging.WARNING
+    assert parse_line_level("") == logging.INFO
+    assert parse_line_level("2024-01-01 12:00:01,000 DEBUG   [DEBUG] 细节", logging.ERROR) == logging.DEBUG
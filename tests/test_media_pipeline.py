@@ -0,0 +1,113 @@
+import pytest
+
+import resource_downloader
+from benchmarks.fixtures import Fixtures
+from info_extractor import BilibiliInfoExtractor
+from resource_downloader import AUDIO_SKIPPED, MediaPipeline, ResourceDownloader
+
+
+class _Downloader(ResourceDownloader):
+    def __init__(self, output_dir, video_ok):
+        super().__init__(output_dir=output_dir, log=lambda s: None)
+        self.video_ok = video_ok
+        self.audio_calls = 0
+
+    def _video_stage(self, video_info, save_dir, keep_streams=True):
+        if not self.video_ok:
+            raise RuntimeError("403")
+
+    def _audio_stage(self, video_info, save_dir):
+        self.audio_calls += 1
+
+
+def _events(downloader, pipelined):
+    events = []
+    video_info = {"bvid": "BV17x411w7KC"}
+    on_stage = lambda stage, ok, error: events.append((stage, ok, error))
+    if pipelined:
+        with MediaPipeline(downloader) as pipeline:
+            pipeline.submit(video_info, stages=["video", "audio"], on_stage=on_stage).result(timeout=10)
+    else:
+        downloader.download_all(video_info, stages=["video", "audio"], on_stage=on_stage)
+    return sorted(events)
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_audio_skipped_when_video_fails(tmp_path, pipelined):
+    downloader = _Downloader(str(tmp_path), video_ok=False)
+    assert _events(downloader, pipelined) == [("audio", False, AUDIO_SKIPPED), ("video", False, "403")]
+    assert downloader.audio_calls == 0
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_audio_runs_after_video(tmp_path, pipelined):
+    downloader = _Downloader(str(tmp_path), video_ok=True)
+    assert _events(downloader, pipelined) == [("audio", True, None), ("video", True, None)]
+    assert downloader.audio_calls == 1
+
+
+class _FakeYoutubeDL:
+    opts = []
+
+    def __init__(self, opts):
+        self.opts.append(opts)
+        self.outtmpl = opts["outtmpl"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def download(self, urls):
+        with open(self.outtmpl.replace("%(ext)s", "mp4"), "wb") as f:
+            f.write(b"mp4")
+
+
+@pytest.mark.parametrize("stages, kept", [(["video"], False), (["video", "audio"], True)])
+def test_video_stage_cleans_streams_when_audio_done(tmp_path, monkeypatch, stages, kept):
+    monkeypatch.setattr(resource_downloader.yt_dlp, "YoutubeDL", _FakeYoutubeDL)
+    _FakeYoutubeDL.opts = []
+    downloader = ResourceDownloader(output_dir=str(tmp_path), log=lambda s: None)
+    save_dir = tmp_path / "BV17x411w7KC"
+    save_dir.mkdir()
+    # 上次运行中断留下的分离流；音频阶段已完成时视频阶段负责清理
+    (save_dir / "video.f30080.mp4").write_bytes(b"v")
+    (save_dir / "video.f30280.m4a").write_bytes(b"a")
+    with downloader:
+        downloader.download_all({"bvid": "BV17x411w7KC"}, stages=stages)
+    assert _FakeYoutubeDL.opts[0]["keepvideo"] is kept
+    assert (save_dir / "video.mp4").exists()
+    assert list(save_dir.glob("video.f*.*")) == []
+    # 需要音频时由音频阶段取走音频流，否则视频阶段直接删除
+    assert (save_dir / "video.m4a").exists() is kept
+
+
+@pytest.mark.parametrize("parts", [1, 3])
+def test_page_layout_and_danmaku_per_cid(tmp_path, mock_factory, no_media, parts):
+    mock = mock_factory(Fixtures(recorded_dir=None, page_size=20 * 1024, parts=parts, danmaku_count=20))
+    bvid = mock.fixtures.bvids(1)[0]
+    extractor = BilibiliInfoExtractor(log=lambda s: None, web_base=mock.base_url, api_base=mock.base_url,
+                                      comment_base=mock.base_url)
+    video_info = extractor.get_video_info(bvid)
+    assert len(video_info["pages"]) == parts
+
+    events = []
+    with ResourceDownloader(str(tmp_path), log=lambda s: None, web_base=mock.base_url,
+                            comment_base=mock.base_url) as downloader:
+        downloader.download_all(video_info, on_stage=lambda stage, ok, error: events.append((stage, ok)))
+    assert sorted(events) == [("audio", True), ("cover", True), ("danmaku", True), ("video", True)]
+
+    save_dir = tmp_path / bvid
+    assert (save_dir / "cover.jpg").exists() and (save_dir / "metadata.json").exists()
+    if parts == 1:
+        # 单P视频保持原有结构，弹幕直接位于 {bvid}/ 下
+        assert not list(save_dir.glob("p*"))
+        assert (save_dir / "danmaku.xml").read_bytes() == mock.fixtures.danmaku(video_info["cid"])
+    else:
+        assert sorted(p.name for p in save_dir.glob("p*")) == ["p1", "p2", "p3"]
+        assert not (save_dir / "danmaku.xml").exists()
+        for page in video_info["pages"]:
+            path = save_dir / f"p{page['page']}" / "danmaku.xml"
+            assert path.read_bytes() == mock.fixtures.danmaku(page["cid"])
+    assert mock.hits["danmaku"] == parts
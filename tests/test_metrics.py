@@ -0,0 +1,81 @@
+import re
+import urllib.request
+
+import pytest
+
+import metrics
+from info_start import run_extraction
+
+
+def _parse(text):
+    """解析 Prometheus 文本格式: {(名称, 标签字符串): 值}，同时检查每个样本都有 TYPE 声明"""
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            types[name] = kind
+            continue
+        if not line or line.startswith("#"):
+            continue
+        m = re.fullmatch(r"([a-z_]+)(\{[^}]*\})? (\S+)", line)
+        assert m, line
+        name, labels, value = m.group(1), m.group(2) or "", float(m.group(3))
+        assert re.sub(r"_(bucket|sum|count)$", "", name) in types or name in types, line
+        samples[(name, labels)] = value
+    return samples
+
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    # 指标存储为进程级单例，测试使用独立的存储，结束后恢复
+    monkeypatch.setattr(metrics, "_registry", None)
+
+
+def test_scrape_after_mock_run(tmp_path, mock, no_media, fresh_registry):
+    bvids = mock.fixtures.bvids(3)
+    logs, scraped = [], []
+
+    def progress(snapshot):
+        # 任务结束时的最后一次进度回调在指标服务关闭之前，此时抓取一次
+        if snapshot.get("finished"):
+            port = re.search(r"指标服务: http://[\d.]+:(\d+)/metrics", "\n".join(logs)).group(1)
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+                assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                scraped.append(resp.read().decode("utf-8"))
+
+    run_extraction(bvids=bvids, excel_path=str(tmp_path / "output.xlsx"), output_dir=str(tmp_path / "output"),
+                   sinks=("jsonl",), log=logs.append, requests_per_second=0, progress=progress, metrics_port=0,
+                   web_base=mock.base_url, api_base=mock.base_url, comment_base=mock.base_url)
+    assert len(scraped) == 1
+    samples = _parse(scraped[0])
+
+    assert samples[("bili_videos_total", '{result="processed"}')] == 3
+    assert samples[("bili_videos_total", '{result="failed"}')] == 0
+    for stage in ("metadata", "cover", "danmaku", "video", "audio"):
+        assert samples[("bili_stage_total", f'{{result="done",stage="{stage}"}}')] == 3
+        assert samples[("bili_stage_active", f'{{stage="{stage}"}}')] == 0
+        assert samples[("bili_stage_seconds_count", f'{{stage="{stage}"}}')] == 3
+
+    # 请求计数与模拟服务实际收到的请求一致
+    requests_total = {labels: value for (name, labels), value in samples.items()
+                      if name == "bili_http_requests_total"}
+    assert requests_total == {
+        '{endpoint="html",status="200"}': mock.hits["page"],
+        '{endpoint="api",status="200"}': mock.hits["view"] + mock.hits["tags"],
+        '{endpoint="image",status="200"}': mock.hits["cover"],
+        '{endpoint="comment",status="200"}': mock.hits["danmaku"],
+    }
+    assert mock.hits["page"] == mock.hits["cover"] == mock.hits["danmaku"] == 3
+    assert not any(name == "bili_http_errors_total" for name, _ in samples)
+
+    # 直方图的 +Inf 桶等于次数
+    assert samples[("bili_video_info_seconds_count", '{source="fetch"}')] == 3
+    assert samples[("bili_video_info_seconds_bucket", '{source="fetch",le="+Inf"}')] == 3
+    assert samples[("bili_downloaded_bytes_total", "")] > 0
+    assert samples[("bili_rate_limited", '{endpoint="api"}')] == 0
+
+
+def test_metrics_disabled_without_port(fresh_registry):
+    metrics.inc("bili_http_requests_total", endpoint="api", status=200)
+    assert metrics.timer("bili_stage_seconds", stage="cover") is metrics._NULL_TIMER
+    assert metrics.registry() is None
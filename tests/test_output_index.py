@@ -0,0 +1,37 @@
+import os
+
+from output_index import OutputIndex
+
+
+def _rewrite_in_place(path, data):
+    # 原地改写并保持目录修改时间不变（模拟不经临时文件替换的写入）
+    folder = os.path.dirname(path)
+    st = os.stat(folder)
+    with open(path, "r+b") as f:
+        f.write(data)
+    os.utime(folder, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def test_deep_scan_finds_in_place_rewrite(tmp_path):
+    output = tmp_path / "output"
+    (output / "BV17x411w7KC").mkdir(parents=True)
+    path = output / "BV17x411w7KC" / "metadata.json"
+    path.write_bytes(b"{}")
+    with OutputIndex(str(output), db_path=str(tmp_path / "index.db")) as index:
+        assert index.scan() == 1
+        assert index.scan() == 0
+        _rewrite_in_place(str(path), b'{"title": "x"}')
+        assert index.scan() == 0
+        assert index.scan(deep=True) == 1
+        assert index.summary()["total_size"] == len(b'{"title": "x"}')
+        assert index.scan(deep=True) == 0
+
+
+def test_deleted_folder_is_dropped(tmp_path):
+    output = tmp_path / "output"
+    (output / "BV17x411w7KC").mkdir(parents=True)
+    with OutputIndex(str(output), db_path=str(tmp_path / "index.db")) as index:
+        index.scan()
+        os.rmdir(output / "BV17x411w7KC")
+        assert index.scan(deep=True) == 1
+        assert index.folder_names() == []
@@ -0,0 +1,66 @@
+import json
+import os
+import pstats
+import re
+
+import pytest
+
+import metrics
+from info_start import run_extraction
+from profiling import PROFILE_MODES
+
+
+def _read_folded(path):
+    """解析折叠栈文件: {栈: 数值}，每行必须是 "帧;帧;... 正整数" """
+    stacks = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            m = re.fullmatch(r"(\S.*) (\d+)", line.rstrip("\n"))
+            assert m, line
+            assert int(m.group(2)) > 0
+            stacks[m.group(1)] = int(m.group(2))
+    return stacks
+
+
+@pytest.mark.parametrize("mode", PROFILE_MODES)
+def test_profile_writes_parseable_reports(tmp_path, mock, no_media, mode):
+    bvids = mock.fixtures.bvids(3)
+    profile_dir = tmp_path / "profiles"
+    run_extraction(bvids=bvids, excel_path=str(tmp_path / "output.xlsx"), output_dir=str(tmp_path / "output"),
+                   sinks=("jsonl",), log=lambda s: None, requests_per_second=0, profile=mode,
+                   profile_dir=str(profile_dir), web_base=mock.base_url, api_base=mock.base_url,
+                   comment_base=mock.base_url)
+    # 结束后取消区间监听器，之后的运行不受影响
+    assert metrics.span_listener() is None
+
+    [run] = os.listdir(profile_dir)
+    report_dir = profile_dir / run
+    with open(report_dir / "report.json", encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["mode"] == mode and report["run"] == run
+    for stage in ("metadata", "cover", "danmaku", "video", "audio"):
+        span = report["spans"][f"stage:{stage}"]
+        assert span["count"] == 3
+        assert 0 <= span["self"] <= span["total"] <= report["elapsed"]
+    assert report["spans"]["sink_write:JsonlSink"]["count"] == 3
+
+    spans = _read_folded(report_dir / "spans.folded")
+    assert "MainThread;stage:metadata" in spans
+    # 写表区间嵌套在 metadata 阶段内
+    assert any(stack.startswith("MainThread;stage:metadata;") and stack.endswith("sink_write:JsonlSink")
+               for stack in spans)
+    assert "stage:metadata" in (report_dir / "report.txt").read_text(encoding="utf-8")
+
+    if mode == "cprofile":
+        stats = pstats.Stats(str(report_dir / "profile.pstats"))
+        # cProfile 在 run_extraction 内部启动，记录的是之后调用的函数
+        assert any(func == "get_video_info" for _, _, func in stats.stats)
+        assert report["threads_profiled"] >= 1 and report["top_functions"]
+    else:
+        assert not (report_dir / "profile.pstats").exists()
+    if mode == "sample":
+        samples = _read_folded(report_dir / "samples.folded")
+        assert samples and sum(samples.values()) == report["stack_samples"]
+        assert all(stack.split(";", 1)[0] for stack in samples)
+    else:
+        assert not (report_dir / "samples.folded").exists()
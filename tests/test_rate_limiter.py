@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+import info_start
+from info_start import run_extraction
+from rate_limiter import AdaptiveRateLimiter, RequestScheduler, RetryQueue, ThrottledError
+
+
+@pytest.mark.parametrize("status, code", [(412, None), (429, None), (200, -412), (200, -799)])
+def test_throttle_signals_raise_and_halve_rate(status, code):
+    scheduler = RequestScheduler(rate=10)
+    with pytest.raises(ThrottledError):
+        scheduler.check_response("api", status, code)
+    assert scheduler.rates()["api"] == 5
+    assert scheduler.rates()["html"] == 10
+    stats = scheduler.stats()["api"]
+    assert (stats["requests"], stats["throttled"], stats["limited"]) == (1, 1, True)
+
+
+def test_rate_recovers_additively_up_to_max():
+    limiter = AdaptiveRateLimiter(rate=1.0, increase=0.1, min_rate=0.2)
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.rate == pytest.approx(0.2)
+    for _ in range(5):
+        limiter.on_success()
+    assert limiter.rate == pytest.approx(0.7)
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.rate == 1.0
+
+
+def test_unlimited_rate_falls_back_when_throttled():
+    scheduler = RequestScheduler(rate=0)
+    scheduler.check_response("html", 200)
+    assert scheduler.rates()["html"] == 0
+    with pytest.raises(ThrottledError):
+        scheduler.check_response("html", 412)
+    assert scheduler.rates()["html"] == 0.5
+
+
+def test_retry_queue_orders_by_due_time_and_caps_attempts():
+    queue = RetryQueue(RequestScheduler(backoff_base=0.0, max_retries=2))
+    assert queue.push("a", 1)
+    assert queue.push("b", 2)
+    assert not queue.push("c", 3)
+    assert [queue.pop_ready(), queue.pop_ready(), queue.pop_ready()] == [("a", 1), ("b", 2), None]
+    assert queue.next_delay() is None
+
+
+class _FastRetryScheduler(RequestScheduler):
+    # 缩短退避等待，记录实例供断言
+    instances = []
+
+    def __init__(self, **kwargs):
+        super().__init__(backoff_base=0.05, **kwargs)
+        self.instances.append(self)
+
+
+@pytest.fixture
+def extraction(monkeypatch, tmp_path, no_media):
+    _FastRetryScheduler.instances = []
+    monkeypatch.setattr(info_start, "RequestScheduler", _FastRetryScheduler)
+    throttled_rates = []
+    on_throttle = AdaptiveRateLimiter.on_throttle
+
+    def record(limiter):
+        on_throttle(limiter)
+        throttled_rates.append((limiter, limiter.rate))
+    monkeypatch.setattr(AdaptiveRateLimiter, "on_throttle", record)
+
+    def run(mock, bvids, **kwargs):
+        run_extraction(bvids=bvids, excel_path=str(tmp_path / "output.xlsx"), output_dir=str(tmp_path / "output"),
+                       sinks=("jsonl",), log=lambda s: None, requests_per_second=20, web_base=mock.base_url,
+                       api_base=mock.base_url, comment_base=mock.base_url, **kwargs)
+        with open(tmp_path / "output.jsonl", encoding="utf-8") as f:
+            rows = [json.loads(line)["链接"].rsplit("/", 1)[-1] for line in f]
+        # rows 为写入结果的 BV 号
+        return rows, _FastRetryScheduler.instances[0], throttled_rates
+    return run
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_run_extraction_requeues_throttled_videos(mock_factory, extraction, concurrent):
+    mock = mock_factory(throttle_every=5)
+    bvids = mock.fixtures.bvids(5)
+    rows, scheduler, _ = extraction(mock, bvids, concurrent=concurrent)
+    assert sorted(rows) == sorted(bvids)
+    assert mock.throttled["page"] and mock.throttled["view"]
+    stats = scheduler.stats()
+    assert stats["html"]["throttled"] > 0
+    assert stats["api"]["throttled"] > 0
+
+
+def test_reduced_rate_recovers_after_throttling_stops(mock_factory, extraction):
+    mock = mock_factory(throttle_every=2)
+    mock.max_throttles = 4
+    bvids = mock.fixtures.bvids(5)
+    rows, scheduler, throttled_rates = extraction(mock, bvids)
+    assert len(rows) == len(bvids)
+    assert sum(mock.throttled.values()) == 4
+    for limiter, rate in throttled_rates:
+        assert rate < limiter.max_rate
+    last = {id(limiter): (limiter, rate) for limiter, rate in throttled_rates}
+    for limiter, rate in last.values():
+        assert rate < limiter.rate <= limiter.max_rate
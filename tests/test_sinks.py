@@ -0,0 +1,87 @@
+import pytest
+
+from info_data import HEADERS, CsvSink, MultiSink, ResultSink
+from job_state import JobStateStore
+
+
+class _BrokenSink(ResultSink):
+    def append_row(self, row):
+        pass
+
+    def close(self):
+        raise OSError("disk full")
+
+
+class _FlakySink(ResultSink):
+    # 前 failures 次写入失败，之后正常记录
+    def __init__(self, failures=1):
+        self.failures = failures
+        self.rows = []
+
+    def append_row(self, row):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.rows.append(row)
+
+
+def _row(bvid):
+    row = [""] * len(HEADERS)
+    row[HEADERS.index("链接")] = f"https://www.bilibili.com/video/{bvid}"
+    return row
+
+
+def _csv_rows(path):
+    return [line for line in path.read_text(encoding="utf-8-sig").splitlines()[1:] if line]
+
+
+def test_result_sink_is_abstract():
+    with pytest.raises(TypeError):
+        ResultSink()
+
+
+def test_multi_sink_closes_every_sink_then_raises(tmp_path):
+    path = tmp_path / "out.csv"
+    csv_sink = CsvSink(str(path))
+    multi = MultiSink([_BrokenSink(), csv_sink, _BrokenSink()])
+    multi.append_row(["标题"] + [""] * (len(HEADERS) - 1))
+    with pytest.raises(IOError) as info:
+        multi.close()
+    assert str(info.value).count("_BrokenSink") == 2
+    # 前一个输出关闭失败，后面的 CSV 仍然落盘
+    assert "标题" in path.read_text(encoding="utf-8-sig")
+
+
+def test_multi_sink_retry_only_writes_failed_sinks(tmp_path):
+    path = tmp_path / "out.csv"
+    csv_sink, flaky = CsvSink(str(path)), _FlakySink()
+    multi = MultiSink([csv_sink, flaky])
+    with pytest.raises(IOError):
+        multi.append_row(_row("BV1a"))
+    multi.append_row(_row("BV1a"))
+    multi.append_row(_row("BV1b"))
+    multi.close()
+    assert len(_csv_rows(path)) == 2
+    assert [r[HEADERS.index("链接")][-4:] for r in flaky.rows] == ["BV1a", "BV1b"]
+
+
+def test_multi_sink_partial_write_survives_restart(tmp_path):
+    # 第一次运行 CSV 写入成功、另一个输出失败；重启后续传不应再向 CSV 追加同一行
+    path = tmp_path / "out.csv"
+    job = JobStateStore(str(tmp_path / "job_state.db"))
+    try:
+        multi = MultiSink([CsvSink(str(path)), _FlakySink()], state=job)
+        with pytest.raises(IOError):
+            multi.append_row(_row("BV1a"))
+        multi.close()
+        assert job.written_sinks("BV1a") == {"0:CsvSink"}
+
+        flaky = _FlakySink(failures=0)
+        multi = MultiSink([CsvSink(str(path)), flaky], state=job)
+        multi.append_row(_row("BV1a"))
+        multi.close()
+        assert len(_csv_rows(path)) == 1
+        assert len(flaky.rows) == 1
+        assert job.written_sinks("BV1a") == set()
+    finally:
+        job.close()
@@ -0,0 +1,25 @@
+from benchmarks.fixtures import synthetic_view
+from stats_snapshot import STATS_COLUMNS, StatsSnapshotStore, run_stats_snapshot
+
+
+def test_snapshot_writes_stats_without_pages_or_media(mock, tmp_path):
+    bvids = mock.fixtures.bvids(40)
+    bvid_file = tmp_path / "BVID_list.txt"
+    bvid_file.write_text("\n".join(bvids) + "\n", encoding="utf-8")
+    db_path = tmp_path / "stats.db"
+
+    run_stats_snapshot(bvid_file=str(bvid_file), db_path=str(db_path), log=lambda s: None,
+                       workers=2, requests_per_second=0, api_base=mock.base_url)
+
+    assert mock.hits["stat"] == len(bvids)
+    for name in ("page", "view", "tags", "media", "cover", "danmaku"):
+        assert mock.hits[name] == 0
+    with StatsSnapshotStore(str(db_path)) as store:
+        for bvid in (bvids[0], bvids[-1]):
+            history = store.history(bvid)
+            assert len(history) == 1
+            expected = synthetic_view(bvid, mock.base_url)["data"]["stat"]
+            stats = history[0][1]
+            assert list(stats) == list(STATS_COLUMNS)
+            assert stats["views"] == expected["view"]
+            assert stats["likes"] == expected["like"]
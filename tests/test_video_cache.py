@@ -0,0 +1,88 @@
+import json
+from collections import Counter
+
+import pytest
+
+import video_cache
+from info_extractor import BilibiliInfoExtractor
+from video_cache import VideoInfoCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # 可控时钟，保证 TTL 与访问顺序不依赖真实时间精度
+    now = [1_000_000.0]
+    monkeypatch.setattr(video_cache.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = VideoInfoCache(str(tmp_path / "cache.db"), static_ttl=1000, stats_ttl=10)
+    yield cache
+    cache.close()
+
+
+def _sizes(cache):
+    return dict(cache._conn.execute("SELECT bvid, size FROM video_cache"))
+
+
+def test_size_counts_utf8_bytes(cache):
+    info = {"title": "基准测试视频", "views": 1}
+    api = {"desc": "简介"}
+    cache.put("BV1", info, api)
+    expected = (len(json.dumps(info, ensure_ascii=False).encode("utf-8"))
+                + len(json.dumps(api, ensure_ascii=False).encode("utf-8")))
+    assert _sizes(cache)["BV1"] == expected
+
+    updated = cache.update_stats("BV1", {"views": 123456})
+    assert _sizes(cache)["BV1"] == (len(json.dumps(updated, ensure_ascii=False).encode("utf-8"))
+                                    + len(json.dumps(api, ensure_ascii=False).encode("utf-8")))
+
+
+def test_lru_evicts_least_recently_accessed(cache, clock):
+    cache.max_entries = 2
+    for bvid in ("BV1", "BV2", "BV3"):
+        cache.put(bvid, {"title": bvid})
+        clock[0] += 1
+    # 访问 BV1 后它变为最近使用，应淘汰 BV2
+    assert cache.get("BV1") is not None
+    cache.evict()
+    assert set(_sizes(cache)) == {"BV1", "BV3"}
+
+
+def test_byte_limit_evicts_oldest_first(cache, clock):
+    for bvid in ("BV1", "BV2", "BV3"):
+        cache.put(bvid, {"title": "视频" * 10})
+        clock[0] += 1
+    cache.max_bytes = sum(_sizes(cache).values()) - 1
+    cache.evict()
+    assert set(_sizes(cache)) == {"BV2", "BV3"}
+
+
+def test_stale_stats_refresh_with_stat_request_only(mock, cache, clock):
+    extractor = BilibiliInfoExtractor(log=lambda s: None, cache=cache, web_base=mock.base_url,
+                                      api_base=mock.base_url, comment_base=mock.base_url)
+    bvid = mock.fixtures.bvids(1)[0]
+    first = extractor.get_video_info(bvid)
+    fetch_hits = Counter(mock.hits)
+    assert fetch_hits["stat"] == 0
+
+    # 统计数据未过期：完全不发请求
+    clock[0] += 5
+    assert extractor.get_video_info(bvid) == first
+    assert mock.hits == fetch_hits
+
+    # 统计数据过期、静态信息未过期：只请求一次 stat 接口
+    clock[0] += 10
+    refreshed = extractor.get_video_info(bvid)
+    assert refreshed["title"] == first["title"]
+    assert mock.hits["stat"] == 1
+    assert mock.hits - fetch_hits == Counter(stat=1)
+    _, static_fresh, stats_fresh = cache.get(bvid)
+    assert static_fresh and stats_fresh
+
+    # 静态信息过期：重新完整抓取
+    clock[0] += 1000
+    extractor.get_video_info(bvid)
+    assert mock.hits["page"] + mock.hits["view"] > fetch_hits["page"] + fetch_hits["view"]
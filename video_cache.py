@@ -0,0 +1,138 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Optional, Tuple
+
+# get_video_info 结果中随时间变化的统计字段，其余字段视为静态信息
+STATS_FIELDS = ("views", "danmaku", "likes", "coins", "favorites", "shares")
+
+
+class VideoInfoCache:
+    """
+    基于 SQLite 的视频信息本地缓存，以 bvid 为键
+    保存 view 接口原始 JSON 与 get_video_info 的解析结果，静态信息与统计数据分别设置过期时间，
+    超出条目数或总大小时按最近访问时间（LRU）淘汰
+    """
+    def __init__(self, db_path: str, static_ttl: float = 7 * 24 * 3600, stats_ttl: float = 3600,
+                 max_entries: int = 200000, max_bytes: int = 512 * 1024 * 1024):
+        """
+        :param db_path: 缓存数据库路径
+        :param static_ttl: 标题、UP主、cid、标签等静态信息的有效期（秒）
+        :param stats_ttl: 播放、点赞等统计数据的有效期（秒）
+        :param max_entries: 最大缓存条目数
+        :param max_bytes: 缓存数据总大小上限（按 JSON 的 UTF-8 编码字节数计）
+        """
+        self.db_path = db_path
+        self.static_ttl = static_ttl
+        self.stats_ttl = stats_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS video_cache ("
+            " bvid TEXT PRIMARY KEY,"
+            " api_json TEXT,"
+            " info_json TEXT NOT NULL,"
+            " static_at REAL NOT NULL,"
+            " stats_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_video_cache_accessed ON video_cache(accessed_at)")
+        self._conn.commit()
+
+    def get(self, bvid: str) -> Optional[Tuple[dict, bool, bool]]:
+        """
+        读取缓存
+        :return: (视频信息, 静态信息是否有效, 统计数据是否有效)，未命中返回 None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT info_json, static_at, stats_at FROM video_cache WHERE bvid = ?", (bvid,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE video_cache SET accessed_at = ? WHERE bvid = ?", (now, bvid))
+            self._conn.commit()
+        info_json, static_at, stats_at = row
+        return (json.loads(info_json),
+                now - static_at < self.static_ttl,
+                now - stats_at < self.stats_ttl)
+
+    def get_api_data(self, bvid: str) -> Optional[dict]:
+        """读取缓存的 view 接口原始数据"""
+        with self._lock:
+            row = self._conn.execute("SELECT api_json FROM video_cache WHERE bvid = ?", (bvid,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(row[0])
+
+    def put(self, bvid: str, video_info: dict, api_data: Optional[dict] = None):
+        """写入完整的视频信息（静态信息与统计数据同时刷新）"""
+        now = time.time()
+        info_json = json.dumps(video_info, ensure_ascii=False)
+        api_json = json.dumps(api_data, ensure_ascii=False) if api_data is not None else None
+        size = len(info_json.encode("utf-8")) + (len(api_json.encode("utf-8")) if api_json else 0)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO video_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (bvid, api_json, info_json, now, now, now, size)
+            )
+            self._conn.commit()
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= 100:
+                self._evict_locked()
+
+    def update_stats(self, bvid: str, stats: dict) -> Optional[dict]:
+        """
+        仅刷新统计字段
+        :param stats: 以 STATS_FIELDS 为键的新统计数据
+        :return: 更新后的视频信息，缓存中不存在时返回 None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT info_json FROM video_cache WHERE bvid = ?", (bvid,)).fetchone()
+            if row is None:
+                return None
+            video_info = json.loads(row[0])
+            video_info.update({k: stats[k] for k in STATS_FIELDS if k in stats})
+            info_json = json.dumps(video_info, ensure_ascii=False)
+            # size 按 UTF-8 字节计，只替换 info_json 部分的大小
+            delta = len(info_json.encode("utf-8")) - len(row[0].encode("utf-8"))
+            self._conn.execute(
+                "UPDATE video_cache SET info_json = ?, stats_at = ?, accessed_at = ?, size = size + ? WHERE bvid = ?",
+                (info_json, now, now, delta, bvid)
+            )
+            self._conn.commit()
+        return video_info
+
+    def _evict_locked(self):
+        self._puts_since_evict = 0
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM video_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        removed = 0
+        cursor = self._conn.execute("SELECT bvid, size FROM video_cache ORDER BY accessed_at")
+        victims = []
+        for bvid, size in cursor:
+            if count - removed <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((bvid,))
+            removed += 1
+            total -= size
+        self._conn.executemany("DELETE FROM video_cache WHERE bvid = ?", victims)
+        self._conn.commit()
+
+    def evict(self):
+        """按 LRU 淘汰超出容量限制的条目"""
+        with self._lock:
+            self._evict_locked()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()